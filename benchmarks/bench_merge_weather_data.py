@@ -0,0 +1,126 @@
+"""
+Benchmark of one chunk commit: merging a fetched chunk into a stored cell.
+
+`commit_weather_chunk` merges a single chunk per commit, then writes the cell
+file. Every scenario merges one chunk into a multi-year frame with the stable
+sort of `merge_weather_data`, the sort of the original code, and a sorted
+splice at `searchsorted` positions, and times the CSV write of the result.
+The splice only saves a small share of a commit, which is why the store does
+not use it.
+
+Run from the repository root:
+    python -m benchmarks.bench_merge_weather_data --years 5
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+import numpy as np
+import pandas as pd
+from src.data_import.storage import atomic_write_csv
+from src.data_import.synthetic import make_weather as make_synthetic_weather
+from src.data_import.weather import merge_weather_data
+
+TUNIS = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation"]
+
+
+def make_weather(start, end, variables=VARIABLES, seed=0):
+    """Synthetic hourly weather of Tunis for the days from start to end."""
+    return make_synthetic_weather(
+        TUNIS,
+        pd.Timestamp(start).strftime("%Y-%m-%d"),
+        pd.Timestamp(end).strftime("%Y-%m-%d"),
+        variables,
+        seed=seed,
+    )
+
+
+def make_scenarios(years):
+    """Stored multi-year frame and the single chunk committed in each scenario."""
+    start = pd.Timestamp("2015-01-01")
+    end = start + pd.DateOffset(years=years) - pd.Timedelta(days=1)
+    stored = make_weather(start, end)
+    middle = start + pd.DateOffset(years=years // 2)
+    month_end = middle + pd.DateOffset(months=1) - pd.Timedelta(days=1)
+    with_gap = stored[(stored["date"] < middle) | (stored["date"] > month_end)]
+    return {
+        "append": (
+            stored,
+            make_weather(end + pd.Timedelta(days=1), end + pd.Timedelta(days=31)),
+        ),
+        "fill_gap": (with_gap, make_weather(middle, month_end)),
+        "refetch": (stored, make_weather(end - pd.Timedelta(days=60), end, seed=1)),
+        "new_column": (
+            stored,
+            make_weather(end - pd.Timedelta(days=60), end, ["surface_pressure"]),
+        ),
+    }
+
+
+def original_merge(existing_data, new_data):
+    """Reference implementation: the merge before this work, an unstable sort."""
+    final_data = pd.concat([existing_data] + new_data, ignore_index=True)
+    return final_data.sort_values("date").drop_duplicates(subset=["date"], keep="last")
+
+
+def splice_merge(existing_data, chunk):
+    """
+    Reference implementation: splice a sorted chunk into sorted stored data.
+
+    Only the stored rows inside the chunk's date span are looked at, the
+    chunk replaces the stored rows of its dates.
+    """
+    existing_dates = existing_data["date"].to_numpy()
+    chunk_dates = chunk["date"].to_numpy()
+    start = np.searchsorted(existing_dates, chunk_dates[0], side="left")
+    end = np.searchsorted(existing_dates, chunk_dates[-1], side="right")
+    window = existing_data.iloc[start:end]
+    window = window[~np.isin(existing_dates[start:end], chunk_dates)]
+    middle = pd.concat([window, chunk]).sort_values("date", kind="mergesort")
+    return pd.concat(
+        [existing_data.iloc[:start], middle, existing_data.iloc[end:]],
+        ignore_index=True,
+    )
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = ("scenario", "rows", "merge", "original", "splice", "write", "gain")
+    print(
+        f"{header[0]:<10} {header[1]:>8} {header[2]:>9} {header[3]:>9} "
+        f"{header[4]:>9} {header[5]:>9} {header[6]:>7}   (ms, gain of a commit)"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, "cell.csv")
+        for name, (stored, chunk) in make_scenarios(args.years).items():
+            merged = merge_weather_data(stored, [chunk])
+            merge = best_of(lambda: merge_weather_data(stored, [chunk]), args.repeat)
+            original = best_of(lambda: original_merge(stored, [chunk]), args.repeat)
+            write = best_of(lambda: atomic_write_csv(merged, filepath), args.repeat)
+
+            # The splice replaces whole rows, it cannot merge a chunk of other columns
+            if set(chunk.columns) == set(stored.columns):
+                pd.testing.assert_frame_equal(splice_merge(stored, chunk), merged)
+                splice = best_of(lambda: splice_merge(stored, chunk), args.repeat)
+                gain = f"{(merge - splice) / (merge + write):.0%}"
+                splice = f"{splice * 1e3:.1f}"
+            else:
+                splice = gain = "-"
+            print(
+                f"{name:<10} {len(merged):>8} {merge * 1e3:>9.1f} "
+                f"{original * 1e3:>9.1f} {splice:>9} {write * 1e3:>9.1f} {gain:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
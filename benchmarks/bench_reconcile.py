@@ -0,0 +1,112 @@
+"""
+Benchmark of the stacked reconciliation against per-timestamp pandas operations.
+
+The pandas reference reconciles one horizon at a time: a groupby sum for
+bottom-up and the MinT projection with a dense summing matrix.
+
+Run from the repository root:
+    python -m benchmarks.bench_reconcile --cities 500 --regions 12 --horizon 8760
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.data_import.synthetic import make_cities
+from src.process.reconcile import build_hierarchy, reconcile, shrink_covariance
+
+
+def make_forecasts(hierarchy, horizon, n_residuals, seed=0):
+    """Noisy base forecasts of every level and correlated in-sample errors."""
+    rng = np.random.default_rng(seed)
+    n_bottom = len(hierarchy.bottom)
+    bottom = 100 + 20 * rng.random((n_bottom, 1)) * np.sin(
+        2 * np.pi * np.arange(horizon) / 24
+    )
+    truth = np.concatenate([hierarchy.aggregate(bottom), bottom])
+    common = rng.normal(0, 1, n_residuals)
+    errors = rng.normal(0, 1, (n_bottom, n_residuals)) + 0.5 * common
+    residuals = np.concatenate([hierarchy.aggregate(errors), errors])
+    residuals += rng.normal(0, 1, residuals.shape)
+    forecasts = truth + rng.normal(0, 1, truth.shape) * residuals.std(axis=1)[:, None]
+    return forecasts, residuals
+
+
+def pandas_bottom_up(hierarchy, forecasts, n_steps):
+    """Reference implementation: one groupby per timestamp."""
+    regions = pd.Series(np.array(hierarchy.regions)[hierarchy.region_of])
+    result = []
+    for step in range(n_steps):
+        bottom = pd.Series(forecasts[-len(hierarchy.bottom) :, step])
+        by_region = bottom.groupby(regions.to_numpy()).sum()
+        result.append(np.concatenate([[by_region.sum()], by_region, bottom]))
+    return np.array(result).T
+
+
+def pandas_mint(hierarchy, forecasts, residuals, n_steps):
+    """Reference implementation: dense projection applied to each timestamp."""
+    S = hierarchy.summing_matrix()
+    W_inv = np.linalg.inv(shrink_covariance(residuals)[0])
+    projection = pd.DataFrame(
+        S @ np.linalg.solve(S.T @ W_inv @ S, S.T @ W_inv),
+        index=hierarchy.names,
+        columns=hierarchy.names,
+    )
+    result = []
+    for step in range(n_steps):
+        base = pd.Series(forecasts[:, step], index=hierarchy.names)
+        result.append(projection @ base)
+    return np.array(result).T
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--regions", type=int, default=12)
+    parser.add_argument("--horizon", type=int, default=8760)
+    parser.add_argument("--residuals", type=int, default=720)
+    parser.add_argument(
+        "--pandas-steps",
+        type=int,
+        default=100,
+        help="Timestamps reconciled with pandas, the time is extrapolated",
+    )
+    args = parser.parse_args()
+
+    hierarchy = build_hierarchy(make_cities(args.cities, args.regions))
+    forecasts, residuals = make_forecasts(hierarchy, args.horizon, args.residuals)
+    print(
+        f"{hierarchy.n_series} series ({len(hierarchy.regions)} regions) x "
+        f"{args.horizon} horizons"
+    )
+
+    steps = args.pandas_steps
+    header = ("method", "stacked (s)", "pandas est. (s)", "speedup")
+    print(f"{header[0]:<12} {header[1]:>12} {header[2]:>16} {header[3]:>8}")
+    for method in ["bottom_up", "ols", "wls_var", "mint_shrink"]:
+        result, stacked = timed(reconcile, hierarchy, forecasts, method, residuals)
+        reference = None
+        if method == "bottom_up":
+            expected, reference = timed(pandas_bottom_up, hierarchy, forecasts, steps)
+        elif method == "mint_shrink":
+            expected, reference = timed(
+                pandas_mint, hierarchy, forecasts, residuals, steps
+            )
+        if reference is None:
+            estimate = speedup = "-"
+        else:
+            np.testing.assert_allclose(result[:, :steps], expected, atol=1e-6)
+            reference *= args.horizon / steps
+            estimate = f"{reference:.2f}"
+            speedup = f"{reference / stacked:.1f}x"
+        print(f"{method:<12} {stacked:>12.3f} {estimate:>16} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
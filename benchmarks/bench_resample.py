@@ -0,0 +1,104 @@
+"""
+Benchmark of the vectorized gap filling against per-series pandas filling.
+
+Run from the repository root:
+    python -m benchmarks.bench_resample --series 1000 --years 5
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.process.resample import fill_gaps, stack_series
+
+
+def make_stacked(n_series, years, missing_rate, seed=0):
+    """Hourly series with isolated missing hours and a few multi-day outages."""
+    rng = np.random.default_rng(seed)
+    n_times = int(years * 365.25 * 24)
+    hours = np.arange(n_times)
+    values = (
+        15
+        + 8 * np.sin(2 * np.pi * hours / 24)[None, :]
+        + rng.normal(0, 1, (n_series, n_times))
+    )
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    for row in rng.integers(0, n_series, n_series // 10):
+        start = rng.integers(0, n_times - 96)
+        values[row, start : start + rng.integers(6, 96)] = np.nan
+    return values
+
+
+def pandas_fill(values, method, max_gap):
+    """Reference implementation: one pandas Series at a time."""
+    result = np.empty_like(values)
+    for i, row in enumerate(values):
+        series = pd.Series(row)
+        if method == "linear":
+            filled = series.interpolate(limit_area="inside")
+        else:
+            filled = series.ffill()
+        if max_gap is not None:
+            missing = series.isna()
+            run_id = (~missing).cumsum()
+            run_length = missing.groupby(run_id).transform("sum")
+            filled[missing & (run_length > max_gap)] = np.nan
+        result[i] = filled.to_numpy()
+    return result
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--missing-rate", type=float, default=0.02)
+    parser.add_argument("--max-gap", type=int, default=24)
+    parser.add_argument(
+        "--pandas-series",
+        type=int,
+        default=50,
+        help="Series filled with pandas, the time is extrapolated to all series",
+    )
+    args = parser.parse_args()
+
+    values = make_stacked(args.series, args.years, args.missing_rate)
+    n_series, n_times = values.shape
+    print(f"{n_series} series x {n_times} hours ({values.nbytes / 1e9:.2f} GB)")
+
+    # Stacking a long frame of the first series onto the hourly grid
+    subset = values[: args.pandas_series]
+    grid = pd.date_range("2015-01-01", periods=n_times, freq="h")
+    long = pd.DataFrame(
+        {
+            "city": np.repeat(np.arange(len(subset)), n_times),
+            "date": np.tile(grid.to_numpy(), len(subset)),
+            "y": subset.reshape(-1),
+        }
+    )
+    _, elapsed = timed(stack_series, long, "h")
+    print(f"stack_series of {len(subset)} series: {elapsed:.2f}s")
+
+    header = ("method", "vectorized (s)", "pandas est. (s)", "speedup")
+    print(f"{header[0]:<16} {header[1]:>15} {header[2]:>16} {header[3]:>8}")
+    for method in ["linear", "ffill", "seasonal_naive"]:
+        filled, vectorized = timed(fill_gaps, values, method, args.max_gap)
+        if method == "seasonal_naive":
+            print(f"{method:<16} {vectorized:>15.2f} {'-':>16} {'-':>8}")
+            continue
+        expected, reference = timed(pandas_fill, subset, method, args.max_gap)
+        np.testing.assert_allclose(filled[: len(subset)], expected)
+        reference *= n_series / len(subset)
+        print(
+            f"{method:<16} {vectorized:>15.2f} {reference:>16.2f} "
+            f"{reference / vectorized:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
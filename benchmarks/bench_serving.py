@@ -0,0 +1,134 @@
+"""
+Load test of the forecast server: latency percentiles under concurrent clients.
+
+Builds a temporary weather store, starts the HTTP server on a free port and
+runs keep-alive clients against it. The cold path, reading the whole weather
+file on every request as the pipeline does today, is timed for comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_serving --cities 50 --years 3 --clients 16
+"""
+
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_import.grid import get_cell, get_cell_file_path
+from src.data_import.synthetic import make_cities, write_weather_store
+from src.serving.server import serve
+from src.serving.service import ForecastService, SeasonalNaiveModel
+
+VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation"]
+
+
+def make_store(n_cities, years, seed=0):
+    """Write the synthetic weather of cities spread over distinct grid cells."""
+    cities = make_cities(n_cities, n_regions=n_cities, seed=seed)
+    end = pd.Timestamp("2020-01-01") + pd.DateOffset(years=years) - pd.Timedelta(days=1)
+    write_weather_store(
+        cities, "2020-01-01", end.strftime("%Y-%m-%d"), VARIABLES, seed=seed
+    )
+    return cities
+
+
+def cold_forecast(city, window, model):
+    """What a request costs without the serving caches."""
+    data = pd.read_csv(get_cell_file_path(get_cell(city)), parse_dates=["date"])
+    values = data[VARIABLES].to_numpy(dtype=float)[-window:]
+    return model(values[None])[0]
+
+
+def run_clients(port, cities, n_clients, n_requests, seed=0):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        rng = np.random.default_rng(seed + index)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        own = []
+        for _ in range(n_requests):
+            city = cities[rng.integers(len(cities))]["name"]
+            started = time.perf_counter()
+            connection.request("GET", f"/forecast?city={city.replace(' ', '%20')}")
+            response = connection.getresponse()
+            body = response.read()
+            own.append(time.perf_counter() - started)
+            if response.status != 200:
+                raise RuntimeError(body.decode())
+        connection.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--window", type=int, default=168)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["WEATHER_DATA_DIR"] = tmp
+        cities = make_store(args.cities, args.years)
+        model = SeasonalNaiveModel()
+
+        cold = []
+        for city in cities[:5]:
+            started = time.perf_counter()
+            cold_forecast(city, args.window, model)
+            cold.append(time.perf_counter() - started)
+
+        service = ForecastService(cities, VARIABLES, window=args.window, model=model)
+        server = serve(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            # Warm the caches once, as a long running server would be
+            warm_started = time.perf_counter()
+            for city in cities:
+                service.features(city["name"])
+            warm_time = time.perf_counter() - warm_started
+
+            latencies, elapsed = run_clients(
+                server.server_port, cities, args.clients, args.requests
+            )
+            stats = service.stats()
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+    latencies_ms = latencies * 1000
+    print(
+        f"{args.cities} cities x {args.years} years, {args.clients} clients x "
+        f"{args.requests} requests, window {args.window}h"
+    )
+    print(f"cold request (full CSV read): p50 {np.median(cold) * 1000:.1f} ms")
+    print(f"cache warm-up (tail reads): {warm_time / args.cities * 1000:.1f} ms/city")
+    print(
+        f"served: p50 {np.percentile(latencies_ms, 50):.2f} ms, "
+        f"p99 {np.percentile(latencies_ms, 99):.2f} ms, "
+        f"max {latencies_ms.max():.2f} ms, {len(latencies) / elapsed:.0f} req/s"
+    )
+    print(f"batching: {json.dumps(stats['batching'])}")
+    print(f"weather cache: {json.dumps(stats['weather_cache'])}")
+
+
+if __name__ == "__main__":
+    main()
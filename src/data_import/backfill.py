@@ -0,0 +1,378 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .grid import (
+    DEFAULT_GRID_RESOLUTION,
+    check_cell_timezone,
+    get_cell,
+    group_cities_by_cell,
+    register_city,
+)
+from .scheduler import RequestScheduler, estimate_request_cost, get_default_scheduler
+from .storage import get_data_dir
+from .weather import (
+    commit_weather_chunk,
+    fetch_weather_city_from_api,
+    get_dates_to_fetch,
+    get_fetch_jobs,
+    load_existing_data,
+    migrate_legacy_data,
+    split_date_range,
+)
+
+
+def get_journal_path() -> str:
+    """Default journal of the backfill job."""
+    data_dir = get_data_dir("backfill")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "journal.jsonl")
+
+
+def get_unit_id(
+    cell_name: str,
+    date_range: Tuple[str, str],
+    hourly_variables: List[str],
+) -> str:
+    """
+    Journal id of a unit, a re-plan with other variables gets new ids.
+
+    The timezone is left out: a cell is only ever stored in one timezone,
+    see `check_cell_timezone`.
+    """
+    variables = "+".join(sorted(hourly_variables))
+    return f"{cell_name}/{date_range[0]}/{date_range[1]}/{variables}"
+
+
+def plan_backfill(
+    cities: List[dict],
+    start_date: str,
+    end_date: str,
+    hourly_variables: List[str],
+    chunk_days: Optional[int] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> List[dict]:
+    """
+    Plan the fetch units still needed to cover a date range for many cities.
+
+    Cities sharing a grid cell are planned once. The coverage of each cell is
+    read from the store, so only missing days (before, after or inside the
+    stored range) are planned. Like `get_weather_data_city`, missing days are
+    fetched with every variable of the cell and stored days only with the
+    requested variables the cell lacks.
+
+    Returns:
+        Units as dicts with 'id', 'city' (the city the cell is fetched for),
+        'cell', 'start_date', 'end_date' and 'variables', ordered by cell
+    """
+    units = []
+    for cell_name, group in sorted(
+        group_cities_by_cell(cities, grid_resolution).items()
+    ):
+        cell = get_cell(group[0], grid_resolution)
+        for city in group:
+            register_city(city, cell)
+            migrate_legacy_data(city, grid_resolution)
+
+        existing_data = load_existing_data(group[0], grid_resolution)
+        jobs = get_fetch_jobs(
+            existing_data,
+            get_dates_to_fetch(existing_data, start_date, end_date),
+            start_date,
+            end_date,
+            hourly_variables,
+        )
+
+        for date_range, variables in jobs:
+            for chunk in split_date_range(date_range, chunk_days):
+                units.append(
+                    {
+                        "id": get_unit_id(cell_name, chunk, variables),
+                        "city": group[0],
+                        "cell": cell_name,
+                        "start_date": chunk[0],
+                        "end_date": chunk[1],
+                        "variables": variables,
+                    }
+                )
+    return units
+
+
+class BackfillJournal:
+    """
+    Append-only JSONL log of the finished backfill units.
+
+    The journal does not drive the resume: units are planned from the store
+    coverage, which already skips the data committed by an interrupted run.
+    It records the rows, duration and error of every unit for monitoring,
+    and `completed` tells which checkpointed units the store still misses.
+    Every line is flushed and fsynced as soon as a unit finishes.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._lock = threading.Lock()
+
+    def completed(self) -> Set[str]:
+        """Ids of the units whose last entry succeeded."""
+        status = {}
+        if not os.path.exists(self.filepath):
+            return set()
+        with open(self.filepath) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash
+                    continue
+                status[entry["unit"]] = entry["status"]
+        return {unit for unit, s in status.items() if s == "done"}
+
+    def record(
+        self,
+        unit: dict,
+        status: str,
+        rows: int = 0,
+        seconds: float = 0.0,
+        error: Optional[str] = None,
+    ):
+        """Log a finished unit, 'done' or 'failed'."""
+        entry = {
+            "unit": unit["id"],
+            "status": status,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+        if error is not None:
+            entry["error"] = error
+        with self._lock, open(self.filepath, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BackfillProgress:
+    """Throughput and ETA of a running backfill."""
+
+    def __init__(self, total_units: int, scheduler: RequestScheduler):
+        self.total_units = total_units
+        self.done_units = 0
+        self.failed_units = 0
+        self.rows = 0
+        self._scheduler = scheduler
+        self._requests_at_start = scheduler.metrics()["completed"]
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, rows: int = 0, failed: bool = False):
+        with self._lock:
+            self.done_units += 1
+            self.failed_units += int(failed)
+            self.rows += rows
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            requests = self._scheduler.metrics()["completed"] - self._requests_at_start
+            remaining = self.total_units - self.done_units
+            return {
+                "done_units": self.done_units,
+                "failed_units": self.failed_units,
+                "total_units": self.total_units,
+                "rows": self.rows,
+                "elapsed": elapsed,
+                "rows_per_second": self.rows / elapsed,
+                "requests_per_second": requests / elapsed,
+                # Seconds left at the average unit duration, None before the first unit
+                "eta": (
+                    elapsed / self.done_units * remaining if self.done_units else None
+                ),
+            }
+
+    def report(self) -> str:
+        s = self.snapshot()
+        eta = "?" if s["eta"] is None else str(timedelta(seconds=round(s["eta"])))
+        return (
+            f"[backfill] {s['done_units']}/{s['total_units']} units "
+            f"({s['failed_units']} failed), {s['rows']} rows, "
+            f"{s['rows_per_second']:.1f} rows/s, "
+            f"{s['requests_per_second']:.2f} req/s, ETA {eta}"
+        )
+
+
+def run_unit(
+    unit: dict,
+    timezone: str,
+    scheduler: RequestScheduler,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> int:
+    """Fetch one unit through the scheduler and commit it. Returns the fetched rows."""
+    n_days = (
+        pd.to_datetime(unit["end_date"]) - pd.to_datetime(unit["start_date"])
+    ).days + 1
+    cell = get_cell(unit["city"], grid_resolution)
+    future = scheduler.submit(
+        fetch_weather_city_from_api,
+        cell,
+        (unit["start_date"], unit["end_date"]),
+        unit["variables"],
+        timezone,
+        cost=estimate_request_cost(len(unit["variables"]), n_days),
+    )
+    new_data = future.result()
+    # No stored data is passed: the cell file, or the legacy file of the city
+    # if the cell has none yet, is read under the lock and merged into
+    commit_weather_chunk(
+        unit["city"],
+        new_data,
+        unit["variables"],
+        grid_resolution=grid_resolution,
+    )
+    return len(new_data)
+
+
+def run_backfill(
+    cities: List[dict],
+    start_date: str,
+    end_date: str,
+    hourly_variables: List[str],
+    timezone: str,
+    max_workers: int = 4,
+    journal_path: Optional[str] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    chunk_days: Optional[int] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+    report_every: float = 10.0,
+) -> Dict[str, float]:
+    """
+    Backfill the weather store for many cities, resuming an interrupted run.
+
+    Units are planned from the store coverage and run in a pool of
+    `max_workers` threads. The store decides what is left to fetch, so a
+    restart resumes from the committed data; the journal only logs the
+    units, and one logged as done is fetched again if its days or variables
+    are still missing from the store. API calls go through the
+    rate-limited scheduler, so the pool only bounds how many units are
+    fetched and committed at once. Progress is printed at most every
+    `report_every` seconds.
+
+    Args:
+        cities: Dictionaries, each with 'name', 'latitude', and 'longitude'
+        start_date: Start date in 'YYYY-MM-DD' format
+        end_date: End date in 'YYYY-MM-DD' format
+        hourly_variables: List of hourly weather variables to fetch
+        timezone: Timezone for the data, it must match the timezone the cells
+            are stored in
+        max_workers: Number of units processed concurrently
+        journal_path: Journal of the finished units, data/backfill/journal.jsonl
+            if None
+        scheduler: Request scheduler enforcing the API budget, defaults to the
+            process-wide one
+        chunk_days: Size of the units in days, calendar months if None
+        grid_resolution: Size in degrees of the grid cells shared by nearby cities,
+            None to fetch and store every city on its own
+
+    Returns:
+        Final progress snapshot with units, rows, throughput and elapsed time
+    """
+    scheduler = scheduler or get_default_scheduler()
+    journal = BackfillJournal(journal_path or get_journal_path())
+
+    # Fail before fetching anything if a cell is stored in another timezone
+    for group in group_cities_by_cell(cities, grid_resolution).values():
+        check_cell_timezone(get_cell(group[0], grid_resolution), timezone)
+    units = plan_backfill(
+        cities, start_date, end_date, hourly_variables, chunk_days, grid_resolution
+    )
+    completed = journal.completed()
+    lost = sum(unit["id"] in completed for unit in units)
+    print(
+        f"[backfill] {len(units)} units to fetch for {len(cities)} cities "
+        f"({len(completed)} logged as done, {lost} of them missing from the store)"
+    )
+
+    def timed_unit(unit):
+        started = time.monotonic()
+        rows = run_unit(unit, timezone, scheduler, grid_resolution)
+        return rows, time.monotonic() - started
+
+    progress = BackfillProgress(len(units), scheduler)
+    last_report = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(timed_unit, unit): unit for unit in units}
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                rows, seconds = future.result()
+            except Exception as e:
+                print(f"Error backfilling {unit['id']}: {e}")
+                journal.record(unit, "failed", error=str(e))
+                progress.update(failed=True)
+            else:
+                journal.record(unit, "done", rows=rows, seconds=seconds)
+                progress.update(rows=rows)
+
+            if time.monotonic() - last_report >= report_every:
+                print(progress.report())
+                last_report = time.monotonic()
+
+    print(progress.report())
+    return progress.snapshot()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Backfill the weather store for the cities of a JSON file."
+    )
+    parser.add_argument(
+        "cities",
+        help="JSON file with a list of {'name', 'latitude', 'longitude'} cities",
+    )
+    parser.add_argument("--start", required=True, help="Start date, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="End date, YYYY-MM-DD")
+    parser.add_argument(
+        "--variables",
+        nargs="+",
+        default=["temperature_2m", "relative_humidity_2m", "precipitation"],
+    )
+    parser.add_argument(
+        "--timezone",
+        default="UTC",
+        help="Timezone of the data, cells already stored in another one are rejected",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--journal", default=None)
+    parser.add_argument("--chunk-days", type=int, default=None)
+    parser.add_argument(
+        "--grid-resolution",
+        type=float,
+        default=DEFAULT_GRID_RESOLUTION,
+        help="Share cells of this size in degrees between nearby cities (e.g. 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.cities) as f:
+        cities = json.load(f)
+    run_backfill(
+        cities,
+        args.start,
+        args.end,
+        args.variables,
+        args.timezone,
+        max_workers=args.workers,
+        journal_path=args.journal,
+        chunk_days=args.chunk_days,
+        grid_resolution=args.grid_resolution,
+    )
+
+
+if __name__ == "__main__":
+    main()
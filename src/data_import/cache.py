@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Optional, Union
+
+import pandas as pd
+import requests_cache
+
+NEVER_EXPIRE = requests_cache.NEVER_EXPIRE
+DO_NOT_CACHE = requests_cache.DO_NOT_CACHE
+
+
+@dataclass
+class CacheConfig:
+    """
+    Settings of the HTTP response cache.
+
+    Attributes:
+        location: Cache path (database file without extension, or directory
+            for the filesystem backend)
+        backend: Any requests_cache backend name ('sqlite', 'filesystem', 'redis', ...)
+        recent_expire_after: Expiry in seconds of responses whose range ends
+            less than `settle_days` days ago
+        past_expire_after: Expiry of responses for fully past ranges, these never change
+        settle_days: Days after which historical-forecast data is considered final
+        max_entries: Maximum number of cached responses, least recently used
+            ones are evicted beyond it. Unbounded if None
+    """
+
+    location: str = ".cache"
+    backend: str = "sqlite"
+    recent_expire_after: int = 3600
+    past_expire_after: int = NEVER_EXPIRE
+    settle_days: int = 2
+    max_entries: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "CacheConfig":
+        """Build the config from OPENMETEO_CACHE_* environment variables."""
+        max_entries = os.environ.get("OPENMETEO_CACHE_MAX_ENTRIES")
+        return cls(
+            location=os.environ.get("OPENMETEO_CACHE_PATH", cls.location),
+            backend=os.environ.get("OPENMETEO_CACHE_BACKEND", cls.backend),
+            recent_expire_after=int(
+                os.environ.get("OPENMETEO_CACHE_EXPIRE_AFTER", cls.recent_expire_after)
+            ),
+            max_entries=int(max_entries) if max_entries else None,
+        )
+
+
+def expire_after_for_range(
+    end_date: Union[str, date],
+    config: CacheConfig,
+    today: Optional[date] = None,
+) -> int:
+    """Cache expiry for a response covering data up to end_date."""
+    today = today or date.today()
+    if pd.to_datetime(end_date).date() < today - timedelta(days=config.settle_days):
+        return config.past_expire_after
+    return config.recent_expire_after
+
+
+class CacheIndex:
+    """
+    Access times and hit/miss counters of the cached responses.
+
+    Kept in a SQLite file next to the cache, in WAL mode, so several worker
+    processes can share the same cache and its statistics.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS access "
+                "(key TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats "
+                "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, key: str, from_cache: bool):
+        """Count a hit or miss and mark the entry as just used."""
+        counter = "hits" if from_cache else "misses"
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE stats SET value = value + 1 WHERE name = ?", (counter,)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO access VALUES (?, ?)", (key, time.time())
+            )
+
+    def evict(self, cache, max_entries: int) -> int:
+        """Delete the least recently used responses beyond max_entries."""
+        conn = self._connect()
+        try:
+            # Take the write lock first so concurrent processes evict once
+            conn.execute("BEGIN IMMEDIATE")
+            (count,) = conn.execute("SELECT COUNT(*) FROM access").fetchone()
+            if count <= max_entries:
+                conn.rollback()
+                return 0
+            keys = [
+                key
+                for (key,) in conn.execute(
+                    "SELECT key FROM access ORDER BY last_access LIMIT ?",
+                    (count - max_entries,),
+                )
+            ]
+            cache.delete(*keys)
+            conn.executemany("DELETE FROM access WHERE key = ?", [(k,) for k in keys])
+            conn.commit()
+            return len(keys)
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters, hit rate and number of tracked entries."""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats"))
+            (entries,) = conn.execute("SELECT COUNT(*) FROM access").fetchone()
+        total = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": counters["hits"] / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def reset_stats(self):
+        with self._connect() as conn:
+            conn.execute("UPDATE stats SET value = 0")
+
+
+_indexes: Dict[str, CacheIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_cache_index(config: CacheConfig) -> CacheIndex:
+    """Shared CacheIndex of a cache location."""
+    path = os.path.abspath(f"{config.location}.index.sqlite")
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = CacheIndex(path)
+        return _indexes[path]
+
+
+def create_cached_session(config: CacheConfig) -> requests_cache.CachedSession:
+    """
+    Create a cached session tracking hits/misses and bounding the cache size.
+
+    Expiry is set per request with the `expire_after` argument, see
+    `expire_after_for_range`.
+    """
+    backend_kwargs = {}
+    if config.backend == "sqlite":
+        # WAL and a busy timeout let concurrent processes share the database
+        backend_kwargs = {"wal": True, "busy_timeout": 30000}
+
+    session = requests_cache.CachedSession(
+        config.location,
+        backend=config.backend,
+        expire_after=config.recent_expire_after,
+        **backend_kwargs,
+    )
+    index = get_cache_index(config)
+
+    def track_response(response, *args, **kwargs):
+        # cache_key is empty for responses that were not written to the cache
+        key = getattr(response, "cache_key", None)
+        if key:
+            from_cache = getattr(response, "from_cache", False)
+            index.record(key, from_cache)
+            if not from_cache and config.max_entries is not None:
+                index.evict(session.cache, config.max_entries)
+        return response
+
+    session.hooks["response"].append(track_response)
+    return session
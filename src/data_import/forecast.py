@@ -0,0 +1,337 @@
+import argparse
+import bisect
+import json
+import os
+from concurrent.futures import as_completed
+from datetime import timedelta
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+from .cache import DO_NOT_CACHE
+from .grid import DEFAULT_GRID_RESOLUTION, get_cell, group_cities_by_cell, register_city
+from .scheduler import RequestScheduler, estimate_request_cost, get_default_scheduler
+from .storage import atomic_write_csv, atomic_write_json, file_lock, get_data_dir
+from .validation import validate_weather, write_quality_outputs
+from .weather import setup_openmeteo_client
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+DEFAULT_FORECAST_DAYS = 7
+# Locations per call; Open-Meteo accepts many more, smaller batches keep retries cheap
+DEFAULT_BATCH_SIZE = 50
+ISSUE_TIME_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+def get_forecast_dir(cell_name: Optional[str] = None) -> str:
+    """Directory of the forecast snapshots, or of the snapshots of one cell."""
+    parts = ("weather", "forecasts") + ((cell_name,) if cell_name else ())
+    data_dir = get_data_dir(*parts)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+def get_forecast_index_path() -> str:
+    return os.path.join(get_forecast_dir(), "index.json")
+
+
+def format_issue_time(issue_time: Union[str, pd.Timestamp]) -> str:
+    """Issue times are UTC hours, formatted so that they sort as strings."""
+    return pd.to_datetime(issue_time).strftime(ISSUE_TIME_FORMAT)
+
+
+def get_forecast_file_path(cell: dict, issue_time: Union[str, pd.Timestamp]) -> str:
+    """Filename of the snapshot of a cell's forecast issued at `issue_time`."""
+    stamp = pd.to_datetime(issue_time).strftime("%Y%m%dT%H%M")
+    return os.path.join(get_forecast_dir(cell["name"]), f"{stamp}.csv")
+
+
+def load_forecast_index() -> dict:
+    """
+    Mapping of cell id to its coordinates, its latest issue time and all its
+    issue times in ascending order.
+    """
+    filepath = get_forecast_index_path()
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def fetch_forecast_batch(
+    cells: List[dict],
+    hourly_variables: List[str],
+    timezone: str,
+    start_date: str,
+    end_date: str,
+) -> List[pd.DataFrame]:
+    """
+    Fetch the forecast of several locations in a single Open-Meteo call.
+
+    Coordinates are passed as lists, the API answers one response per
+    location in the same order.
+    """
+    openmeteo = setup_openmeteo_client()
+    params = {
+        "latitude": [cell["latitude"] for cell in cells],
+        "longitude": [cell["longitude"] for cell in cells],
+        "start_date": start_date,
+        "end_date": end_date,
+        "hourly": hourly_variables,
+        "timezone": timezone,
+    }
+    # Forecasts are revised with every model run and the params of two issues
+    # of the same day are identical: bypass the cache so each issue is fetched
+    responses = openmeteo.weather_api(
+        FORECAST_URL, params=params, expire_after=DO_NOT_CACHE
+    )
+    if len(responses) != len(cells):
+        raise ValueError(f"Expected {len(cells)} responses, got {len(responses)}")
+
+    dates = pd.date_range(
+        pd.to_datetime(start_date),
+        pd.to_datetime(end_date) + timedelta(hours=23),
+        freq="h",
+    )
+    frames = []
+    for cell, response in zip(cells, responses):
+        hourly = response.Hourly()
+        data = {"date": dates}
+        for j, variable in enumerate(hourly_variables):
+            values = hourly.Variables(j).ValuesAsNumpy()
+            if len(values) != len(dates):
+                raise ValueError(
+                    f"Expected {len(dates)} hourly values for {variable} at "
+                    f"{cell['name']}, got {len(values)}"
+                )
+            data[variable] = values
+        frames.append(pd.DataFrame(data))
+    return frames
+
+
+def save_forecast_snapshot(
+    cell: dict,
+    data: pd.DataFrame,
+    issue_time: Union[str, pd.Timestamp],
+    hourly_variables: List[str],
+) -> str:
+    """
+    Validate and store the forecast of a cell issued at `issue_time`.
+
+    Snapshots are never overwritten by later runs: each issue gets its own
+    file and the index records it as the cell's latest issue.
+
+    Returns:
+        Path of the snapshot file
+    """
+    issue = format_issue_time(issue_time)
+    data, quarantined, _ = validate_weather(data, hourly_variables)
+    if not quarantined.empty:
+        print(f"Quarantined {len(quarantined)} forecast rows for {cell['name']}")
+        write_quality_outputs(f"{cell['name']}_forecast", quarantined)
+
+    filepath = get_forecast_file_path(cell, issue)
+    data = data.drop(columns="city", errors="ignore")
+    data.insert(0, "issue_time", pd.to_datetime(issue))
+    atomic_write_csv(data, filepath)
+
+    index_path = get_forecast_index_path()
+    with file_lock(index_path):
+        # Re-read under the lock, other batches commit their cells concurrently
+        index = load_forecast_index()
+        entry = index.setdefault(
+            cell["name"],
+            {
+                "latitude": cell["latitude"],
+                "longitude": cell["longitude"],
+                "issues": [],
+            },
+        )
+        if issue not in entry["issues"]:
+            bisect.insort(entry["issues"], issue)
+        entry["latest"] = entry["issues"][-1]
+        atomic_write_json(index, index_path)
+    print(f"Saved forecast of {cell['name']} issued {issue} to {filepath}")
+    return filepath
+
+
+def load_forecast(
+    city: dict,
+    issue_time: Optional[Union[str, pd.Timestamp]] = None,
+    as_of: Optional[Union[str, pd.Timestamp]] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+    index: Optional[dict] = None,
+) -> Union[pd.DataFrame, None]:
+    """
+    Load a forecast snapshot of a city, found through the index without listing files.
+
+    Args:
+        city: Dictionary with 'name', 'latitude' and 'longitude'
+        issue_time: Exact issue to load, the latest one if None
+        as_of: Load the latest issue at or before this UTC time instead, so
+            backtests only see forecasts that were available then
+        grid_resolution: Grid cell size the forecasts were stored with
+        index: Forecast index already loaded, read from disk if None
+
+    Returns:
+        The snapshot labelled with the city, None if there is no such issue
+    """
+    cell = get_cell(city, grid_resolution)
+    entry = (index if index is not None else load_forecast_index()).get(cell["name"])
+    if entry is None:
+        return None
+
+    if issue_time is not None:
+        issue = format_issue_time(issue_time)
+        if issue not in entry["issues"]:
+            return None
+    elif as_of is not None:
+        position = bisect.bisect_right(entry["issues"], format_issue_time(as_of))
+        if position == 0:
+            return None
+        issue = entry["issues"][position - 1]
+    else:
+        issue = entry["latest"]
+
+    data = pd.read_csv(
+        get_forecast_file_path(cell, issue), parse_dates=["issue_time", "date"]
+    )
+    data["city"] = city["name"]
+    return data
+
+
+def fetch_forecasts(
+    cities: List[dict],
+    hourly_variables: List[str],
+    timezone: str,
+    forecast_days: int = DEFAULT_FORECAST_DAYS,
+    issue_time: Optional[Union[str, pd.Timestamp]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    scheduler: Optional[RequestScheduler] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch the weather forecast of the next days for many cities as future covariates.
+
+    Cities sharing a grid cell are fetched once, and cells are fetched in
+    multi-location calls of `batch_size` locations through the request
+    scheduler. Every run is stored as a snapshot of its issue time; cells
+    already stored for that issue are not fetched again.
+
+    Args:
+        cities: Dictionaries, each with 'name', 'latitude', and 'longitude'
+        hourly_variables: List of hourly weather variables to fetch
+        timezone: Timezone for the data
+        forecast_days: Days forecast, starting with the day of issue
+        issue_time: UTC time of the run, the current hour if None
+        batch_size: Locations per API call
+        scheduler: Request scheduler enforcing the API budget, defaults to the
+            process-wide one
+        grid_resolution: Size in degrees of the grid cells shared by nearby cities,
+            None to fetch and store every city on its own
+
+    Returns:
+        Dictionary mapping city names to their forecast DataFrame
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if issue_time is None:
+        issue_time = pd.Timestamp.now(tz="UTC").floor("h").tz_localize(None)
+    issue = format_issue_time(issue_time)
+    # The forecast starts on the day of issue in the requested timezone
+    start = (
+        pd.Timestamp(issue).tz_localize("UTC").tz_convert(timezone).normalize()
+    ).tz_localize(None)
+    start_date = start.strftime("%Y-%m-%d")
+    end_date = (start + timedelta(days=forecast_days - 1)).strftime("%Y-%m-%d")
+
+    groups = group_cities_by_cell(cities, grid_resolution)
+    index = load_forecast_index()
+    cells = []
+    for cell_name, group in sorted(groups.items()):
+        cell = get_cell(group[0], grid_resolution)
+        for city in group:
+            register_city(city, cell)
+        if issue not in index.get(cell_name, {}).get("issues", []):
+            cells.append(cell)
+
+    scheduler = scheduler or get_default_scheduler()
+    batches = [cells[i : i + batch_size] for i in range(0, len(cells), batch_size)]
+    print(
+        f"Fetching forecasts issued {issue} for {len(cells)} of {len(groups)} cells "
+        f"in {len(batches)} calls"
+    )
+    # Every location of a batch counts as a call against the quota
+    cost = estimate_request_cost(len(hourly_variables), forecast_days)
+    futures = {
+        scheduler.submit(
+            fetch_forecast_batch,
+            batch,
+            hourly_variables,
+            timezone,
+            start_date,
+            end_date,
+            cost=cost * len(batch),
+        ): batch
+        for batch in batches
+    }
+
+    first_error = None
+    for future in as_completed(futures):
+        try:
+            frames = future.result()
+        except Exception as e:
+            names = [cell["name"] for cell in futures[future]]
+            print(f"Error fetching forecasts for {names}: {e}")
+            first_error = first_error or e
+            continue
+        for cell, data in zip(futures[future], frames):
+            save_forecast_snapshot(cell, data, issue, hourly_variables)
+
+    if first_error is not None:
+        raise first_error
+
+    index = load_forecast_index()
+    return {
+        city["name"]: load_forecast(city, issue, None, grid_resolution, index)
+        for city in cities
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Store a forecast snapshot for the cities of a JSON file."
+    )
+    parser.add_argument(
+        "cities",
+        help="JSON file with a list of {'name', 'latitude', 'longitude'} cities",
+    )
+    parser.add_argument(
+        "--variables",
+        nargs="+",
+        default=["temperature_2m", "relative_humidity_2m", "precipitation"],
+    )
+    parser.add_argument("--timezone", default="UTC")
+    parser.add_argument("--days", type=int, default=DEFAULT_FORECAST_DAYS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--grid-resolution",
+        type=float,
+        default=DEFAULT_GRID_RESOLUTION,
+        help="Share cells of this size in degrees between nearby cities (e.g. 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.cities) as f:
+        cities = json.load(f)
+    fetch_forecasts(
+        cities,
+        args.variables,
+        args.timezone,
+        forecast_days=args.days,
+        batch_size=args.batch_size,
+        grid_resolution=args.grid_resolution,
+    )
+
+
+if __name__ == "__main__":
+    main()
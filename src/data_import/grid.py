@@ -0,0 +1,133 @@
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .storage import atomic_write_json, file_lock, get_data_dir
+
+# Sharing cells is opt-in: a city is fetched at the centre of its cell, up to half
+# a cell away from it, and the lattice is not the grid of Open-Meteo's models.
+# By default every city is its own cell at its exact coordinates.
+DEFAULT_GRID_RESOLUTION = None
+
+
+def snap_to_grid(latitude: float, longitude: float, resolution: float):
+    """Snap coordinates to the centre of the grid cell containing them."""
+    if resolution <= 0:
+        raise ValueError("Grid resolution must be positive.")
+    # Round the result too, so equal cells always give identical floats
+    return (
+        round(round(latitude / resolution) * resolution, 6),
+        round(round(longitude / resolution) * resolution, 6),
+    )
+
+
+def get_cell(city: dict, resolution: Optional[float] = DEFAULT_GRID_RESOLUTION) -> dict:
+    """
+    Location fetched and stored on behalf of a city.
+
+    The returned dict has the same 'name', 'latitude' and 'longitude' keys as
+    a city, its name being the cell id. With resolution None every city is its
+    own cell at its exact coordinates.
+    """
+    if resolution is None:
+        latitude, longitude = city["latitude"], city["longitude"]
+    else:
+        latitude, longitude = snap_to_grid(
+            city["latitude"], city["longitude"], resolution
+        )
+    return {
+        "name": f"cell_{latitude:.4f}_{longitude:.4f}",
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+
+
+def group_cities_by_cell(
+    cities: List[dict],
+    resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> Dict[str, List[dict]]:
+    """Group cities sharing the same grid cell, keyed by cell id."""
+    groups = defaultdict(list)
+    for city in cities:
+        groups[get_cell(city, resolution)["name"]].append(city)
+    return dict(groups)
+
+
+def get_cell_file_path(cell: dict) -> str:
+    """Filename storing the weather data of a grid cell."""
+    data_dir = get_data_dir("weather", "cells")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, f"{cell['name']}.csv")
+
+
+def get_grid_index_path() -> str:
+    data_dir = get_data_dir("weather")
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, "grid_index.json")
+
+
+def load_grid_index() -> dict:
+    """Mapping of cell id to its coordinates and the cities it serves."""
+    filepath = get_grid_index_path()
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def register_city(city: dict, cell: dict) -> dict:
+    """Record that a city is served by a cell in the grid index."""
+    filepath = get_grid_index_path()
+    index = load_grid_index()
+    if city["name"] in index.get(cell["name"], {}).get("cities", []):
+        return index
+
+    with file_lock(filepath):
+        # Re-read under the lock, another worker may have registered cities
+        index = load_grid_index()
+        entry = index.setdefault(
+            cell["name"],
+            {
+                "latitude": cell["latitude"],
+                "longitude": cell["longitude"],
+                "cities": [],
+            },
+        )
+        if city["name"] not in entry["cities"]:
+            entry["cities"] = sorted(entry["cities"] + [city["name"]])
+            atomic_write_json(index, filepath)
+    return index
+
+
+def check_cell_timezone(cell: dict, timezone: str) -> dict:
+    """
+    Record the timezone of a cell's data on first use, reject any other one.
+
+    Stored dates are naive local times, so mixing timezones in a cell file
+    would shift rows under the same labels.
+
+    Raises:
+        ValueError: If the cell is already stored in another timezone
+    """
+    filepath = get_grid_index_path()
+    index = load_grid_index()
+    stored = index.get(cell["name"], {}).get("timezone")
+    if stored is None:
+        with file_lock(filepath):
+            index = load_grid_index()
+            entry = index.setdefault(
+                cell["name"],
+                {
+                    "latitude": cell["latitude"],
+                    "longitude": cell["longitude"],
+                    "cities": [],
+                },
+            )
+            stored = entry.setdefault("timezone", timezone)
+            atomic_write_json(index, filepath)
+    if stored != timezone:
+        raise ValueError(
+            f"Weather of {cell['name']} is stored in {stored}, not {timezone}."
+        )
+    return index
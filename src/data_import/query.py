@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from .grid import get_cell_file_path, load_grid_index
+from .weather import get_file_path
+
+AGGREGATES = ("mean", "min", "max", "sum", "count")
+
+
+def resolve_store_files(cities: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Map each weather file of the store to the requested cities it serves.
+
+    Cities are looked up in the grid index; cities missing from it fall back
+    to their legacy per-city file. All indexed cities are used if None.
+    """
+    files = {}
+    remaining = None if cities is None else set(cities)
+    for cell_name, entry in load_grid_index().items():
+        served = [c for c in entry["cities"] if remaining is None or c in remaining]
+        if served:
+            files[get_cell_file_path({"name": cell_name})] = served
+            if remaining is not None:
+                remaining -= set(served)
+
+    for city_name in sorted(remaining or []):
+        filepath = get_file_path(city_name)
+        if os.path.exists(filepath):
+            files.setdefault(filepath, []).append(city_name)
+        else:
+            print(f"Warning: no weather data stored for {city_name}")
+
+    return {f: served for f, served in files.items() if os.path.exists(f)}
+
+
+def _available_variables(filepath: str) -> List[str]:
+    header = pd.read_csv(filepath, nrows=0).columns
+    return [c for c in header if c not in ("date", "city")]
+
+
+def scan_file(
+    filepath: str,
+    variables: Optional[Sequence[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    freq: Optional[str] = None,
+    chunksize: int = 100_000,
+) -> pd.DataFrame:
+    """
+    Partial aggregates of one weather file, read chunk by chunk.
+
+    Only `chunksize` rows of the requested columns are in memory at once.
+    Returns sum, count, min and max of every variable per period (pandas
+    period alias such as 'D' or 'M'), or over the whole range if freq is None.
+    """
+    available = _available_variables(filepath)
+    # Files may lack variables added after they were first fetched
+    variables = [v for v in variables or available if v in available]
+    start = pd.to_datetime(start_date) if start_date else None
+    # The end date is inclusive of its last hour
+    end = pd.to_datetime(end_date) + pd.Timedelta(days=1) if end_date else None
+
+    partials = []
+    if not variables:
+        return pd.DataFrame()
+    reader = pd.read_csv(
+        filepath,
+        usecols=["date"] + variables,
+        parse_dates=["date"],
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        mask = pd.Series(True, index=chunk.index)
+        if start is not None:
+            mask &= chunk["date"] >= start
+        if end is not None:
+            mask &= chunk["date"] < end
+        chunk = chunk[mask]
+        if chunk.empty:
+            continue
+
+        if freq is None:
+            # A single group labelled with the start of the range
+            period = pd.Series(start, index=chunk.index, dtype="datetime64[ns]")
+        else:
+            period = chunk["date"].dt.to_period(freq).dt.start_time
+        grouped = chunk[variables].groupby(period.rename("period"), dropna=False)
+        partials.append(grouped.agg(["sum", "count", "min", "max"]))
+
+    if not partials:
+        return pd.DataFrame()
+
+    # Combine the chunk partials into the partials of the file
+    stacked = pd.concat(partials)
+    grouped = stacked.groupby(level=0, dropna=False)
+
+    def columns(*statistics):
+        return [c for c in stacked.columns if c[1] in statistics]
+
+    return pd.concat(
+        [
+            grouped[columns("sum", "count")].sum(),
+            grouped[columns("min")].min(),
+            grouped[columns("max")].max(),
+        ],
+        axis=1,
+    )
+
+
+def query_weather(
+    cities: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    variables: Optional[List[str]] = None,
+    freq: Optional[str] = "D",
+    aggregates: Sequence[str] = ("mean",),
+    max_workers: Optional[int] = None,
+    chunksize: int = 100_000,
+) -> pd.DataFrame:
+    """
+    Aggregate weather variables over the whole store without loading it in memory.
+
+    Files are scanned in parallel threads, each in chunks of `chunksize` rows,
+    and only the per-period aggregates are kept. Grid cells shared by several
+    requested cities are scanned once.
+
+    Args:
+        cities: City names to include, all indexed cities if None
+        start_date: First day in 'YYYY-MM-DD' format, unbounded if None
+        end_date: Last day (inclusive) in 'YYYY-MM-DD' format, unbounded if None
+        variables: Weather variables to aggregate, all stored ones if None
+        freq: Pandas period alias of the groups ('D' daily, 'M' monthly, ...),
+            None to aggregate over the whole range
+        aggregates: Any of 'mean', 'min', 'max', 'sum' and 'count'
+        max_workers: Number of scanning threads
+        chunksize: Rows read at once from each file
+
+    Returns:
+        DataFrame with 'city' and 'period' columns and one '<variable>_<aggregate>'
+        column per requested aggregate
+    """
+    unknown = set(aggregates) - set(AGGREGATES)
+    if unknown:
+        raise ValueError(f"Unknown aggregates {sorted(unknown)}, expected {AGGREGATES}")
+
+    files = resolve_store_files(cities)
+    if not files:
+        return pd.DataFrame(columns=["city", "period"])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scans = executor.map(
+            lambda f: scan_file(f, variables, start_date, end_date, freq, chunksize),
+            files,
+        )
+        results = []
+        for (filepath, served), partial in zip(files.items(), scans):
+            if partial.empty:
+                continue
+            reduced = pd.DataFrame(index=partial.index)
+            for variable in partial.columns.get_level_values(0).unique():
+                for aggregate in aggregates:
+                    if aggregate == "mean":
+                        values = (
+                            partial[(variable, "sum")] / partial[(variable, "count")]
+                        )
+                    else:
+                        values = partial[(variable, aggregate)]
+                    reduced[f"{variable}_{aggregate}"] = values
+            reduced = reduced.reset_index()
+            for city_name in served:
+                results.append(reduced.assign(city=city_name))
+
+    if not results:
+        return pd.DataFrame(columns=["city", "period"])
+
+    result = pd.concat(results, ignore_index=True)
+    columns = ["city", "period"] + [
+        c for c in result.columns if c not in ("city", "period")
+    ]
+    return result[columns].sort_values(["city", "period"], ignore_index=True)
@@ -0,0 +1,322 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Open-Meteo free tier quotas as (calls, period in seconds)
+DEFAULT_LIMITS = [(600, 60), (5000, 3600), (10000, 86400)]
+
+# Wait used after a 429 when the server does not send a Retry-After header
+DEFAULT_RETRY_AFTER = 60.0
+
+# Share of the gap to a slower call the latency baseline rises by, so a single
+# unusually fast call does not hold concurrency down for the rest of the run
+BASELINE_DRIFT = 0.05
+
+_local = threading.local()
+
+
+def estimate_request_cost(n_variables: int, n_days: int) -> float:
+    """
+    Estimate how many API calls a request counts as against the quota.
+
+    Open-Meteo weights requests with more than 10 variables or more than
+    2 weeks of data as several calls.
+    """
+    return max(n_variables / 10, 1.0) * max(n_days / 14, 1.0)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds. Returns None if unusable."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def record_response(response, *args, **kwargs):
+    """
+    Response hook recording the status of the last HTTP response on this thread.
+
+    Registered on the session by `setup_openmeteo_client` so the scheduler can
+    see 429s and Retry-After headers that the Open-Meteo client hides behind
+    its own exception.
+    """
+    _local.last_response = {
+        "status": response.status_code,
+        "retry_after": parse_retry_after(response.headers.get("Retry-After")),
+        "from_cache": getattr(response, "from_cache", False),
+    }
+    return response
+
+
+def _pop_last_response() -> Optional[dict]:
+    last = getattr(_local, "last_response", None)
+    _local.last_response = None
+    return last
+
+
+class RateLimitedError(Exception):
+    """Raised when a job is still rate limited after all its retries."""
+
+
+class TokenBucket:
+    """Token bucket allowing `capacity` calls per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds to wait before `cost` tokens are available."""
+        self._refill(now)
+        missing = min(cost, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def consume(self, cost: float, now: float):
+        self._refill(now)
+        self.tokens -= min(cost, self.capacity)
+
+    def refund(self, cost: float):
+        self.tokens = min(self.capacity, self.tokens + min(cost, self.capacity))
+
+
+class RequestScheduler:
+    """
+    Queue of API fetch jobs executed under a per minute/hour/day call budget.
+
+    Jobs are started in submission order. Concurrency starts at
+    `initial_concurrency` and is tuned with additive increase / multiplicative
+    decrease: it grows while latency stays close to a baseline that follows the
+    fastest recent API calls, and is halved on errors and rate limiting. Cache
+    hits are left out of the latency statistics. A 429 pauses the whole queue
+    for the Retry-After delay and the job is re-run.
+    """
+
+    def __init__(
+        self,
+        limits: List[Tuple[float, float]] = DEFAULT_LIMITS,
+        initial_concurrency: int = 1,
+        max_concurrency: int = 8,
+        latency_tolerance: float = 2.0,
+        max_retries: int = 3,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.buckets = [TokenBucket(calls, period) for calls, period in limits]
+        self.concurrency = max(1, min(initial_concurrency, max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self._sleep = sleep
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._workers: List[threading.Thread] = []
+        self._paused_until = 0.0
+
+        self._best_latency = math.inf
+        self._ewma_latency = None
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "cache_hits": 0,
+            "throttle_time": 0.0,
+        }
+
+    # * Public API
+
+    def submit(self, func: Callable, *args, cost: float = 1.0, **kwargs) -> Future:
+        """Queue `func(*args, **kwargs)` and return a Future for its result."""
+        future = Future()
+        with self._condition:
+            self._queue.append((future, func, args, kwargs, cost, 0))
+            self._stats["submitted"] += 1
+            self._ensure_workers()
+            self._condition.notify_all()
+        return future
+
+    def map(
+        self, func: Callable, jobs: List[tuple], costs: Optional[List[float]] = None
+    ):
+        """Submit `func(*job)` for every job and return the results in job order."""
+        costs = costs or [1.0] * len(jobs)
+        futures = [self.submit(func, *job, cost=c) for job, c in zip(jobs, costs)]
+        return [future.result() for future in futures]
+
+    def metrics(self) -> Dict[str, float]:
+        """Snapshot of queue depth, throttling and latency counters."""
+        with self._condition:
+            metrics = dict(self._stats)
+            metrics["queue_depth"] = len(self._queue)
+            metrics["in_flight"] = self._in_flight
+            metrics["concurrency"] = self.concurrency
+            metrics["latency_ewma"] = self._ewma_latency
+            metrics["error_rate"] = (
+                metrics["failed"] / metrics["completed"]
+                if metrics["completed"]
+                else 0.0
+            )
+        return metrics
+
+    # * Internals
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(target=self._worker, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self):
+        with self._condition:
+            while not self._queue or self._in_flight >= self.concurrency:
+                self._condition.wait()
+            job = self._queue.popleft()
+            self._in_flight += 1
+            return job
+
+    def _acquire_budget(self, cost: float):
+        """Block until every bucket has `cost` tokens and the queue is not paused."""
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                wait = max(
+                    [self._paused_until - now]
+                    + [bucket.wait_time(cost, now) for bucket in self.buckets]
+                )
+                if wait <= 0:
+                    for bucket in self.buckets:
+                        bucket.consume(cost, now)
+                    return
+                self._stats["throttle_time"] += wait
+            self._sleep(wait)
+
+    def _worker(self):
+        while True:
+            future, func, args, kwargs, cost, attempt = self._next_job()
+            if not future.set_running_or_notify_cancel():
+                self._finish_job()
+                continue
+
+            self._acquire_budget(cost)
+            _pop_last_response()
+            started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+                error = None
+            except Exception as e:
+                result, error = None, e
+            latency = time.monotonic() - started
+            last = _pop_last_response()
+
+            if last is not None and last["status"] == 429:
+                self._on_rate_limited(last["retry_after"])
+                if attempt < self.max_retries:
+                    self._requeue(future, func, args, kwargs, cost, attempt + 1)
+                    continue
+                error = error or RateLimitedError(
+                    "Request still rate limited after retries"
+                )
+
+            from_cache = last is not None and last["from_cache"]
+            if from_cache:
+                with self._condition:
+                    self._stats["cache_hits"] += 1
+                    for bucket in self.buckets:
+                        bucket.refund(cost)
+
+            self._on_done(latency, error is not None, from_cache)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _finish_job(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _requeue(self, future, func, args, kwargs, cost, attempt):
+        # Re-run the job first, the caller holds the Future so it cannot be swapped
+        with self._condition:
+            self._queue.appendleft(
+                (_RetryFuture(future), func, args, kwargs, cost, attempt)
+            )
+            self._stats["retried"] += 1
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_rate_limited(self, retry_after: Optional[float]):
+        delay = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+        with self._condition:
+            self._stats["rate_limited"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.concurrency = max(1, self.concurrency // 2)
+
+    def _on_done(self, latency: float, failed: bool, from_cache: bool = False):
+        with self._condition:
+            self._in_flight -= 1
+            self._stats["completed"] += 1
+            if failed:
+                self._stats["failed"] += 1
+                self.concurrency = max(1, self.concurrency // 2)
+            elif not from_cache:
+                # Cache hits never reach the API and say nothing about its load
+                if latency < self._best_latency:
+                    self._best_latency = latency
+                else:
+                    self._best_latency += BASELINE_DRIFT * (
+                        latency - self._best_latency
+                    )
+                self._ewma_latency = (
+                    latency
+                    if self._ewma_latency is None
+                    else 0.8 * self._ewma_latency + 0.2 * latency
+                )
+                if self._ewma_latency <= self.latency_tolerance * self._best_latency:
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                else:
+                    self.concurrency = max(1, self.concurrency - 1)
+            self._condition.notify_all()
+
+
+class _RetryFuture:
+    """Wraps an already running Future so a retried job can be run again."""
+
+    def __init__(self, future: Future):
+        self._future = future
+
+    def set_running_or_notify_cancel(self) -> bool:
+        return True
+
+    def set_result(self, result):
+        self._future.set_result(result)
+
+    def set_exception(self, exception):
+        self._future.set_exception(exception)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler() -> RequestScheduler:
+    """Process-wide scheduler so every city shares the same API budget."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
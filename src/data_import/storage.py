@@ -0,0 +1,111 @@
+import io
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from typing import IO, Callable, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def get_data_dir(*parts: str) -> str:
+    """Root of the local data store, overridden by the WEATHER_DATA_DIR variable."""
+    return os.path.join(os.environ.get("WEATHER_DATA_DIR", "data"), *parts)
+
+
+def get_file_version(filepath: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identify the committed version of a file, None if it does not exist.
+
+    Commits replace the file, so the inode changes on every commit even when
+    size and modification time look the same.
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def read_csv_tail(filepath: str, n_rows: int, block_size: int = 1 << 16, **kwargs):
+    """
+    Read the header and the last `n_rows` rows of a CSV file.
+
+    The file is read backwards in blocks until enough lines are found, so the
+    cost depends on `n_rows` and not on the size of the file. Extra keyword
+    arguments are passed to `pd.read_csv`.
+    """
+    with open(filepath, "rb") as f:
+        header = f.readline()
+        body_start = f.tell()
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        # One more line break than rows, the first line read may be cut
+        while position > body_start and tail.count(b"\n") <= n_rows:
+            size = min(block_size, position - body_start)
+            position -= size
+            f.seek(position)
+            tail = f.read(size) + tail
+
+    lines = tail.splitlines()[-n_rows:] if n_rows > 0 else []
+    return pd.read_csv(io.BytesIO(header + b"\n".join(lines)), **kwargs)
+
+
+def _atomic_write(filepath: str, write: Callable[[IO], None]):
+    """
+    Write a file so readers only ever see a complete version.
+
+    The content is written and fsynced to a temporary file in the same
+    directory, then renamed over the target in a single atomic step.
+    """
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_csv(data: pd.DataFrame, filepath: str):
+    """Atomically write a DataFrame to CSV."""
+    _atomic_write(filepath, lambda f: data.to_csv(f, index=False))
+
+
+def atomic_write_json(obj, filepath: str):
+    """Atomically write an object as JSON."""
+    _atomic_write(filepath, lambda f: json.dump(obj, f, indent=2, sort_keys=True))
+
+
+@contextmanager
+def file_lock(filepath: str):
+    """
+    Exclusive advisory lock on `<filepath>.lock`, shared by processes and threads.
+
+    Only writers take the lock: readers rely on atomic commits and read the
+    last committed file without waiting.
+    """
+    with open(f"{filepath}.lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,383 @@
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .grid import DEFAULT_GRID_RESOLUTION, get_cell, get_cell_file_path, register_city
+from .storage import atomic_write_csv
+from .validation import DEFAULT_RANGES
+
+# Variables the generator can produce, a subset of the Open-Meteo hourly variables
+SYNTHETIC_VARIABLES = (
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "surface_pressure",
+    "wind_speed_10m",
+)
+
+# Values far outside the physical range of each variable, used for corrupt rows
+_CORRUPT_VALUES = {
+    "temperature_2m": 999.0,
+    "relative_humidity_2m": -50.0,
+    "precipitation": -1.0,
+    "surface_pressure": 0.0,
+    "wind_speed_10m": -10.0,
+}
+
+_MASK = (1 << 64) - 1
+
+
+def _location_key(seed: int, latitude: float, longitude: float) -> int:
+    key = seed
+    for part in (round(latitude * 1e4), round(longitude * 1e4)):
+        key = (key * 1_000_003 + part) & _MASK
+    return key
+
+
+def _hash_uniform(key: int, stream: int, index: np.ndarray) -> np.ndarray:
+    """
+    Uniform noise in (0, 1) that only depends on (key, stream, index).
+
+    Counter-based (splitmix64) rather than a sequential generator, so a given
+    hour gets the same value whatever range it is generated in.
+    """
+    offset = np.uint64((key * 0x9E3779B97F4A7C15 + stream * 0xD1B54A32D192ED03) & _MASK)
+    z = index.astype(np.uint64) * np.uint64(0xBF58476D1CE4E5B9) + offset
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return ((z >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0**53
+
+
+def _hash_normal(key: int, stream: int, index: np.ndarray) -> np.ndarray:
+    # Box-Muller transform of two independent uniform streams
+    u1 = _hash_uniform(key, 2 * stream, index)
+    u2 = _hash_uniform(key, 2 * stream + 1, index)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def make_cities(n_cities: int, n_regions: int = 4, seed: int = 0) -> List[dict]:
+    """
+    Cities with 'name', 'latitude', 'longitude' and 'region' keys.
+
+    Regions are clustered around their own centre so cities of a region often
+    share grid cells.
+    """
+    rng = np.random.default_rng(seed)
+    centres = np.column_stack(
+        [rng.uniform(-50, 60, n_regions), rng.uniform(-120, 140, n_regions)]
+    )
+    regions = rng.integers(0, n_regions, n_cities)
+    offsets = rng.normal(0, 1.0, (n_cities, 2))
+    return [
+        {
+            "name": f"City {i:04d}",
+            "latitude": round(float(centres[r, 0] + offsets[i, 0]), 4),
+            "longitude": round(float(centres[r, 1] + offsets[i, 1]), 4),
+            "region": f"Region {r}",
+        }
+        for i, r in enumerate(regions)
+    ]
+
+
+def _clean_weather(
+    dates: pd.DatetimeIndex,
+    latitude: float,
+    longitude: float,
+    variables: Sequence[str],
+    seed: int,
+) -> dict:
+    key = _location_key(seed, latitude, longitude)
+    hours = dates.to_numpy().astype("datetime64[h]").astype(np.int64)
+    days = hours // 24
+    hour_of_day = dates.hour.to_numpy()
+    day_of_year = dates.dayofyear.to_numpy()
+
+    # Colder towards the poles, seasons reversed in the southern hemisphere
+    base = 28.0 - 0.45 * abs(latitude)
+    annual = (
+        np.sign(latitude or 1.0)
+        * 0.25
+        * abs(latitude)
+        * np.cos(2 * np.pi * (day_of_year - 200) / 365.25)
+    )
+    daily = 5.0 * np.cos(2 * np.pi * (hour_of_day - 15) / 24)
+    anomaly = 2.0 * _hash_normal(key, 0, days)
+    temperature = base + annual + daily + anomaly + 0.5 * _hash_normal(key, 1, hours)
+
+    wet_day = _hash_uniform(key, 4, days) < 0.25
+    rain_hour = _hash_uniform(key, 5, hours) < 0.3
+    rain = -np.log(_hash_uniform(key, 6, hours))
+
+    generated = {
+        "temperature_2m": temperature,
+        "relative_humidity_2m": np.clip(
+            65.0 - 1.5 * (daily + anomaly) + 8.0 * _hash_normal(key, 2, hours), 0, 100
+        ),
+        "precipitation": np.where(wet_day & rain_hour, np.round(rain, 1), 0.0),
+        "surface_pressure": 1013.0
+        + 6.0 * _hash_normal(key, 3, days)
+        + 0.5 * _hash_normal(key, 7, hours),
+        "wind_speed_10m": 12.0 * (-np.log(_hash_uniform(key, 8, hours))) ** 0.7,
+    }
+    return {variable: generated[variable] for variable in variables}
+
+
+def make_weather(
+    city: dict,
+    start_date: str,
+    end_date: str,
+    variables: Sequence[str] = SYNTHETIC_VARIABLES[:3],
+    seed: int = 0,
+    gap_rate: float = 0.0,
+    duplicate_rate: float = 0.0,
+    corrupt_rate: float = 0.0,
+    mean_gap_hours: float = 12.0,
+) -> pd.DataFrame:
+    """
+    Hourly weather of a city between two days (inclusive), deterministic from a seed.
+
+    Clean values depend only on the seed, the coordinates and the hour, so any
+    two ranges agree on their overlap, like two fetches of the real API.
+    Defects are then drawn for the range from the same seed.
+
+    Args:
+        city: Dictionary with 'name', 'latitude', and 'longitude'
+        start_date: First day in 'YYYY-MM-DD' format
+        end_date: Last day (inclusive) in 'YYYY-MM-DD' format
+        variables: Any of SYNTHETIC_VARIABLES
+        seed: Seed of the values and of the defects
+        gap_rate: Fraction of hours removed, in runs of `mean_gap_hours` on average
+        duplicate_rate: Fraction of rows repeated with slightly different values
+        corrupt_rate: Fraction of rows with a physically impossible value
+
+    Returns:
+        DataFrame with 'date', the variables and 'city', sorted by date with
+        duplicates next to their original row
+    """
+    unknown = set(variables) - set(SYNTHETIC_VARIABLES)
+    if unknown:
+        raise ValueError(
+            f"Cannot generate {sorted(unknown)}, expected {SYNTHETIC_VARIABLES}"
+        )
+
+    dates = pd.date_range(
+        pd.to_datetime(start_date),
+        pd.to_datetime(end_date) + pd.Timedelta(hours=23),
+        freq="h",
+    )
+    data = pd.DataFrame(
+        {
+            "date": dates,
+            **_clean_weather(
+                dates, city["latitude"], city["longitude"], variables, seed
+            ),
+        }
+    )
+    n_rows = len(data)
+    rng = np.random.default_rng(
+        [seed, _location_key(seed, city["latitude"], city["longitude"]) & 0xFFFFFFFF]
+    )
+
+    if gap_rate > 0 and n_rows:
+        keep = np.ones(n_rows, dtype=bool)
+        n_gaps = max(int(gap_rate * n_rows / mean_gap_hours), 1)
+        starts = rng.integers(0, n_rows, n_gaps)
+        lengths = rng.geometric(1 / mean_gap_hours, n_gaps)
+        for start, length in zip(starts, lengths):
+            keep[start : start + length] = False
+        data = data[keep]
+
+    if duplicate_rate > 0 and len(data):
+        repeated = data[rng.random(len(data)) < duplicate_rate].copy()
+        for variable in variables:
+            low, high = DEFAULT_RANGES[variable]
+            noise = rng.normal(0, 0.1, len(repeated))
+            repeated[variable] = (repeated[variable] + noise).clip(low, high)
+        data = pd.concat([data, repeated]).sort_values("date", kind="mergesort")
+        data = data.reset_index(drop=True)
+
+    if corrupt_rate > 0 and len(data):
+        corrupt = np.flatnonzero(rng.random(len(data)) < corrupt_rate)
+        columns = rng.integers(0, len(variables), len(corrupt))
+        for j, variable in enumerate(variables):
+            data.loc[corrupt[columns == j], variable] = _CORRUPT_VALUES[variable]
+
+    data["city"] = city["name"]
+    return data.reset_index(drop=True)
+
+
+def make_target(
+    start_date: str,
+    end_date: str,
+    seed: int = 0,
+    level: float = 1000.0,
+    gap_rate: float = 0.0,
+    duplicate_rate: float = 0.0,
+    outlier_rate: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Daily target with trend, weekly and yearly seasonality, deterministic from a seed.
+
+    Returns a DataFrame with 'date' and 'y' columns, like `import_y`.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, end_date, freq="D")
+    t = np.arange(len(dates))
+    y = (
+        level
+        + 0.05 * t
+        + 0.1 * level * np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 20) / 365.25)
+        - 0.05 * level * (dates.dayofweek.to_numpy() >= 5)
+        + rng.normal(0, 0.02 * level, len(dates))
+    )
+    data = pd.DataFrame({"date": dates, "y": np.round(y, 2)})
+
+    if outlier_rate > 0:
+        outliers = rng.random(len(data)) < outlier_rate
+        data.loc[outliers, "y"] *= rng.choice([-1.0, 10.0], outliers.sum())
+    if gap_rate > 0:
+        data = data[rng.random(len(data)) >= gap_rate]
+    if duplicate_rate > 0:
+        repeated = data[rng.random(len(data)) < duplicate_rate]
+        data = pd.concat([data, repeated]).sort_values("date", kind="mergesort")
+    return data.reset_index(drop=True)
+
+
+def write_target_csv(
+    filepath: str,
+    data: pd.DataFrame,
+    corrupt_rate: float = 0.0,
+    seed: int = 0,
+) -> str:
+    """
+    Write a target in the raw format read by `import_y`: ';' separated, D/M/Y dates.
+
+    `corrupt_rate` of the rows get a non-numeric value or a malformed date,
+    which `import_y` rejects.
+    """
+    rng = np.random.default_rng(seed)
+    dates = data["date"].dt.strftime("%d/%m/%Y").to_numpy(dtype=object)
+    values = data["y"].map(repr).to_numpy(dtype=object)
+
+    corrupt = np.flatnonzero(rng.random(len(data)) < corrupt_rate)
+    bad_date = rng.random(len(corrupt)) < 0.5
+    dates[corrupt[bad_date]] = (
+        data["date"].iloc[corrupt[bad_date]].dt.strftime("%Y-%m-%d").to_numpy()
+    )
+    values[corrupt[~bad_date]] = "n/a"
+
+    with open(filepath, "w") as f:
+        f.write("date;value\n")
+        f.writelines(f"{d};{v}\n" for d, v in zip(dates, values))
+    return filepath
+
+
+def write_weather_store(
+    cities: List[dict],
+    start_date: str,
+    end_date: str,
+    variables: Sequence[str] = SYNTHETIC_VARIABLES[:3],
+    seed: int = 0,
+    gap_rate: float = 0.0,
+    duplicate_rate: float = 0.0,
+    corrupt_rate: float = 0.0,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> List[str]:
+    """
+    Fill the weather store (under WEATHER_DATA_DIR) as if the cities were fetched.
+
+    Cities are registered in the grid index and every cell is written once.
+    Returns the paths of the cell files.
+    """
+    filepaths = {}
+    for city in cities:
+        cell = get_cell(city, grid_resolution)
+        register_city(city, cell)
+        if cell["name"] in filepaths:
+            continue
+        data = make_weather(
+            cell,
+            start_date,
+            end_date,
+            variables,
+            seed,
+            gap_rate=gap_rate,
+            duplicate_rate=duplicate_rate,
+            corrupt_rate=corrupt_rate,
+        )
+        filepath = get_cell_file_path(cell)
+        atomic_write_csv(data.drop(columns="city"), filepath)
+        filepaths[cell["name"]] = filepath
+    return list(filepaths.values())
+
+
+class _Variable:
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def ValuesAsNumpy(self) -> np.ndarray:
+        return self._values
+
+
+class _Hourly:
+    def __init__(self, columns: List[np.ndarray]):
+        self._columns = columns
+
+    def Variables(self, index: int) -> _Variable:
+        return _Variable(self._columns[index])
+
+
+class _Response:
+    def __init__(self, columns: List[np.ndarray]):
+        self._hourly = _Hourly(columns)
+
+    def Hourly(self) -> _Hourly:
+        return self._hourly
+
+
+class SyntheticOpenMeteoClient:
+    """
+    Stand-in for the Open-Meteo client serving `make_weather` data.
+
+    Answers the same values as the store written by `write_weather_store`
+    for the same seed. `latency` seconds are spent per call and a
+    `failure_rate` fraction of calls raise ConnectionError, drawn from the
+    seed, to stress the fetch layer without network access.
+    """
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, failure_rate: float = 0.0):
+        self.seed = seed
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = []
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def weather_api(self, url, params=None, **kwargs):
+        with self._lock:
+            self.calls.append({"url": url, "params": params})
+            failed = self._rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("Synthetic API failure")
+
+        dates = pd.date_range(
+            pd.to_datetime(params["start_date"]),
+            pd.to_datetime(params["end_date"]) + pd.Timedelta(hours=23),
+            freq="h",
+        )
+        # Multi-location calls pass lists of coordinates, one response each
+        latitudes = np.atleast_1d(params["latitude"])
+        longitudes = np.atleast_1d(params["longitude"])
+        responses = []
+        for latitude, longitude in zip(latitudes, longitudes):
+            values = _clean_weather(
+                dates, float(latitude), float(longitude), params["hourly"], self.seed
+            )
+            responses.append(_Response([values[v] for v in params["hourly"]]))
+        return responses
@@ -0,0 +1,249 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from .storage import atomic_write_csv, atomic_write_json, file_lock, get_data_dir
+
+# Physically possible values of the Open-Meteo hourly variables
+DEFAULT_RANGES = {
+    "temperature_2m": (-90.0, 60.0),
+    "apparent_temperature": (-100.0, 70.0),
+    "dew_point_2m": (-100.0, 40.0),
+    "relative_humidity_2m": (0.0, 100.0),
+    "precipitation": (0.0, 500.0),
+    "rain": (0.0, 500.0),
+    "snowfall": (0.0, 100.0),
+    "cloud_cover": (0.0, 100.0),
+    "surface_pressure": (300.0, 1100.0),
+    "pressure_msl": (850.0, 1100.0),
+    "wind_speed_10m": (0.0, 400.0),
+    "wind_direction_10m": (0.0, 360.0),
+    "shortwave_radiation": (0.0, 1500.0),
+}
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Runs of True along the rows of a 2D mask.
+
+    Returns the row of every run with its start and end (exclusive) column,
+    ordered by row then start.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def _step(freq: str) -> np.timedelta64:
+    return pd.Timedelta(to_offset(freq).nanos, unit="ns").to_timedelta64()
+
+
+def _timestamp(value) -> str:
+    return str(pd.Timestamp(value))
+
+
+def _day_ranges(dates: np.ndarray) -> List[Tuple[str, str]]:
+    """Group timestamps into runs of consecutive days in 'YYYY-MM-DD' format."""
+    if len(dates) == 0:
+        return []
+    days = np.unique(dates.astype("datetime64[D]"))
+    breaks = np.flatnonzero(np.diff(days) > np.timedelta64(1, "D"))
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(days) - 1]))
+    return [(str(days[s]), str(days[e])) for s, e in zip(starts, ends)]
+
+
+def nan_run_stats(values: np.ndarray, names: List[str]) -> Dict[str, dict]:
+    """Number of NaNs and length statistics of the NaN runs of every column."""
+    isnan = np.isnan(values)
+    columns, starts, ends = _runs(isnan.T)
+    lengths = ends - starts
+
+    stats = {}
+    for j, name in enumerate(names):
+        run_lengths = lengths[columns == j]
+        stats[name] = {
+            "nan_count": int(isnan[:, j].sum()),
+            "nan_runs": int(len(run_lengths)),
+            "max_nan_run": int(run_lengths.max()) if len(run_lengths) else 0,
+            "mean_nan_run": float(run_lengths.mean()) if len(run_lengths) else 0.0,
+        }
+    return stats
+
+
+def validate_weather(
+    data: pd.DataFrame,
+    variables: Optional[List[str]] = None,
+    ranges: Dict[str, Tuple[float, float]] = DEFAULT_RANGES,
+    freq: str = "h",
+) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Check an hourly weather frame and split off the rows that fail.
+
+    All checks run vectorized over the date and value arrays: duplicated
+    and missing hours, NaN runs, and values outside the physical range of
+    their variable. Duplicated hours keep their last row.
+
+    Returns:
+        The clean rows, the quarantined rows with a 'reason' column, and a
+        quality report listing the day ranges worth re-fetching
+    """
+    if variables is None:
+        variables = [c for c in data.columns if c not in ("date", "city")]
+    step = _step(freq)
+
+    data = data.sort_values("date", kind="mergesort")
+    dates = data["date"].to_numpy()
+    values = data[variables].to_numpy(dtype=float)
+
+    # Duplicated timestamps: every occurrence but the last one fails
+    duplicated = np.zeros(len(dates), dtype=bool)
+    duplicated[:-1] = dates[:-1] == dates[1:]
+
+    # Missing timestamps between consecutive rows
+    gaps = np.diff(dates)
+    gap_rows = np.flatnonzero(gaps > step)
+    missing_ranges = [
+        (_timestamp(dates[i] + step), _timestamp(dates[i + 1] - step)) for i in gap_rows
+    ]
+
+    # Physically impossible values, NaN compares False and is reported separately
+    bounds = np.array([ranges.get(v, (-np.inf, np.inf)) for v in variables])
+    out_of_range = (values < bounds[:, 0]) | (values > bounds[:, 1])
+    invalid = out_of_range.any(axis=1)
+
+    failing = duplicated | invalid
+    reason = np.where(duplicated, "duplicated_date", "out_of_range")
+    quarantined = data[failing].assign(reason=reason[failing])
+    clean = data[~failing]
+
+    nan_rows = np.isnan(values).any(axis=1)
+    report = {
+        "rows": int(len(dates)),
+        "start": _timestamp(dates[0]) if len(dates) else None,
+        "end": _timestamp(dates[-1]) if len(dates) else None,
+        "duplicated_rows": int(duplicated.sum()),
+        "missing_timestamps": int((gaps[gap_rows] // step - 1).sum()),
+        "missing_ranges": missing_ranges,
+        "out_of_range": {
+            v: int(n) for v, n in zip(variables, out_of_range.sum(axis=0))
+        },
+        "nan": nan_run_stats(values, variables),
+        "quarantined_rows": int(failing.sum()),
+        # Days with holes, impossible values or NaNs can be re-fetched selectively
+        "refetch_ranges": _day_ranges(
+            np.concatenate(
+                [
+                    dates[invalid | nan_rows],
+                    dates[gap_rows] + step,
+                    dates[gap_rows + 1] - step,
+                ]
+            )
+        ),
+    }
+    return clean, quarantined, report
+
+
+def validate_target(
+    data: pd.DataFrame,
+    z_threshold: float = 5.0,
+    freq: Optional[str] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Check the target series returned by `import_y` and split off failing rows.
+
+    Outliers are detected with a robust z-score (distance to the median in
+    units of median absolute deviation). The frequency is inferred from the
+    most common step between dates when not given.
+
+    Returns:
+        The clean rows, the quarantined rows with a 'reason' column, and a
+        quality report
+    """
+    data = data.sort_values("date", kind="mergesort")
+    dates = data["date"].to_numpy()
+    y = data["y"].to_numpy(dtype=float)
+
+    gaps = np.diff(dates)
+    if freq is not None:
+        step = _step(freq)
+    elif len(gaps):
+        values, counts = np.unique(
+            gaps[gaps > np.timedelta64(0, "ns")], return_counts=True
+        )
+        step = values[counts.argmax()] if len(values) else np.timedelta64(1, "D")
+    else:
+        step = np.timedelta64(1, "D")
+
+    duplicated = np.zeros(len(dates), dtype=bool)
+    duplicated[:-1] = dates[:-1] == dates[1:]
+    gap_rows = np.flatnonzero(gaps > step)
+
+    median = np.nanmedian(y) if len(y) else np.nan
+    mad = np.nanmedian(np.abs(y - median)) if len(y) else np.nan
+    # 1.4826 scales the MAD to the standard deviation of a normal distribution
+    scale = 1.4826 * mad if mad > 0 else np.nan
+    robust_z = np.abs(y - median) / scale
+    outliers = robust_z > z_threshold
+
+    failing = duplicated | outliers
+    reason = np.where(duplicated, "duplicated_date", "outlier")
+    quarantined = data[failing].assign(reason=reason[failing])
+
+    report = {
+        "rows": int(len(dates)),
+        "start": _timestamp(dates[0]) if len(dates) else None,
+        "end": _timestamp(dates[-1]) if len(dates) else None,
+        "step": str(pd.Timedelta(step)),
+        "duplicated_rows": int(duplicated.sum()),
+        "missing_timestamps": int((gaps[gap_rows] // step - 1).sum()),
+        "missing_ranges": [
+            (_timestamp(dates[i] + step), _timestamp(dates[i + 1] - step))
+            for i in gap_rows
+        ],
+        "nan": nan_run_stats(y[:, None], ["y"])["y"],
+        "outliers": int(outliers.sum()),
+        "quarantined_rows": int(failing.sum()),
+    }
+    return data[~failing], quarantined, report
+
+
+def get_quality_paths(name: str) -> Tuple[str, str]:
+    """Quarantine CSV and JSON report paths of a city, cell or series."""
+    data_dir = get_data_dir("quality")
+    os.makedirs(data_dir, exist_ok=True)
+    slug = name.lower().replace(" ", "_")
+    return (
+        os.path.join(data_dir, f"{slug}_quarantine.csv"),
+        os.path.join(data_dir, f"{slug}_report.json"),
+    )
+
+
+def write_quality_outputs(
+    name: str,
+    quarantined: pd.DataFrame,
+    report: Optional[dict] = None,
+):
+    """
+    Append quarantined rows to the quarantine file, write the quality report if given.
+
+    Quarantined rows already present for the same date and reason are replaced.
+    """
+    quarantine_path, report_path = get_quality_paths(name)
+    with file_lock(quarantine_path):
+        if not quarantined.empty:
+            if os.path.exists(quarantine_path):
+                previous = pd.read_csv(quarantine_path, parse_dates=["date"])
+                quarantined = pd.concat([previous, quarantined], ignore_index=True)
+                quarantined = quarantined.drop_duplicates(
+                    subset=["date", "reason"], keep="last"
+                )
+            atomic_write_csv(quarantined, quarantine_path)
+        if report is not None:
+            atomic_write_json(report, report_path)
@@ -1,23 +1,47 @@
 import openmeteo_requests
-import requests_cache
+import numpy as np
 import pandas as pd
 import os
+from concurrent.futures import as_completed
 from retry_requests import retry
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 from datetime import timedelta
 from pandas.errors import EmptyDataError, ParserError  # Import specific pandas errors
+from .cache import CacheConfig, create_cached_session, expire_after_for_range
+from .storage import atomic_write_csv, file_lock, get_data_dir, get_file_version
+from .validation import validate_weather, write_quality_outputs
+from .grid import (
+    DEFAULT_GRID_RESOLUTION,
+    check_cell_timezone,
+    get_cell,
+    get_cell_file_path,
+    register_city,
+)
+from .scheduler import (
+    RequestScheduler,
+    estimate_request_cost,
+    get_default_scheduler,
+    record_response,
+)
+
+
+def setup_openmeteo_client(cache_config: Optional[CacheConfig] = None):
+    """
+    Setup the Open-Meteo API client with cache and retry on error.
 
-
-def setup_openmeteo_client():
-    """Setup the Open-Meteo API client with cache and retry on error."""
-    cache_session = requests_cache.CachedSession(".cache", expire_after=3600)
+    The cache is configured from the OPENMETEO_CACHE_* environment variables
+    unless a CacheConfig is given.
+    """
+    cache_session = create_cached_session(cache_config or CacheConfig.from_env())
+    # Let the request scheduler see 429s and Retry-After headers
+    cache_session.hooks["response"].append(record_response)
     retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
     return openmeteo_requests.Client(session=retry_session)
 
 
 def get_file_path(city_name) -> str:
-    """Generate a standardized filename for storing weather data."""
-    data_dir = os.path.join("data", "weather")
+    """Generate the legacy per-city filename, superseded by grid cell files."""
+    data_dir = get_data_dir("weather")
     os.makedirs(data_dir, exist_ok=True)
     return os.path.join(
         data_dir,
@@ -61,6 +85,99 @@ def get_missing_date_ranges(
     ]
 
 
+def get_date_gaps(
+    city_weather: pd.DataFrame,
+    start_date,
+    end_date,
+) -> List[Tuple[str, str]]:
+    """Find the runs of days between start_date and end_date without any data."""
+    days = pd.date_range(
+        pd.to_datetime(start_date).normalize(),
+        pd.to_datetime(end_date).normalize(),
+        freq="D",
+    )
+    missing = ~days.isin(city_weather["date"].dt.normalize().unique())
+    return _day_runs(days, missing)
+
+
+def get_hour_gaps(
+    city_weather: pd.DataFrame,
+    start_date,
+    end_date,
+) -> List[Tuple[str, str]]:
+    """
+    Find the runs of days between start_date and end_date with hours missing
+    between two stored rows, e.g. rows quarantined when they were committed.
+    """
+    days = pd.date_range(
+        pd.to_datetime(start_date).normalize(),
+        pd.to_datetime(end_date).normalize(),
+        freq="D",
+    )
+    dates = np.unique(city_weather["date"].to_numpy())
+    step = np.timedelta64(1, "h")
+    gap_rows = np.flatnonzero(np.diff(dates) > step)
+    # Days of the first and last missing hour of every gap, and all days between
+    first_days = (dates[gap_rows] + step).astype("datetime64[D]")
+    last_days = (dates[gap_rows + 1] - step).astype("datetime64[D]")
+    day_values = days.to_numpy().astype("datetime64[D]")
+    touched = np.zeros(len(days), dtype=bool)
+    for first, last in zip(first_days, last_days):
+        touched |= (day_values >= first) & (day_values <= last)
+    return _day_runs(days, touched)
+
+
+def _day_runs(days: pd.DatetimeIndex, selected: np.ndarray) -> List[Tuple[str, str]]:
+    """Consecutive runs of the selected days as (start, end) date strings."""
+    if not selected.any():
+        return []
+    edges = np.diff(np.concatenate(([False], selected, [False])).astype(int))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1) - 1
+    return [
+        (days[i].strftime("%Y-%m-%d"), days[j].strftime("%Y-%m-%d"))
+        for i, j in zip(run_starts, run_ends)
+    ]
+
+
+def _merge_day_ranges(
+    start_date,
+    end_date,
+    ranges: List[Tuple[str, str]],
+) -> List[Tuple[str, str]]:
+    """Union of day ranges, clipped to start_date and end_date, as sorted runs."""
+    days = pd.date_range(
+        pd.to_datetime(start_date).normalize(),
+        pd.to_datetime(end_date).normalize(),
+        freq="D",
+    )
+    selected = np.zeros(len(days), dtype=bool)
+    for range_start, range_end in ranges:
+        selected |= (days >= pd.to_datetime(range_start)) & (
+            days <= pd.to_datetime(range_end)
+        )
+    return _day_runs(days, selected)
+
+
+def get_covered_ranges(
+    start_date: str,
+    end_date: str,
+    missing_ranges: List[Tuple[str, str]],
+) -> List[Tuple[str, str]]:
+    """Runs of days between start_date and end_date outside the missing ranges."""
+    days = pd.date_range(
+        pd.to_datetime(start_date).normalize(),
+        pd.to_datetime(end_date).normalize(),
+        freq="D",
+    )
+    covered = np.ones(len(days), dtype=bool)
+    for range_start, range_end in missing_ranges:
+        covered &= (days < pd.to_datetime(range_start)) | (
+            days > pd.to_datetime(range_end)
+        )
+    return _day_runs(days, covered)
+
+
 def get_dates_to_fetch(
     city_weather: Union[pd.DataFrame, None],
     start_date: str,
@@ -76,10 +193,79 @@ def get_dates_to_fetch(
     requested_end = pd.to_datetime(end_date)
     available_start = city_weather["date"].min()
     available_end = city_weather["date"].max()
-    return get_missing_date_ranges(
+    missing_ranges = get_missing_date_ranges(
         available_start, available_end, requested_start, requested_end
     )
 
+    # Chunks of an interrupted backfill can be committed out of order,
+    # so also look for holes inside the available range
+    overlap_start = max(available_start, requested_start)
+    overlap_end = min(available_end, requested_end)
+    if overlap_start <= overlap_end:
+        # Days missing entirely and days with missing hours, as one set of runs
+        gaps = get_date_gaps(city_weather, overlap_start, overlap_end)
+        gaps += get_hour_gaps(city_weather, overlap_start, overlap_end)
+        missing_ranges += _merge_day_ranges(overlap_start, overlap_end, gaps)
+
+    return sorted(missing_ranges)
+
+
+def get_fetch_jobs(
+    city_weather: Union[pd.DataFrame, None],
+    fetching_dates: List[Tuple[str, str]],
+    start_date: str,
+    end_date: str,
+    hourly_variables: List[str],
+) -> List[Tuple[Tuple[str, str], List[str]]]:
+    """
+    Pair the date ranges to fetch with the variables to fetch them with.
+
+    Missing days are fetched with every variable of the cell, including the
+    ones stored on behalf of other cities, to keep the cell complete. Stored
+    days only lack the requested variables the cell does not have yet.
+    """
+    # Variables stored for the cell, possibly on behalf of another city
+    stored_variables = (
+        []
+        if city_weather is None
+        else [col for col in city_weather.columns if col not in ("date", "city")]
+    )
+    missing_columns = [col for col in hourly_variables if col not in stored_variables]
+    all_variables = list(hourly_variables) + [
+        col for col in stored_variables if col not in hourly_variables
+    ]
+    jobs = [(date_range, all_variables) for date_range in fetching_dates]
+    if city_weather is not None and missing_columns:
+        covered = get_covered_ranges(start_date, end_date, fetching_dates)
+        jobs += [(date_range, missing_columns) for date_range in covered]
+    return jobs
+
+
+def split_date_range(
+    date_range: Tuple[str, str],
+    chunk_days: Optional[int] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Split a date range into fetch windows.
+
+    Windows follow calendar months by default, or span `chunk_days` days when given.
+    """
+    start = pd.to_datetime(date_range[0])
+    end = pd.to_datetime(date_range[1])
+
+    if chunk_days is None:
+        boundaries = pd.date_range(start, end, freq="MS")
+    else:
+        if chunk_days < 1:
+            raise ValueError("chunk_days must be at least 1.")
+        boundaries = pd.date_range(start, end, freq=f"{chunk_days}D")
+    starts = sorted(set(boundaries) | {start})
+    ends = [s - timedelta(days=1) for s in starts[1:]] + [end]
+
+    return [
+        (s.strftime("%Y-%m-%d"), e.strftime("%Y-%m-%d")) for s, e in zip(starts, ends)
+    ]
+
 
 def fetch_weather_city_from_api(
     city: dict,
@@ -99,8 +285,9 @@ def fetch_weather_city_from_api(
         "timezone": timezone,
     }
 
-    # Get weather data from the API
-    responses = openmeteo.weather_api(url, params=params)
+    # Get weather data from the API, past ranges never change so they are cached
+    expire_after = expire_after_for_range(date_range[1], CacheConfig.from_env())
+    responses = openmeteo.weather_api(url, params=params, expire_after=expire_after)
     response = responses[0]
     hourly = response.Hourly()
 
@@ -114,7 +301,13 @@ def fetch_weather_city_from_api(
 
     # Parse the response
     for j, variable in enumerate(hourly_variables):
-        hourly_data[variable] = hourly.Variables(j).ValuesAsNumpy()
+        values = hourly.Variables(j).ValuesAsNumpy()
+        if len(values) != len(date_range_all):
+            raise ValueError(
+                f"Expected {len(date_range_all)} hourly values for {variable}, "
+                f"got {len(values)}"
+            )
+        hourly_data[variable] = values
 
     # Add metadata
     hourly_data["city"] = city["name"]
@@ -122,33 +315,195 @@ def fetch_weather_city_from_api(
     return pd.DataFrame(data=hourly_data)
 
 
-def load_existing_data(city) -> Union[pd.DataFrame, None]:
+def _read_weather_file(filepath: str) -> Union[pd.DataFrame, None]:
+    """Read a stored weather file, None if it is missing, empty or unreadable."""
+    if not os.path.exists(filepath):
+        return None
+    try:
+        df = pd.read_csv(filepath, parse_dates=["date"])
+        # Check if dataframe is empty after loading
+        if df.empty:
+            print(f"Warning: File {filepath} is empty.")
+            return None
+        return df
+    except (EmptyDataError, ParserError) as e:
+        print(f"Error reading {filepath}: {e}. Treating as no existing data.")
+        return None
+    except Exception as e:  # Catch other potential read errors
+        print(
+            f"Unexpected error reading {filepath}: {e}. Treating as no existing data."
+        )
+        return None
+
+
+def load_existing_data(
+    city, grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION
+) -> Union[pd.DataFrame, None]:
     """
     Check if we already have data for this city.
+    Data is read from the grid cell serving the city, or from the legacy
+    per-city file when the cell has no data yet (see `migrate_legacy_data`).
     Returns the data if available, otherwise None.
     Handles potential file read errors.
     """
-    filepath = get_file_path(city["name"])
+    filepath = get_cell_file_path(get_cell(city, grid_resolution))
+    if not os.path.exists(filepath):
+        filepath = get_file_path(city["name"])
 
-    if os.path.exists(filepath):
-        try:
-            print(f"Loading data for {city['name']} from {filepath}")
-            df = pd.read_csv(filepath, parse_dates=["date"])
-            # Check if dataframe is empty after loading
-            if df.empty:
-                print(f"Warning: File {filepath} is empty.")
-                return None
-            return df
-        except (EmptyDataError, ParserError) as e:
-            print(f"Error reading {filepath}: {e}. Treating as no existing data.")
-            return None
-        except Exception as e:  # Catch other potential read errors
-            print(
-                f"Unexpected error reading {filepath}: {e}. Treating as no existing data."
+    if not os.path.exists(filepath):
+        return None
+    print(f"Loading data for {city['name']} from {filepath}")
+    df = _read_weather_file(filepath)
+    if df is not None:
+        # Cell data is shared, label it with the requested city
+        df["city"] = city["name"]
+    return df
+
+
+def merge_weather_data(
+    existing_data: Union[pd.DataFrame, None],
+    new_data: List[pd.DataFrame],
+) -> pd.DataFrame:
+    """
+    Combine stored data with new chunks, newer values winning on duplicated dates.
+
+    Chunks carrying every column replace the rows of their dates. Chunks may
+    also carry only some of the variables of a shared cell: then on a
+    duplicated date every column takes its newest non-missing value, so
+    stored columns a chunk does not carry are kept.
+    """
+    final_data = pd.concat([existing_data] + new_data, ignore_index=True)
+
+    # Sort and merge potential duplicates introduced by concatenation or overlap.
+    # The sort must be stable for the newest rows to come last on every date.
+    final_data = final_data.sort_values("date", kind="mergesort")
+    if not final_data["date"].duplicated().any():
+        return final_data.reset_index(drop=True)
+    columns = set(final_data.columns)
+    if all(set(chunk.columns) == columns for chunk in new_data):
+        # The column-wise groupby is about twice as slow, only pay for it when needed
+        return final_data.drop_duplicates(subset=["date"], keep="last").reset_index(
+            drop=True
+        )
+    return final_data.groupby("date", sort=False, as_index=False).last()
+
+
+def save_weather_data(
+    city: dict,
+    data: pd.DataFrame,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+):
+    """Atomically save the weather data of a city to the file of its grid cell."""
+    filepath = get_cell_file_path(get_cell(city, grid_resolution))
+    try:
+        # The city label is added back when loading, cells are shared between cities
+        atomic_write_csv(data.drop(columns="city", errors="ignore"), filepath)
+        print(f"Saved updated data for {city['name']} to {filepath}")
+    except Exception as e:
+        print(f"Error saving data for {city['name']} to {filepath}: {e}")
+
+
+def migrate_legacy_data(
+    city: dict,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> bool:
+    """
+    Merge the legacy per-city file of a city into the file of its grid cell.
+
+    Cell rows win over legacy rows on the same date. The legacy file is then
+    renamed with a '.migrated' suffix so it is merged only once and other
+    cities of the cell no longer hide it.
+
+    Returns:
+        True if a legacy file was migrated
+    """
+    legacy_path = get_file_path(city["name"])
+    if not os.path.exists(legacy_path):
+        return False
+
+    filepath = get_cell_file_path(get_cell(city, grid_resolution))
+    with file_lock(filepath):
+        # Another worker may have migrated it while we waited for the lock
+        if not os.path.exists(legacy_path):
+            return False
+        legacy = _read_weather_file(legacy_path)
+        if legacy is not None:
+            cell_data = _read_weather_file(filepath)
+            merged = merge_weather_data(
+                legacy, [] if cell_data is None else [cell_data]
             )
+            save_weather_data(city, merged, grid_resolution)
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+    print(f"Migrated legacy data of {city['name']} from {legacy_path} to {filepath}")
+    return True
+
+
+def check_weather_quality(
+    city: dict,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> Union[dict, None]:
+    """
+    Validate the stored weather data of a city and write the quality report of its cell.
+
+    Failing rows are moved from the cell file to the quarantine file, the
+    hours they leave missing are re-fetched by the next `get_weather_data_city`.
+    The report lists the day ranges to re-fetch, including days with NaNs.
+    Returns None if the city has no data.
+    """
+    cell = get_cell(city, grid_resolution)
+    migrate_legacy_data(city, grid_resolution)
+    filepath = get_cell_file_path(cell)
+    with file_lock(filepath):
+        data = load_existing_data(city, grid_resolution)
+        if data is None:
             return None
-    else:
-        return None
+        clean, quarantined, report = validate_weather(data)
+        if not quarantined.empty:
+            save_weather_data(city, clean, grid_resolution)
+        write_quality_outputs(cell["name"], quarantined, report)
+    print(
+        f"Quality report for {cell['name']}: {report['quarantined_rows']} rows "
+        f"quarantined, {report['missing_timestamps']} missing hours"
+    )
+    return report
+
+
+def commit_weather_chunk(
+    city: dict,
+    new_data: pd.DataFrame,
+    hourly_variables: List[str],
+    stored_data: Union[pd.DataFrame, None] = None,
+    loaded_version: Optional[Tuple[int, int, int]] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+) -> Tuple[pd.DataFrame, Optional[Tuple[int, int, int]]]:
+    """
+    Validate a fetched chunk and merge it into the file of the city's grid cell.
+
+    `stored_data` is the data last read from the file at `loaded_version`. It is
+    read under the lock when not given or when another worker committed since.
+
+    Returns:
+        The merged data and the version of the file it was committed as
+    """
+    cell = get_cell(city, grid_resolution)
+    filepath = get_cell_file_path(cell)
+
+    # Keep impossible values and duplicated hours out of the store
+    new_data, quarantined, _ = validate_weather(new_data, hourly_variables)
+    if not quarantined.empty:
+        print(f"Quarantined {len(quarantined)} fetched rows for {city['name']}")
+        write_quality_outputs(cell["name"], quarantined)
+
+    with file_lock(filepath):
+        if stored_data is None or get_file_version(filepath) != loaded_version:
+            # Nothing was read yet, or another worker committed since we read the
+            # file: merge into the stored version, legacy file included
+            reloaded = load_existing_data(city, grid_resolution)
+            if reloaded is not None:
+                stored_data = reloaded
+        merged = merge_weather_data(stored_data, [new_data])
+        save_weather_data(city, merged, grid_resolution)
+        return merged, get_file_version(filepath)
 
 
 def get_weather_data_city(
@@ -157,6 +512,10 @@ def get_weather_data_city(
     end_date: str,
     hourly_variables: List[str],
     timezone: str,
+    scheduler: Optional[RequestScheduler] = None,
+    chunk_days: Optional[int] = None,
+    grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+    refetch_invalid: bool = False,
 ) -> pd.DataFrame:
     """
     Get historical weather data, using local storage when available and fetching from API only when needed.
@@ -166,96 +525,110 @@ def get_weather_data_city(
         start_date: Start date in 'YYYY-MM-DD' format,
         end_date: End date in 'YYYY-MM-DD' format)
         hourly_variables: List of hourly weather variables to fetch
-        timezone: Timezone for the data
+        timezone: Timezone for the data, a cell is always stored in the timezone
+            it was first fetched in
+        scheduler: Request scheduler enforcing the API budget, defaults to the
+            process-wide one
+        chunk_days: Size of the fetch windows in days, calendar months if None
+        grid_resolution: Size in degrees of the grid cells shared by nearby cities,
+            None to store every city on its own
+        refetch_invalid: Check the stored data first with `check_weather_quality`
+            and fetch again the days of its failing rows, holes and NaNs
 
     Returns:
         Dictionary mapping city names to pandas DataFrames with weather data
     """
 
-    # Check for existing data for each city
-    existing_data = load_existing_data(city)
+    # Nearby cities share a grid cell, data is fetched and stored once per cell
+    cell = get_cell(city, grid_resolution)
+    register_city(city, cell)
+    check_cell_timezone(cell, timezone)
+    migrate_legacy_data(city, grid_resolution)
+    # Failing rows are removed from the store before looking for missing days
+    report = check_weather_quality(city, grid_resolution) if refetch_invalid else None
+
+    # Check for existing data for each city, remembering which commit was read
+    filepath = get_cell_file_path(cell)
+    loaded_version = get_file_version(filepath)
+    existing_data = load_existing_data(city, grid_resolution)
     fetching_dates = get_dates_to_fetch(existing_data, start_date, end_date)
+    if report is not None:
+        # Missing days after the stored data can start before start_date
+        first = min([start_date] + [r[0] for r in fetching_dates], key=pd.to_datetime)
+        fetching_dates = _merge_day_ranges(
+            first, end_date, fetching_dates + report["refetch_ranges"]
+        )
 
-    if not fetching_dates:
-        # No new dates to fetch based on date range alone
-        # Check if all requested variables (columns) are present in the existing data
-        if existing_data is not None:
-            missing_columns = [
-                col for col in hourly_variables if col not in existing_data.columns
-            ]
-            if not missing_columns:
-                # All dates and columns are present
-                print(
-                    f"Data for {city['name']} ({start_date} to {end_date}) with requested columns already available locally."
-                )
-                return existing_data
-            else:
-                # Dates are covered, but columns are missing. Re-fetch the entire range.
-                print(
-                    f"Missing columns {missing_columns} in existing data for {city['name']}. Re-fetching full range {start_date} to {end_date}."
-                )
-                fetching_dates = [(start_date, end_date)]
-                # Discard incomplete existing data as we are re-fetching everything
-                existing_data = None
-        else:
-            # This case implies load_existing_data returned None, and get_dates_to_fetch
-            # might have returned an empty list if start/end dates were within a non-existent range (shouldn't happen with current logic but handle defensively).
-            # If existing_data is None, we must fetch the full range.
-            fetching_dates = [(start_date, end_date)]
-
-    # If we reach here, either fetching_dates was initially non-empty (missing dates),
-    # or it was set because columns were missing or existing_data was None.
-
-    # Fetch data for each required date range
-    all_new_data = []  # Collect new data chunks here
-    print(f"Fetching data for {city['name']} for date ranges: {fetching_dates}")
-    for date_range in fetching_dates:
-        new_data_chunk = fetch_weather_city_from_api(
-            city, date_range, hourly_variables, timezone
+    jobs = get_fetch_jobs(
+        existing_data, fetching_dates, start_date, end_date, hourly_variables
+    )
+    # Stored days only lack the new variables, those are fetched and merged in
+    column_jobs = [job for job in jobs if job[0] not in fetching_dates]
+    if column_jobs:
+        print(
+            f"Missing columns {column_jobs[0][1]} in existing data for {city['name']}. "
+            f"Fetching them for {[date_range for date_range, _ in column_jobs]}."
         )
-        all_new_data.append(new_data_chunk)
-
-    # Combine potentially existing data (if columns were initially okay but dates were missing)
-    # with all newly fetched data.
-    # If columns were missing, existing_data was set to None earlier.
-    if not all_new_data:
-        # This should only happen if fetching_dates was empty and existing_data was sufficient
-        # which is handled by the return statement earlier. Added for safety.
-        final_data = existing_data
-    else:
-        final_data = pd.concat([existing_data] + all_new_data, ignore_index=True)
 
-        # Sort and remove potential duplicates introduced by concatenation or overlap
-        final_data = final_data.sort_values("date").drop_duplicates(
-            subset=["date"], keep="last"
+    if not jobs:
+        # All dates and columns are present
+        print(
+            f"Data for {city['name']} ({start_date} to {end_date}) with requested "
+            "columns already available locally."
         )
+        return existing_data
+
+    # Split the ranges into windows fetched concurrently by the rate-limited scheduler
+    scheduler = scheduler or get_default_scheduler()
+    chunks = [
+        (chunk, variables)
+        for date_range, variables in jobs
+        for chunk in split_date_range(date_range, chunk_days)
+    ]
+    print(
+        f"Fetching data for {city['name']} ({cell['name']}) for date ranges: "
+        f"{fetching_dates} in {len(chunks)} chunks"
+    )
+    futures = {
+        scheduler.submit(
+            fetch_weather_city_from_api,
+            cell,
+            chunk,
+            variables,
+            timezone,
+            cost=estimate_request_cost(
+                len(variables),
+                (pd.to_datetime(chunk[1]) - pd.to_datetime(chunk[0])).days + 1,
+            ),
+        ): (chunk, variables)
+        for chunk, variables in chunks
+    }
 
-        # Save the updated/combined data back to the file
-        filepath = get_file_path(city["name"])
+    # Commit every chunk as soon as it arrives so an interrupted backfill
+    # resumes from the stored data instead of restarting.
+    final_data = existing_data
+    first_error = None
+    for future in as_completed(futures):
+        chunk, variables = futures[future]
         try:
-            final_data.to_csv(filepath, index=False)
-            print(f"Saved updated data for {city['name']} to {filepath}")
+            new_data_chunk = future.result()
         except Exception as e:
-            print(f"Error saving data for {city['name']} to {filepath}: {e}")
-
-    return final_data
-
-
-# Juste to test the function
-# TODO : Remove this part after testing
-if __name__ == "__main__":
-    cities = [
-        {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658},
-        {"name": "Sfax", "latitude": 34.7406, "longitude": 10.7600},
-    ]
+            print(f"Error fetching {chunk} for {city['name']}: {e}")
+            first_error = first_error or e
+            continue
+
+        final_data, loaded_version = commit_weather_chunk(
+            city,
+            new_data_chunk,
+            variables,
+            final_data,
+            loaded_version,
+            grid_resolution,
+        )
 
-    hourly_vars = ["temperature_2m", "relative_humidity_2m", "precipitation"]
+    if first_error is not None:
+        raise first_error
 
-    weather_data = get_weather_data_city(
-        city=cities[0],
-        start_date="2024-01-01",
-        end_date="2024-01-07",
-        hourly_variables=hourly_vars,
-        timezone="Africa/Tunis",
-    )
-    print(weather_data.head())
+    # Chunks are labelled with the cell, serve them as the city's view
+    final_data["city"] = city["name"]
+    return final_data
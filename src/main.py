@@ -1,14 +1,32 @@
+import argparse
+
 from data_import.import_y import import_y
+from data_import.validation import validate_target, write_quality_outputs
+from profiling import PipelineProfiler, profiling_enabled
 
 
-def main():
-    y = import_y("data/raw/y.csv")
-    print(y.head())
+def main(profile: bool = False):
+    # Profiling is opt-in with --profile or PIPELINE_PROFILE=1
+    profiler = PipelineProfiler(enabled=profiling_enabled(profile))
+    with profiler:
+        with profiler.stage("import_y"):
+            y = import_y("data/raw/y.csv")
+        # Quarantine duplicated dates and outliers before training
+        with profiler.stage("validate_target"):
+            y, quarantined, report = validate_target(y)
+            write_quality_outputs("target", quarantined, report)
+        print(y.head())
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the forecasting pipeline.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write per-stage profiles, peak memory and flamegraph stacks to profiles/",
+    )
+    args = parser.parse_args()
+    main(profile=args.profile)
     import torch
     x = torch.rand(5, 3)
     print(x)
-
@@ -0,0 +1,285 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RECONCILE_METHODS = (
+    "bottom_up",
+    "top_down",
+    "ols",
+    "wls_struct",
+    "wls_var",
+    "mint_shrink",
+)
+
+
+@dataclass
+class Hierarchy:
+    """
+    Three level hierarchy: a total, its regions and their cities.
+
+    Rows of stacked matrices follow `names`: the total first, then the
+    regions in sorted order, then the cities in the order they were given.
+    The summing matrix is never built densely, aggregation uses the region
+    index of every city.
+    """
+
+    total: str
+    regions: List[str]
+    bottom: List[str]
+    region_of: np.ndarray
+
+    def __post_init__(self):
+        # Cities sorted by region so each region sums a contiguous block
+        self._order = np.argsort(self.region_of, kind="stable")
+        counts = np.bincount(self.region_of, minlength=len(self.regions))
+        self._starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        if (counts == 0).any():
+            raise ValueError("Every region needs at least one city.")
+
+    @property
+    def names(self) -> List[str]:
+        return [self.total] + self.regions + self.bottom
+
+    @property
+    def n_aggregates(self) -> int:
+        return 1 + len(self.regions)
+
+    @property
+    def n_series(self) -> int:
+        return self.n_aggregates + len(self.bottom)
+
+    def aggregate(self, bottom: np.ndarray) -> np.ndarray:
+        """
+        Sums of the total and the regions, `C @ bottom` for the aggregation rows C.
+
+        Works on any (n_bottom, ...) array, e.g. one column per horizon.
+        """
+        regions = np.add.reduceat(bottom[self._order], self._starts, axis=0)
+        return np.concatenate([regions.sum(axis=0, keepdims=True), regions])
+
+    def summing_matrix(self) -> np.ndarray:
+        """Dense (n_series, n_bottom) summing matrix S, for inspection and tests."""
+        identity = np.eye(len(self.bottom))
+        return np.concatenate([self.aggregate(identity), identity])
+
+
+def build_hierarchy(
+    cities: List[dict],
+    region_key: str = "region",
+    total: str = "Total",
+) -> Hierarchy:
+    """
+    Hierarchy of the cities passed to `get_weather_data_city`, grouped by region.
+
+    Every city dict needs a `region_key` entry naming its region.
+    """
+    missing = [c["name"] for c in cities if region_key not in c]
+    if missing:
+        raise ValueError(f"Cities without a {region_key!r}: {missing}")
+    names = [c["name"] for c in cities]
+    if len(set(names)) != len(names):
+        raise ValueError("City names must be unique.")
+
+    regions = sorted({c[region_key] for c in cities})
+    index = {region: i for i, region in enumerate(regions)}
+    return Hierarchy(
+        total=total,
+        regions=regions,
+        bottom=names,
+        region_of=np.array([index[c[region_key]] for c in cities], dtype=np.int64),
+    )
+
+
+def align_to_hierarchy(
+    hierarchy: Hierarchy,
+    names: Sequence[str],
+    values: np.ndarray,
+    bottom_only: bool = False,
+) -> np.ndarray:
+    """
+    Reorder the rows of stacked series, e.g. from `stack_series`, to the hierarchy.
+
+    Raises KeyError naming the series missing from `names`.
+    """
+    position = {name: i for i, name in enumerate(names)}
+    wanted = hierarchy.bottom if bottom_only else hierarchy.names
+    missing = [name for name in wanted if name not in position]
+    if missing:
+        raise KeyError(f"Missing series {missing}")
+    return values[[position[name] for name in wanted]]
+
+
+def bottom_up(hierarchy: Hierarchy, forecasts: np.ndarray) -> np.ndarray:
+    """
+    Keep the city forecasts and sum them up the hierarchy.
+
+    `forecasts` holds all levels (n_series, horizon) or the cities only
+    (n_bottom, horizon).
+    """
+    bottom = forecasts[-len(hierarchy.bottom) :]
+    return np.concatenate([hierarchy.aggregate(bottom), bottom])
+
+
+def top_down_proportions(
+    hierarchy: Hierarchy,
+    history: np.ndarray,
+    method: str = "average_proportions",
+) -> np.ndarray:
+    """
+    Share of the total of every city estimated from its (n_bottom, time) history.
+
+    'average_proportions' averages the share of each time step (Gross-Sohl
+    method A), 'proportions_of_averages' divides the average of each city by
+    the average total (method F). NaN steps are ignored.
+    """
+    bottom = history[-len(hierarchy.bottom) :]
+    totals = np.nansum(bottom, axis=0)
+    if method == "average_proportions":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            proportions = np.nanmean(bottom / totals, axis=1)
+    elif method == "proportions_of_averages":
+        proportions = np.nanmean(bottom, axis=1) / np.nanmean(totals)
+    else:
+        raise ValueError(f"Unknown top-down method {method!r}")
+    return proportions / proportions.sum()
+
+
+def top_down(
+    hierarchy: Hierarchy,
+    forecasts: np.ndarray,
+    proportions: np.ndarray,
+) -> np.ndarray:
+    """Split the total forecast (first row) between the cities by fixed proportions."""
+    bottom = proportions[:, None] * forecasts[0][None, :]
+    return np.concatenate([hierarchy.aggregate(bottom), bottom])
+
+
+def shrink_covariance(residuals: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Covariance of (n_series, time) residuals shrunk towards its diagonal.
+
+    The shrinkage intensity is the Schäfer-Strimmer estimate on the
+    correlation matrix, which keeps the estimate invertible with fewer time
+    steps than series.
+
+    Returns:
+        The shrunk covariance and the shrinkage intensity in [0, 1]
+    """
+    n_time = residuals.shape[1]
+    centred = residuals - residuals.mean(axis=1, keepdims=True)
+    std = np.sqrt((centred**2).sum(axis=1) / (n_time - 1))
+    std[std == 0] = 1.0
+    scaled = centred / std[:, None]
+
+    # Mean and spread over time of the products of every pair of scaled residuals
+    mean_product = scaled @ scaled.T / n_time
+    squared_products = (scaled**2) @ (scaled**2).T
+    correlation = mean_product * n_time / (n_time - 1)
+    spread = squared_products - n_time * mean_product**2
+    variance = spread * n_time / (n_time - 1) ** 3
+    off_diagonal = ~np.eye(len(correlation), dtype=bool)
+    denominator = (correlation[off_diagonal] ** 2).sum()
+    intensity = (
+        float(np.clip(variance[off_diagonal].sum() / denominator, 0.0, 1.0))
+        if denominator > 0
+        else 1.0
+    )
+
+    shrunk = correlation * (1.0 - intensity)
+    np.fill_diagonal(shrunk, 1.0)
+    return shrunk * np.outer(std, std), intensity
+
+
+def _error_covariance(
+    hierarchy: Hierarchy, method: str, residuals: Optional[np.ndarray]
+) -> np.ndarray:
+    n = hierarchy.n_series
+    if method == "ols":
+        return np.eye(n)
+    if method == "wls_struct":
+        # Number of cities summed by each series
+        ones = np.ones(len(hierarchy.bottom))
+        return np.diag(np.concatenate([hierarchy.aggregate(ones), ones]))
+    if residuals is None:
+        raise ValueError(f"Method {method!r} needs in-sample residuals.")
+    if residuals.shape[0] != n:
+        raise ValueError(f"Expected residuals of {n} series, got {residuals.shape[0]}")
+    if method == "wls_var":
+        return np.diag(np.var(residuals, axis=1, ddof=1))
+    return shrink_covariance(residuals)[0]
+
+
+def mint(
+    hierarchy: Hierarchy,
+    forecasts: np.ndarray,
+    method: str = "mint_shrink",
+    residuals: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Minimum trace (MinT) reconciliation of base forecasts of every level.
+
+    Uses the projection ỹ = ŷ - W Uᵀ (U W Uᵀ)⁻¹ U ŷ where
+    U ŷ = C ŷ_bottom - ŷ_aggregates are the incoherences. Only a square system
+    of the size of the aggregates is solved, whatever the number of cities
+    and horizons.
+
+    Args:
+        hierarchy: Hierarchy of the series
+        forecasts: (n_series, horizon) base forecasts in hierarchy order
+        method: Error covariance W: 'ols' identity, 'wls_struct' number of
+            cities summed, 'wls_var' residual variances, 'mint_shrink' shrunk
+            residual covariance
+        residuals: (n_series, time) in-sample one-step errors, for 'wls_var'
+            and 'mint_shrink'
+
+    Returns:
+        Coherent (n_series, horizon) forecasts
+    """
+    n_agg = hierarchy.n_aggregates
+    covariance = _error_covariance(hierarchy, method, residuals)
+
+    # U = [-I, C]: incoherence of the forecasts, and W Uᵀ without building U
+    incoherence = hierarchy.aggregate(forecasts[n_agg:]) - forecasts[:n_agg]
+    w_ut = hierarchy.aggregate(covariance[n_agg:]).T - covariance[:, :n_agg]
+    u_w_ut = hierarchy.aggregate(w_ut[n_agg:]) - w_ut[:n_agg]
+    return forecasts - w_ut @ np.linalg.solve(u_w_ut, incoherence)
+
+
+def reconcile(
+    hierarchy: Hierarchy,
+    forecasts: np.ndarray,
+    method: str = "mint_shrink",
+    residuals: Optional[np.ndarray] = None,
+    history: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Make stacked forecasts of all levels coherent: regions and total add up.
+
+    Args:
+        hierarchy: Hierarchy of the series, see `build_hierarchy`
+        forecasts: (n_series, horizon) base forecasts in hierarchy order,
+            or (n_bottom, horizon) for 'bottom_up'
+        method: One of RECONCILE_METHODS
+        residuals: (n_series, time) in-sample errors for 'wls_var' and
+            'mint_shrink'
+        history: (n_bottom, time) city history for the 'top_down' proportions
+
+    Returns:
+        Coherent (n_series, horizon) forecasts in hierarchy order
+    """
+    if method not in RECONCILE_METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected {RECONCILE_METHODS}")
+    forecasts = np.asarray(forecasts, dtype=float)
+    if method == "bottom_up":
+        return bottom_up(hierarchy, forecasts)
+    if forecasts.shape[0] != hierarchy.n_series:
+        raise ValueError(
+            f"Expected forecasts of {hierarchy.n_series} series, "
+            f"got {forecasts.shape[0]}"
+        )
+    if method == "top_down":
+        if history is None:
+            raise ValueError("Top-down reconciliation needs the city history.")
+        return top_down(hierarchy, forecasts, top_down_proportions(hierarchy, history))
+    return mint(hierarchy, forecasts, method, residuals)
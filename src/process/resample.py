@@ -0,0 +1,220 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+FILL_METHODS = ("linear", "ffill", "seasonal_naive")
+
+
+def _freq_nanos(freq: str) -> int:
+    """Length of a slot of `freq` in nanoseconds, the grid needs a fixed one."""
+    offset = to_offset(freq)
+    try:
+        return offset.nanos
+    except ValueError:
+        raise ValueError(
+            f"Frequency {freq!r} has no fixed length, expected one such as "
+            "'h', '15min' or 'D'"
+        ) from None
+
+
+def stack_series(
+    data: pd.DataFrame,
+    freq: str = "h",
+    series_col: Optional[str] = "city",
+    date_col: str = "date",
+    value_col: str = "y",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Tuple[pd.DatetimeIndex, List[str], np.ndarray]:
+    """
+    Regularize many irregular series onto one time grid as a 2D array.
+
+    Timestamps are floored to `freq` and values falling in the same slot are
+    averaged. Slots without any value are NaN.
+
+    Args:
+        data: Long frame with one row per (series, timestamp)
+        freq: Pandas frequency of the grid, of a fixed length
+        series_col: Column naming the series, None for a frame of one series
+        start: First slot of the grid, earliest timestamp if None
+        end: Last slot of the grid, latest timestamp if None
+
+    Returns:
+        The grid, the series names and a (n_series, n_slots) float array,
+        the only name of a single series is None
+    """
+    step = _freq_nanos(freq)
+    dates = data[date_col].dt.floor(freq)
+    grid = pd.date_range(
+        start=pd.Timestamp(start) if start else dates.min(),
+        end=pd.Timestamp(end) if end else dates.max(),
+        freq=freq,
+    )
+    if series_col is None:
+        codes, names = np.zeros(len(data), dtype=np.int64), [None]
+    else:
+        codes, names = pd.factorize(data[series_col], sort=True)
+    slots = dates.to_numpy().astype("datetime64[ns]") - grid[0].to_datetime64()
+    slots = slots.astype(np.int64) // step
+    values = data[value_col].to_numpy(dtype=float)
+
+    # Drop rows outside the grid and NaN values, then average per flat cell
+    keep = (slots >= 0) & (slots < len(grid)) & ~np.isnan(values)
+    flat = codes[keep].astype(np.int64) * len(grid) + slots[keep]
+    size = len(names) * len(grid)
+    sums = np.bincount(flat, weights=values[keep], minlength=size)
+    counts = np.bincount(flat, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stacked = (sums / counts).reshape(len(names), len(grid))
+    return grid, list(names), stacked
+
+
+def unstack_series(
+    grid: pd.DatetimeIndex,
+    names: List[str],
+    values: np.ndarray,
+    series_col: Optional[str] = "city",
+    date_col: str = "date",
+    value_col: str = "y",
+) -> pd.DataFrame:
+    """Long frame of a stacked 2D array, the inverse of `stack_series`."""
+    columns = {
+        date_col: np.tile(grid.to_numpy(), len(names)),
+        value_col: values.reshape(-1),
+    }
+    if series_col is None:
+        return pd.DataFrame(columns)
+    series = np.repeat(np.asarray(names, dtype=object), len(grid))
+    return pd.DataFrame({series_col: series, **columns})
+
+
+def _last_valid_index(valid: np.ndarray) -> np.ndarray:
+    """Index of the last valid cell at or before each cell, -1 if none."""
+    positions = np.where(valid, np.arange(valid.shape[1], dtype=np.int32), -1)
+    return np.maximum.accumulate(positions, axis=1)
+
+
+def _next_valid_index(valid: np.ndarray) -> np.ndarray:
+    """Index of the next valid cell at or after each cell, n_slots if none."""
+    n_times = valid.shape[1]
+    positions = np.where(valid, np.arange(n_times, dtype=np.int32), n_times)
+    return np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1]
+
+
+def _seasonal_previous(values: np.ndarray, season: int) -> np.ndarray:
+    """Last valid value at the same phase of the season for every cell."""
+    n_series, n_times = values.shape
+    n_cycles = -(-n_times // season)
+    padded = np.full((n_series, n_cycles * season), np.nan, dtype=values.dtype)
+    padded[:, :n_times] = values
+    # (series, phase, cycle): forward fill along the cycles of each phase
+    by_phase = padded.reshape(n_series, n_cycles, season).transpose(0, 2, 1)
+    by_phase = by_phase.reshape(n_series * season, n_cycles)
+    previous = _last_valid_index(~np.isnan(by_phase))
+    filled = np.take_along_axis(by_phase, np.maximum(previous, 0), axis=1)
+    filled[previous < 0] = np.nan
+    filled = filled.reshape(n_series, season, n_cycles).transpose(0, 2, 1)
+    return filled.reshape(n_series, -1)[:, :n_times]
+
+
+def _fill_block(
+    block: np.ndarray,
+    method: str,
+    max_gap: Optional[int],
+    season: int,
+) -> np.ndarray:
+    filled = block.copy()
+    missing = np.isnan(block)
+    if not missing.any():
+        return filled
+
+    n_times = block.shape[1]
+    valid = ~missing
+    previous = _last_valid_index(valid)
+    following = _next_valid_index(valid)
+
+    # Only the missing cells are gathered and computed
+    rows, cols = np.nonzero(missing)
+    before = previous[rows, cols]
+    after = following[rows, cols]
+    fillable = np.ones(len(rows), dtype=bool)
+    if max_gap is not None:
+        # The gap spans the slots strictly between the surrounding valid values
+        fillable &= (after - before - 1) <= max_gap
+
+    if method == "ffill":
+        fillable &= before >= 0
+        values = block[rows, np.maximum(before, 0)]
+    elif method == "linear":
+        # Leading and trailing gaps have nothing to interpolate from
+        fillable &= (before >= 0) & (after < n_times)
+        start = block[rows, np.maximum(before, 0)]
+        end = block[rows, np.minimum(after, n_times - 1)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = start + (end - start) * (cols - before) / (after - before)
+    else:
+        values = _seasonal_previous(block, season)[rows, cols]
+
+    filled[rows[fillable], cols[fillable]] = values[fillable]
+    return filled
+
+
+def fill_gaps(
+    values: np.ndarray,
+    method: str = "linear",
+    max_gap: Optional[int] = None,
+    season: int = 24,
+    block_size: int = 256,
+) -> np.ndarray:
+    """
+    Fill missing values of stacked series, vectorized over all series at once.
+
+    Args:
+        values: (n_series, n_slots) array, NaN marking missing slots
+        method: 'linear' interpolation between the surrounding values,
+            'ffill' with the last value, or 'seasonal_naive' with the last
+            value at the same phase of the season
+        max_gap: Gaps longer than this many slots are left missing entirely
+        season: Number of slots of a season for 'seasonal_naive'
+        block_size: Series processed together, bounds the temporary memory
+
+    Returns:
+        A new array with the gaps filled
+    """
+    if method not in FILL_METHODS:
+        raise ValueError(f"Unknown fill method {method!r}, expected {FILL_METHODS}")
+    if values.ndim != 2:
+        raise ValueError("Expected a 2D array of stacked series.")
+
+    result = np.empty_like(values)
+    for first in range(0, values.shape[0], block_size):
+        block = values[first : first + block_size]
+        result[first : first + block_size] = _fill_block(block, method, max_gap, season)
+    return result
+
+
+def regularize(
+    data: pd.DataFrame,
+    freq: str = "h",
+    method: str = "linear",
+    max_gap: Optional[int] = None,
+    season: Optional[int] = None,
+    series_col: Optional[str] = "city",
+    date_col: str = "date",
+    value_col: str = "y",
+) -> pd.DataFrame:
+    """
+    Put many series on a regular grid and fill their gaps.
+
+    The season of 'seasonal_naive' defaults to one day of slots. With
+    `series_col` None the frame is a single series, e.g. from `import_y`.
+    Returns a long frame with every (series, slot) pair.
+    """
+    step = _freq_nanos(freq)
+    grid, names, values = stack_series(data, freq, series_col, date_col, value_col)
+    if season is None:
+        season = max(int(pd.Timedelta(days=1).value // step), 1)
+    filled = fill_gaps(values, method=method, max_gap=max_gap, season=season)
+    return unstack_series(grid, names, filled, series_col, date_col, value_col)
@@ -0,0 +1,316 @@
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Setting this environment variable to 1 turns profiling on without any flag
+PROFILE_ENV = "PIPELINE_PROFILE"
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+
+
+def profiling_enabled(flag: bool = False) -> bool:
+    """Profiling is on with the flag or with PIPELINE_PROFILE set to a true value."""
+    return flag or os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # Semicolons separate frames in collapsed stacks
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)})".replace(
+        ";", ","
+    )
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads every `interval` seconds.
+
+    Unlike cProfile, which only sees the thread it was enabled on, samples
+    cover the worker threads fetching and parsing data. Waiting threads are
+    sampled too, so the result is a wall-clock profile. Stacks are counted
+    in the collapsed format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.label = "run"
+        # Held while frames are referenced, see `_run`
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            with self.lock:
+                label = self.label
+                frames = sys._current_frames()
+                frame = None
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    thread = names.get(ident, str(ident)).replace(";", ",")
+                    self.counts[(label, ";".join([thread] + stack[::-1]))] += 1
+                # A sampled frame whose call returned owns its locals: drop the
+                # frames before releasing the lock so they do not outlive it
+                del frames, frame
+
+    def collapsed(self, label: Optional[str] = None) -> List[str]:
+        """Collapsed stack lines of one stage, or of all stages under their name."""
+        if label is not None:
+            return [
+                f"{stack} {count}"
+                for (stage, stack), count in sorted(self.counts.items())
+                if stage == label
+            ]
+        return [
+            f"{stage};{stack} {count}"
+            for (stage, stack), count in sorted(self.counts.items())
+        ]
+
+
+class PipelineProfiler:
+    """
+    Opt-in per-stage profiling of a pipeline run.
+
+    Every stage gets its wall and CPU time, its peak traced memory
+    (tracemalloc), a cProfile of the thread running it and the sampled
+    stacks of all threads. On exit the run directory receives report.json,
+    one `<stage>.prof` pstats file and one `<stage>.collapsed` stack file per
+    stage, and stacks.collapsed for the whole run.
+
+    When disabled every method is a no-op, so stages can stay in the code.
+    tracemalloc slows allocation-heavy code down noticeably, which is why
+    profiling is off by default.
+
+    Args:
+        enabled: Profile the run, see `profiling_enabled`
+        output_dir: Parent of the run directory, PIPELINE_PROFILE_DIR or
+            'profiles' if None
+        sample_interval: Seconds between two stack samples
+        top: Number of functions listed per stage in the report
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        output_dir: Optional[str] = None,
+        sample_interval: float = 0.005,
+        top: int = 20,
+    ):
+        self.enabled = enabled
+        self.output_dir = output_dir or os.environ.get(PROFILE_DIR_ENV, "profiles")
+        self.top = top
+        self.run_dir: Optional[str] = None
+        self.sampler = SamplingProfiler(sample_interval)
+        self.stages: Dict[str, dict] = {}
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._active: List[list] = []
+        self._peak_memory = 0
+        self._started = None
+        self._started_at = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        self._started = time.perf_counter()
+        self._started_at = datetime.now()
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.enabled:
+            return False
+        self.sampler.stop()
+        self._peak_memory = max(self._peak_memory, tracemalloc.get_traced_memory()[1])
+        if self._tracing:
+            tracemalloc.stop()
+        self.write_report()
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile the code run inside the block as stage `name`.
+
+        A stage entered several times accumulates. Nested stages are timed,
+        but only the outermost one is profiled by cProfile.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        record = self.stages.setdefault(
+            name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_memory_mb": 0.0}
+        )
+        profile = None
+        entry = [name, 0]
+        # The sampler keeps the locals of the frames it walks alive, e.g. an array
+        # freed by the enclosing stage: only reset the peak once it let them go
+        with self.sampler.lock:
+            if self._active:
+                # reset_peak below forgets the enclosing stage's peak, carry it over
+                parent = self._active[-1]
+                parent[1] = max(parent[1], tracemalloc.get_traced_memory()[1])
+            else:
+                profile = self._profiles.setdefault(name, cProfile.Profile())
+            parent_label = self.sampler.label
+            self.sampler.label = name
+            self._active.append(entry)
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active on this thread, e.g. a profiled script
+                self._profiles.pop(name, None)
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            record["wall_seconds"] += time.perf_counter() - wall
+            record["cpu_seconds"] += time.process_time() - cpu
+            peak = max(tracemalloc.get_traced_memory()[1], entry[1])
+            record["peak_memory_mb"] = max(record["peak_memory_mb"], peak / 2**20)
+            self._peak_memory = max(self._peak_memory, peak)
+            self._active.pop()
+            if self._active:
+                self._active[-1][1] = max(self._active[-1][1], peak)
+            self.sampler.label = parent_label
+
+    def _top_functions(self, profile: cProfile.Profile) -> List[dict]:
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                "function": f"{func} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "total_seconds": round(total, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            }
+            for (filename, line, func), (_, calls, total, cumulative, _) in rows[
+                : self.top
+            ]
+        ]
+
+    def write_report(self) -> str:
+        """Write the profiles and the report of the run. Returns the run directory."""
+        run_id = f"{self._started_at.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.run_dir = os.path.join(self.output_dir, run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        stages = []
+        for name, record in self.stages.items():
+            slug = name.lower().replace(" ", "_")
+            stage = {"name": name, **record}
+            stage["samples"] = sum(
+                count
+                for (label, _), count in self.sampler.counts.items()
+                if label == name
+            )
+            with open(os.path.join(self.run_dir, f"{slug}.collapsed"), "w") as f:
+                f.write("\n".join(self.sampler.collapsed(name)) + "\n")
+            stage["stacks"] = f"{slug}.collapsed"
+            if name in self._profiles:
+                profile = self._profiles[name]
+                profile.dump_stats(os.path.join(self.run_dir, f"{slug}.prof"))
+                stage["profile"] = f"{slug}.prof"
+                stage["top_functions"] = self._top_functions(profile)
+            stages.append(stage)
+
+        with open(os.path.join(self.run_dir, "stacks.collapsed"), "w") as f:
+            f.write("\n".join(self.sampler.collapsed()) + "\n")
+
+        report = {
+            "run_id": run_id,
+            "started": self._started_at.isoformat(timespec="seconds"),
+            "command": sys.argv,
+            "wall_seconds": time.perf_counter() - self._started,
+            "peak_memory_mb": self._peak_memory / 2**20,
+            "sample_interval": self.sampler.interval,
+            "stages": stages,
+        }
+        with open(os.path.join(self.run_dir, "report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"Profile of the run written to {self.run_dir}")
+        for stage in stages:
+            print(
+                f"  {stage['name']:<24} {stage['wall_seconds']:>8.3f}s wall "
+                f"{stage['cpu_seconds']:>8.3f}s cpu "
+                f"{stage['peak_memory_mb']:>8.1f} MB peak"
+            )
+        return self.run_dir
+
+
+def main(argv: Optional[List[str]] = None):
+    """Profile a whole script or module run as a single 'run' stage."""
+    parser = argparse.ArgumentParser(
+        description="Profile a pipeline command, e.g. "
+        "python -m src.profiling -m src.data_import.backfill cities.json ..."
+    )
+    parser.add_argument("-o", "--output-dir", default=None)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument(
+        "-m",
+        dest="module",
+        nargs=argparse.REMAINDER,
+        help="Module to run like python -m, followed by its arguments",
+    )
+    parser.add_argument("script", nargs="?", help="Script to run if -m is not given")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.module:
+        sys.argv = list(args.module)
+    elif args.script:
+        sys.argv = [args.script] + args.script_args
+    else:
+        parser.error("Give a script path or -m module")
+
+    profiler = PipelineProfiler(True, args.output_dir, args.interval)
+    with profiler, profiler.stage("run"):
+        try:
+            if args.module:
+                runpy.run_module(sys.argv[0], run_name="__main__", alter_sys=True)
+            else:
+                # Like python script.py, make the modules next to the script importable
+                sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+                runpy.run_path(sys.argv[0], run_name="__main__")
+        except SystemExit:
+            pass
+
+
+if __name__ == "__main__":
+    main()
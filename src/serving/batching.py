@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    Group concurrent requests into batches processed by a single call.
+
+    A worker thread calls `process(items)` once for all the requests queued
+    while the previous batch was processed, up to `max_batch`. `max_wait`
+    holds a batch open a little longer for more requests, only worth it when
+    a call costs much more than waiting. `process` must return one result per
+    item, in order.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], List[Any]],
+        max_batch: int = 32,
+        max_wait: float = 0.0,
+    ):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {"requests": 0, "batches": 0, "max_batch_size": 0}
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item and return a Future for its result."""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed.")
+            self._queue.append((item, future))
+            self._condition.notify()
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        """Process an item in the next batch and wait for its result."""
+        return self.submit(item).result()
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = (
+            stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Process the queued items and stop the worker."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+    def _next_batch(self) -> list:
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            # Wait a little for more requests once the first one arrived
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return [
+                self._queue.popleft()
+                for _ in range(min(self.max_batch, len(self._queue)))
+            ]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.process(items)
+                if len(results) != len(items):
+                    raise ValueError(
+                        f"Batch of {len(items)} items returned {len(results)} results"
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._condition:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch_size"] = max(
+                    self._stats["max_batch_size"], len(batch)
+                )
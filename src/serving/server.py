@@ -0,0 +1,123 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from ..data_import.grid import DEFAULT_GRID_RESOLUTION
+from .service import ForecastService
+
+
+def make_handler(service: ForecastService):
+    """Request handler class serving `service` over HTTP."""
+
+    class ForecastHandler(BaseHTTPRequestHandler):
+        # Keep-alive connections, clients reuse them between requests
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately, Nagle would delay the body
+        # until the client's delayed ACK (~40 ms)
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == "/health":
+                self._send(200, {"status": "ok", **service.stats()})
+            elif url.path == "/forecast":
+                city_name = params.get("city", [None])[0]
+                if city_name is None:
+                    self._send(400, {"error": "Missing 'city' parameter"})
+                    return
+                try:
+                    self._send(200, service.forecast(city_name))
+                except KeyError:
+                    self._send(404, {"error": f"Unknown city {city_name!r}"})
+                except FileNotFoundError:
+                    self._send(404, {"error": f"No weather data for {city_name!r}"})
+                except Exception as e:
+                    self._send(500, {"error": str(e)})
+            else:
+                self._send(404, {"error": f"Unknown path {url.path!r}"})
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # A log line per request would dominate the latency
+            pass
+
+    return ForecastHandler
+
+
+class ForecastHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections of simultaneous clients,
+    # which then retry after a 1 s SYN timeout
+    request_queue_size = 128
+
+
+def serve(
+    service: ForecastService, host: str = "127.0.0.1", port: int = 8000
+) -> ThreadingHTTPServer:
+    """
+    HTTP server answering GET /forecast?city=<name> and GET /health.
+
+    Call `serve_forever()` on the result, port 0 picks a free port.
+    """
+    return ForecastHTTPServer((host, port), make_handler(service))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve forecasts over HTTP.")
+    parser.add_argument(
+        "cities",
+        help="JSON file with a list of {'name', 'latitude', 'longitude'} cities",
+    )
+    parser.add_argument(
+        "--variables",
+        nargs="+",
+        default=["temperature_2m", "relative_humidity_2m", "precipitation"],
+    )
+    parser.add_argument("--target", default=None, help="Target CSV file")
+    parser.add_argument("--model", default=None, help="Torch model file")
+    parser.add_argument("--window", type=int, default=168)
+    parser.add_argument("--horizon", type=int, default=24)
+    parser.add_argument(
+        "--grid-resolution",
+        type=float,
+        default=DEFAULT_GRID_RESOLUTION,
+        help="Cell size in degrees the weather store was filled with",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    with open(args.cities) as f:
+        cities = json.load(f)
+    service = ForecastService(
+        cities,
+        args.variables,
+        window=args.window,
+        horizon=args.horizon,
+        target_path=args.target,
+        model_path=args.model,
+        grid_resolution=args.grid_resolution,
+    )
+    server = serve(service, args.host, args.port)
+    print(f"Serving forecasts on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
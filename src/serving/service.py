@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..data_import.grid import DEFAULT_GRID_RESOLUTION, get_cell, get_cell_file_path
+from ..data_import.import_y import import_y
+from ..data_import.storage import get_file_version, read_csv_tail
+from ..data_import.weather import get_file_path
+from .batching import MicroBatcher
+
+
+class VersionedCache:
+    """
+    Values loaded from files and kept in memory until the file changes.
+
+    The version of a file (see `get_file_version`) is checked at most every
+    `refresh_interval` seconds, and the file is only loaded again when a new
+    version was committed.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], refresh_interval: float = 1.0):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0}
+
+    def get(self, filepath: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry is not None and now - entry["checked"] < self.refresh_interval:
+                self._stats["hits"] += 1
+                return entry["value"]
+
+        version = get_file_version(filepath)
+        if version is None:
+            raise FileNotFoundError(filepath)
+        if entry is not None and entry["version"] == version:
+            with self._lock:
+                entry["checked"] = now
+                self._stats["hits"] += 1
+            return entry["value"]
+
+        value = self.loader(filepath)
+        with self._lock:
+            self._entries[filepath] = {
+                "version": version,
+                "value": value,
+                "checked": now,
+            }
+            self._stats["loads"] += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+class SeasonalNaiveModel:
+    """
+    Repeat the last season of the first feature over the horizon.
+
+    Baseline used until a trained model is deployed. Like any served model it
+    maps a (batch, window, features) array to a (batch, horizon) array.
+    """
+
+    def __init__(self, horizon: int = 24, season: int = 24):
+        self.horizon = horizon
+        self.season = season
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        last_season = batch[:, -self.season :, 0]
+        repeats = -(-self.horizon // self.season)
+        return np.tile(last_season, (1, repeats))[:, : self.horizon]
+
+
+def load_torch_model(filepath: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Load a pickled torch module as a numpy batch predictor."""
+    # Only needed to serve trained models, the baseline does not use torch
+    import torch
+
+    model = torch.load(filepath, weights_only=False)
+    model.eval()
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return model(torch.as_tensor(batch, dtype=torch.float32)).numpy()
+
+    return predict
+
+
+class ForecastService:
+    """
+    Serve forecasts from models and feature windows kept warm in memory.
+
+    The feature window of a city is its last `window` hours of weather, with
+    the latest target value of each day as first feature when a target file
+    is given. Only the tail of the weather file is read, and files are only
+    read again when a new version is committed. Concurrent requests are
+    micro-batched into a single model call.
+
+    Args:
+        cities: Dictionaries, each with 'name', 'latitude', and 'longitude'
+        variables: Weather variables used as features
+        window: Number of hours of the feature window
+        horizon: Number of hours forecast, used by the baseline model
+        target_path: Target CSV read with `import_y`, None to only use weather
+        model: Callable mapping (batch, window, features) to (batch, horizon)
+        model_path: Torch model file, reloaded when it changes, overrides `model`
+        grid_resolution: Size in degrees of the grid cells of the weather store
+        max_batch: Maximum number of requests per model call
+        max_wait: Seconds a batch waits for more requests
+        refresh_interval: Seconds between two checks of a file version
+    """
+
+    def __init__(
+        self,
+        cities: List[dict],
+        variables: List[str],
+        window: int = 168,
+        horizon: int = 24,
+        target_path: Optional[str] = None,
+        model: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        model_path: Optional[str] = None,
+        grid_resolution: Optional[float] = DEFAULT_GRID_RESOLUTION,
+        max_batch: int = 32,
+        max_wait: float = 0.0,
+        refresh_interval: float = 1.0,
+    ):
+        self.cities = {city["name"]: city for city in cities}
+        self.variables = list(variables)
+        self.window = window
+        self.target_path = target_path
+        self.model = model or SeasonalNaiveModel(horizon)
+        self.model_path = model_path
+        self.grid_resolution = grid_resolution
+
+        self._weather = VersionedCache(self._load_weather, refresh_interval)
+        self._targets = VersionedCache(self._load_target, refresh_interval)
+        self._models = VersionedCache(load_torch_model, refresh_interval)
+        self.batcher = MicroBatcher(self._predict_batch, max_batch, max_wait)
+
+    # * Feature windows
+
+    def _weather_path(self, city: dict) -> str:
+        filepath = get_cell_file_path(get_cell(city, self.grid_resolution))
+        if not os.path.exists(filepath):
+            filepath = get_file_path(city["name"])
+        return filepath
+
+    def _load_weather(self, filepath: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hourly dates and (window, variables) values up to the last stored hour."""
+        tail = read_csv_tail(
+            filepath,
+            self.window,
+            usecols=["date"] + self.variables,
+            parse_dates=["date"],
+        )
+        if tail.empty:
+            raise FileNotFoundError(f"No weather data in {filepath}")
+        dates = pd.date_range(end=tail["date"].max(), periods=self.window, freq="h")
+        # Hours missing from the tail stay NaN
+        values = (
+            tail.drop_duplicates("date", keep="last")
+            .set_index("date")[self.variables]
+            .reindex(dates)
+            .to_numpy(dtype=float)
+        )
+        return dates.to_numpy(), values
+
+    def _load_target(self, filepath: str) -> Tuple[np.ndarray, np.ndarray]:
+        target = import_y(filepath).sort_values("date", kind="mergesort")
+        return target["date"].to_numpy(), target["y"].to_numpy(dtype=float)
+
+    def features(self, city_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hourly dates and (window, features) array of the latest window of a city."""
+        city = self.cities[city_name]
+        dates, values = self._weather.get(self._weather_path(city))
+        if self.target_path is None:
+            return dates, values
+
+        # Latest target value known at each hour of the window
+        target_dates, target_values = self._targets.get(self.target_path)
+        positions = np.searchsorted(target_dates, dates, side="right") - 1
+        target = np.where(
+            positions >= 0, target_values[np.maximum(positions, 0)], np.nan
+        )
+        return dates, np.column_stack([target, values])
+
+    # * Inference
+
+    def _current_model(self) -> Callable[[np.ndarray], np.ndarray]:
+        if self.model_path is not None:
+            return self._models.get(self.model_path)
+        return self.model
+
+    def _predict_batch(self, windows: List[np.ndarray]) -> List[np.ndarray]:
+        forecasts = np.asarray(self._current_model()(np.stack(windows)))
+        return list(forecasts)
+
+    def forecast(self, city_name: str) -> dict:
+        """
+        Forecast the hours following the latest stored weather of a city.
+
+        Raises KeyError for unknown cities and FileNotFoundError when the city
+        has no weather data.
+        """
+        dates, values = self.features(city_name)
+        forecast = self.batcher(values)
+        issued_at = pd.Timestamp(dates[-1])
+        return {
+            "city": city_name,
+            "issued_at": str(issued_at),
+            "start": str(issued_at + pd.Timedelta(hours=1)),
+            "freq": "h",
+            # NaN is not valid JSON
+            "values": [None if np.isnan(v) else float(v) for v in forecast],
+        }
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            "batching": self.batcher.stats(),
+            "weather_cache": self._weather.stats(),
+            "target_cache": self._targets.stats(),
+            "model_cache": self._models.stats(),
+        }
+
+    def close(self):
+        self.batcher.close()
@@ -0,0 +1,269 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from src.data_import.backfill import (
+    BackfillJournal,
+    get_unit_id,
+    main,
+    plan_backfill,
+    run_backfill,
+    run_unit,
+)
+from src.data_import.grid import get_cell, get_cell_file_path, load_grid_index
+from src.data_import.scheduler import RequestScheduler
+from src.data_import.weather import get_file_path, load_existing_data
+from .utils import mock_openmeteo_client
+
+HOURLY_VARIABLES = ["temperature_2m", "precipitation"]
+
+# Tunis and its Medina share a 0.1 degree cell, Sfax is on its own
+GRID_RESOLUTION = 0.1
+CITIES = [
+    {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658},
+    {"name": "Tunis Medina", "latitude": 36.7986, "longitude": 10.1706},
+    {"name": "Sfax", "latitude": 34.7406, "longitude": 10.76},
+]
+
+
+def make_scheduler():
+    return RequestScheduler(limits=[(1000, 1)], initial_concurrency=4)
+
+
+def test_plan_backfill_groups_cities_by_cell(mock_openmeteo_client):
+    units = plan_backfill(
+        CITIES,
+        "2023-01-01",
+        "2023-02-28",
+        HOURLY_VARIABLES,
+        grid_resolution=GRID_RESOLUTION,
+    )
+
+    assert len(units) == 4
+    assert {u["cell"] for u in units} == {
+        get_cell(CITIES[0], GRID_RESOLUTION)["name"],
+        get_cell(CITIES[2], GRID_RESOLUTION)["name"],
+    }
+    assert [(u["start_date"], u["end_date"]) for u in units[:2]] == [
+        ("2023-01-01", "2023-01-31"),
+        ("2023-02-01", "2023-02-28"),
+    ]
+    # Every city is registered with its cell
+    served = sorted(c for entry in load_grid_index().values() for c in entry["cities"])
+    assert served == ["Sfax", "Tunis", "Tunis Medina"]
+
+
+def test_plan_backfill_skips_stored_days(mock_openmeteo_client):
+    run_backfill(
+        CITIES[:1],
+        "2023-01-01",
+        "2023-01-31",
+        HOURLY_VARIABLES,
+        "UTC",
+        scheduler=make_scheduler(),
+        grid_resolution=GRID_RESOLUTION,
+    )
+
+    units = plan_backfill(
+        CITIES[:2],
+        "2023-01-01",
+        "2023-02-28",
+        HOURLY_VARIABLES,
+        grid_resolution=GRID_RESOLUTION,
+    )
+
+    assert [u["id"] for u in units] == [
+        get_unit_id(
+            get_cell(CITIES[0], GRID_RESOLUTION)["name"],
+            ("2023-02-01", "2023-02-28"),
+            HOURLY_VARIABLES,
+        )
+    ]
+
+
+def test_run_backfill_stores_all_units_and_checkpoints(mock_openmeteo_client, tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+
+    result = run_backfill(
+        CITIES,
+        "2023-01-01",
+        "2023-02-28",
+        HOURLY_VARIABLES,
+        "UTC",
+        max_workers=3,
+        journal_path=str(journal_path),
+        scheduler=make_scheduler(),
+        grid_resolution=GRID_RESOLUTION,
+    )
+
+    assert result["done_units"] == 4
+    assert result["failed_units"] == 0
+    assert result["rows"] == 2 * 59 * 24
+    assert len(mock_openmeteo_client.calls) == 4
+    for city in (CITIES[0], CITIES[2]):
+        cell = get_cell(city, GRID_RESOLUTION)
+        stored = pd.read_csv(get_cell_file_path(cell), parse_dates=["date"])
+        assert len(stored) == 59 * 24
+        assert stored["date"].is_monotonic_increasing
+
+    entries = [json.loads(line) for line in journal_path.read_text().splitlines()]
+    assert len(entries) == 4
+    assert all(e["status"] == "done" and e["rows"] > 0 for e in entries)
+
+
+def test_run_backfill_resumes_failed_units(
+    mock_openmeteo_client, tmp_path, monkeypatch
+):
+    journal_path = str(tmp_path / "journal.jsonl")
+    weather_api = mock_openmeteo_client.weather_api
+
+    def failing_february(url, params=None, **kwargs):
+        if params["start_date"] == "2023-02-01":
+            raise ConnectionError("API unavailable")
+        return weather_api(url, params=params, **kwargs)
+
+    monkeypatch.setattr(mock_openmeteo_client, "weather_api", failing_february)
+    result = run_backfill(
+        CITIES[:1],
+        "2023-01-01",
+        "2023-03-31",
+        HOURLY_VARIABLES,
+        "UTC",
+        journal_path=journal_path,
+        scheduler=make_scheduler(),
+    )
+    assert result["failed_units"] == 1
+    cell_name = get_cell(CITIES[0])["name"]
+    assert BackfillJournal(journal_path).completed() == {
+        get_unit_id(cell_name, ("2023-01-01", "2023-01-31"), HOURLY_VARIABLES),
+        get_unit_id(cell_name, ("2023-03-01", "2023-03-31"), HOURLY_VARIABLES),
+    }
+
+    # The restart only fetches the failed unit
+    monkeypatch.setattr(mock_openmeteo_client, "weather_api", weather_api)
+    mock_openmeteo_client.calls.clear()
+    result = run_backfill(
+        CITIES[:1],
+        "2023-01-01",
+        "2023-03-31",
+        HOURLY_VARIABLES,
+        "UTC",
+        journal_path=journal_path,
+        scheduler=make_scheduler(),
+    )
+
+    assert result["done_units"] == 1
+    assert [c["params"]["start_date"] for c in mock_openmeteo_client.calls] == [
+        "2023-02-01"
+    ]
+    stored = pd.read_csv(get_cell_file_path(get_cell(CITIES[0])))
+    assert len(stored) == 90 * 24
+
+
+def test_run_unit_keeps_legacy_data(mock_openmeteo_client):
+    dates = pd.date_range("2023-01-01", "2023-01-31 23:00", freq="h")
+    legacy = pd.DataFrame({"date": dates, "temperature_2m": 15.0, "city": "Tunis"})
+    legacy.to_csv(get_file_path("Tunis"), index=False)
+    unit = {
+        "id": "unit",
+        "city": CITIES[0],
+        "cell": get_cell(CITIES[0])["name"],
+        "start_date": "2023-02-01",
+        "end_date": "2023-02-28",
+        "variables": ["temperature_2m"],
+    }
+
+    run_unit(unit, "UTC", make_scheduler())
+
+    stored = pd.read_csv(get_cell_file_path(get_cell(CITIES[0])), parse_dates=["date"])
+    assert len(stored) == (31 + 28) * 24
+    assert (stored.loc[stored["date"] < "2023-02-01", "temperature_2m"] == 15).all()
+
+
+def test_run_backfill_replans_from_the_store(mock_openmeteo_client, tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    def backfill(variables):
+        mock_openmeteo_client.calls.clear()
+        run_backfill(
+            CITIES[:1],
+            "2023-01-01",
+            "2023-02-28",
+            variables,
+            "UTC",
+            journal_path=journal_path,
+            scheduler=make_scheduler(),
+        )
+        return sorted(
+            (c["params"]["start_date"], tuple(c["params"]["hourly"]))
+            for c in mock_openmeteo_client.calls
+        )
+
+    backfill(["temperature_2m"])
+    # A new variable is fetched for the days already done with the others
+    assert backfill(HOURLY_VARIABLES) == [
+        ("2023-01-01", ("precipitation",)),
+        ("2023-02-01", ("precipitation",)),
+    ]
+    stored = load_existing_data(CITIES[0])
+    assert stored[HOURLY_VARIABLES].notna().all().all()
+
+    # Units checkpointed as done are fetched again once their data is gone
+    os.remove(get_cell_file_path(get_cell(CITIES[0])))
+    assert len(backfill(HOURLY_VARIABLES)) == 2
+    assert len(load_existing_data(CITIES[0])) == 59 * 24
+
+
+def test_run_backfill_rejects_another_timezone(mock_openmeteo_client, tmp_path):
+    def backfill(timezone):
+        run_backfill(
+            CITIES[:1],
+            "2023-01-01",
+            "2023-01-31",
+            HOURLY_VARIABLES,
+            timezone,
+            journal_path=str(tmp_path / "journal.jsonl"),
+            scheduler=make_scheduler(),
+        )
+
+    backfill("Africa/Tunis")
+    with pytest.raises(ValueError):
+        backfill("UTC")
+    assert len(mock_openmeteo_client.calls) == 1
+
+
+def test_journal_ignores_truncated_lines(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    journal = BackfillJournal(str(journal_path))
+    journal.record({"id": "a"}, "done", rows=24)
+    journal.record({"id": "b"}, "failed", error="boom")
+    with open(journal_path, "a") as f:
+        f.write('{"unit": "c", "sta')
+
+    assert journal.completed() == {"a"}
+
+
+def test_main_reads_cities_file(mock_openmeteo_client, tmp_path, monkeypatch):
+    cities_path = tmp_path / "cities.json"
+    cities_path.write_text(json.dumps(CITIES[2:]))
+    monkeypatch.setattr(
+        "src.data_import.backfill.get_default_scheduler", make_scheduler
+    )
+
+    main(
+        [
+            str(cities_path),
+            "--start",
+            "2023-01-01",
+            "--end",
+            "2023-01-07",
+            "--variables",
+            "temperature_2m",
+        ]
+    )
+
+    stored = pd.read_csv(get_cell_file_path(get_cell(CITIES[2])))
+    assert list(stored.columns) == ["date", "temperature_2m"]
+    assert len(stored) == 7 * 24
@@ -0,0 +1,119 @@
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.data_import.cache import (
+    DO_NOT_CACHE,
+    NEVER_EXPIRE,
+    CacheConfig,
+    create_cached_session,
+    expire_after_for_range,
+    get_cache_index,
+)
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_expire_after_for_past_range():
+    config = CacheConfig()
+    today = date(2024, 6, 10)
+    assert expire_after_for_range("2024-06-01", config, today) == NEVER_EXPIRE
+
+
+def test_expire_after_for_range_touching_today():
+    config = CacheConfig(recent_expire_after=600)
+    today = date(2024, 6, 10)
+    assert expire_after_for_range("2024-06-10", config, today) == 600
+    assert expire_after_for_range("2024-06-09", config, today) == 600
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("OPENMETEO_CACHE_PATH", "/tmp/weather_cache")
+    monkeypatch.setenv("OPENMETEO_CACHE_BACKEND", "filesystem")
+    monkeypatch.setenv("OPENMETEO_CACHE_MAX_ENTRIES", "100")
+    config = CacheConfig.from_env()
+    assert config.location == "/tmp/weather_cache"
+    assert config.backend == "filesystem"
+    assert config.max_entries == 100
+    assert config.recent_expire_after == 3600
+
+
+def test_config_from_env_defaults(monkeypatch):
+    for name in [
+        "OPENMETEO_CACHE_PATH",
+        "OPENMETEO_CACHE_BACKEND",
+        "OPENMETEO_CACHE_MAX_ENTRIES",
+        "OPENMETEO_CACHE_EXPIRE_AFTER",
+    ]:
+        monkeypatch.delenv(name, raising=False)
+    assert CacheConfig.from_env() == CacheConfig()
+
+
+def test_hit_miss_statistics(tmp_path, http_server):
+    config = CacheConfig(location=str(tmp_path / "cache"))
+    session = create_cached_session(config)
+
+    session.get(f"{http_server}/a")
+    session.get(f"{http_server}/a")
+    session.get(f"{http_server}/b")
+
+    stats = get_cache_index(config).stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+    assert stats["entries"] == 2
+
+
+def test_lru_eviction(tmp_path, http_server):
+    config = CacheConfig(location=str(tmp_path / "cache"), max_entries=2)
+    session = create_cached_session(config)
+
+    session.get(f"{http_server}/a")
+    session.get(f"{http_server}/b")
+    # Touch /a so /b becomes the least recently used
+    assert session.get(f"{http_server}/a").from_cache
+    session.get(f"{http_server}/c")
+
+    assert get_cache_index(config).stats()["entries"] == 2
+    assert session.get(f"{http_server}/a").from_cache
+    assert not session.get(f"{http_server}/b").from_cache
+
+
+def test_per_request_expiry(tmp_path, http_server):
+    config = CacheConfig(location=str(tmp_path / "cache"))
+    session = create_cached_session(config)
+
+    response = session.get(f"{http_server}/past", expire_after=NEVER_EXPIRE)
+    assert response.expires is None
+    response = session.get(f"{http_server}/recent", expire_after=60)
+    assert response.expires is not None
+
+
+def test_do_not_cache_bypasses_cached_responses(tmp_path, http_server):
+    config = CacheConfig(location=str(tmp_path / "cache"))
+    session = create_cached_session(config)
+
+    session.get(f"{http_server}/forecast")
+    assert session.get(f"{http_server}/forecast").from_cache
+    assert not session.get(
+        f"{http_server}/forecast", expire_after=DO_NOT_CACHE
+    ).from_cache
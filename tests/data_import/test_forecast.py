@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_import.cache import DO_NOT_CACHE
+from src.data_import.forecast import (
+    fetch_forecasts,
+    get_forecast_file_path,
+    load_forecast,
+    load_forecast_index,
+)
+from src.data_import.grid import get_cell
+from src.data_import.scheduler import RequestScheduler
+from src.data_import.synthetic import SyntheticOpenMeteoClient, make_weather
+
+HOURLY_VARIABLES = ["temperature_2m", "precipitation"]
+
+# Tunis and its Medina share a 0.1 degree cell
+GRID_RESOLUTION = 0.1
+CITIES = [
+    {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658},
+    {"name": "Tunis Medina", "latitude": 36.7986, "longitude": 10.1706},
+    {"name": "Sfax", "latitude": 34.7406, "longitude": 10.76},
+    {"name": "Sousse", "latitude": 35.8256, "longitude": 10.6084},
+]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+    client = SyntheticOpenMeteoClient(seed=3)
+    monkeypatch.setattr(
+        "src.data_import.forecast.setup_openmeteo_client", lambda: client
+    )
+    return client
+
+
+class CachingClient(SyntheticOpenMeteoClient):
+    """Caches responses by params like the cached session, unless told not to."""
+
+    def __init__(self, seed=0):
+        super().__init__(seed)
+        self.cache = {}
+
+    def weather_api(self, url, params=None, expire_after=None, **kwargs):
+        key = repr(sorted(params.items()))
+        if expire_after != DO_NOT_CACHE and key in self.cache:
+            return self.cache[key]
+        # Every request reaching the API sees a new model run
+        self.seed += 1
+        responses = super().weather_api(url, params, **kwargs)
+        if expire_after != DO_NOT_CACHE:
+            self.cache[key] = responses
+        return responses
+
+
+def fetch(issue_time, **kwargs):
+    return fetch_forecasts(
+        CITIES,
+        HOURLY_VARIABLES,
+        "UTC",
+        forecast_days=3,
+        issue_time=issue_time,
+        scheduler=RequestScheduler(limits=[(1000, 1)], initial_concurrency=2),
+        **kwargs,
+    )
+
+
+def test_fetch_forecasts_batches_cells(client):
+    forecasts = fetch("2024-05-01 06:00", batch_size=2, grid_resolution=GRID_RESOLUTION)
+
+    # Three cells in two multi-location calls
+    assert len(client.calls) == 2
+    assert sorted(len(call["params"]["latitude"]) for call in client.calls) == [1, 2]
+    assert client.calls[0]["params"]["start_date"] == "2024-05-01"
+    assert client.calls[0]["params"]["end_date"] == "2024-05-03"
+
+    tunis = forecasts["Tunis"]
+    assert len(tunis) == 3 * 24
+    assert (tunis["issue_time"] == pd.Timestamp("2024-05-01 06:00")).all()
+    assert (forecasts["Tunis Medina"]["city"] == "Tunis Medina").all()
+    expected = make_weather(
+        get_cell(CITIES[2], GRID_RESOLUTION),
+        "2024-05-01",
+        "2024-05-03",
+        HOURLY_VARIABLES,
+        seed=3,
+    )
+    np.testing.assert_allclose(
+        forecasts["Sfax"]["temperature_2m"], expected["temperature_2m"], rtol=1e-6
+    )
+
+
+def test_snapshots_are_kept_per_issue(client):
+    fetch("2024-05-01 06:00")
+    fetch("2024-05-01 12:00")
+    calls = len(client.calls)
+    # Rerunning an issue already stored does not call the API
+    fetch("2024-05-01 12:00")
+    assert len(client.calls) == calls
+
+    entry = load_forecast_index()[get_cell(CITIES[0])["name"]]
+    assert entry["issues"] == ["2024-05-01T06:00", "2024-05-01T12:00"]
+    assert entry["latest"] == "2024-05-01T12:00"
+    for issue in entry["issues"]:
+        assert os.path.exists(get_forecast_file_path(get_cell(CITIES[0]), issue))
+
+
+def test_load_forecast(client):
+    fetch("2024-05-01 06:00")
+    fetch("2024-05-02 06:00")
+
+    latest = load_forecast(CITIES[0])
+    assert latest["issue_time"].iloc[0] == pd.Timestamp("2024-05-02 06:00")
+    assert latest["date"].iloc[0] == pd.Timestamp("2024-05-02")
+
+    as_of = load_forecast(CITIES[0], as_of="2024-05-01 23:00")
+    assert as_of["issue_time"].iloc[0] == pd.Timestamp("2024-05-01 06:00")
+    assert load_forecast(CITIES[0], as_of="2024-04-30") is None
+    assert load_forecast(CITIES[0], issue_time="2024-05-01 07:00") is None
+    assert (
+        load_forecast({"name": "Gabes", "latitude": 33.88, "longitude": 10.1}) is None
+    )
+
+
+def test_failed_calls_are_fetched_on_the_next_run(client):
+    client.failure_rate = 1.0
+    with pytest.raises(ConnectionError):
+        fetch("2024-05-01 06:00", batch_size=1)
+    assert load_forecast_index() == {}
+
+    client.failure_rate = 0.0
+    forecasts = fetch("2024-05-01 06:00", batch_size=1)
+    assert all(forecast is not None for forecast in forecasts.values())
+
+
+def test_issues_within_the_hour_are_fetched_again(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+    client = CachingClient(seed=3)
+    monkeypatch.setattr(
+        "src.data_import.forecast.setup_openmeteo_client", lambda: client
+    )
+
+    first = fetch("2024-05-01 10:00")["Sfax"]
+    second = fetch("2024-05-01 10:30")["Sfax"]
+
+    # Both issues send the same params, the second run is not served the first
+    assert client.calls[0]["params"] == client.calls[-1]["params"]
+    assert not np.allclose(first["temperature_2m"], second["temperature_2m"])
@@ -1,5 +1,10 @@
 import pytest
-from src.data_import.weather import get_missing_date_ranges
+import pandas as pd
+from src.data_import.weather import (
+    get_date_gaps,
+    get_dates_to_fetch,
+    get_missing_date_ranges,
+)
 
 
 def test_no_overlap_after():
@@ -152,3 +157,27 @@ def test_invalid_requested_range():
             requested_start="2023-01-10",
             requested_end="2023-01-01",
         )
+
+
+def test_dates_to_fetch_finds_inner_gap():
+    dates = pd.date_range("2023-02-01", "2023-02-10 23:00", freq="h")
+    city_weather = pd.DataFrame({"date": dates[(dates.day < 4) | (dates.day > 6)]})
+    assert get_dates_to_fetch(city_weather, "2023-01-30", "2023-02-10") == [
+        ("2023-01-30", "2023-01-31"),
+        ("2023-02-04", "2023-02-06"),
+    ]
+
+
+def test_dates_to_fetch_without_gaps():
+    dates = pd.date_range("2023-02-01", "2023-02-10 23:00", freq="h")
+    city_weather = pd.DataFrame({"date": dates})
+    assert get_dates_to_fetch(city_weather, "2023-02-03", "2023-02-05") == []
+
+
+def test_date_gaps_several_runs():
+    dates = pd.to_datetime(["2023-02-01", "2023-02-03", "2023-02-06"])
+    city_weather = pd.DataFrame({"date": dates})
+    assert get_date_gaps(city_weather, "2023-02-01", "2023-02-06") == [
+        ("2023-02-02", "2023-02-02"),
+        ("2023-02-04", "2023-02-05"),
+    ]
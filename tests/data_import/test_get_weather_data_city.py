@@ -1,5 +1,12 @@
+import os
+import pytest
 import pandas as pd
-from src.data_import.weather import get_weather_data_city
+from src.data_import.weather import (
+    get_file_path,
+    get_weather_data_city,
+    load_existing_data,
+    save_weather_data,
+)
 from .utils import mock_openmeteo_client
 
 
@@ -324,11 +331,14 @@ def test_get_weather_missing_columns_existing_dates(mock_openmeteo_client, mocke
     # Assert API was called because columns were missing
     assert mock_openmeteo_client.last_call is not None
 
-    # Assert the API call was for the *full* date range, despite dates existing
+    # Assert the API call was for the *full* date range, despite dates existing,
+    # and only for the missing variable
     call_params = mock_openmeteo_client.last_call["params"]
     assert call_params["start_date"] == start_date
     assert call_params["end_date"] == end_date
-    assert call_params["hourly"] == requested_hourly_variables
+    assert call_params["hourly"] == ["relative_humidity_2m"]
+    stored = result["date"].isin(existing_dates)
+    assert (result.loc[stored, "temperature_2m"] == 20).all()
 
     # Assert the result contains all requested columns and the correct date range
     assert isinstance(result, pd.DataFrame)
@@ -344,3 +354,266 @@ def test_get_weather_missing_columns_existing_dates(mock_openmeteo_client, mocke
     # Check end date considering the hourly frequency includes the last day up to 23:00
     expected_end_datetime = pd.Timestamp(end_date) + pd.Timedelta(hours=23)
     assert result["date"].max() == expected_end_datetime
+
+
+def test_get_weather_multi_month_is_chunked(mock_openmeteo_client, mocker):
+    mocker.patch("src.data_import.weather.load_existing_data", return_value=None)
+    to_csv = mocker.patch("src.data_import.weather.pd.DataFrame.to_csv")
+
+    city = {"name": "Tunis", "latitude": 86.819, "longitude": 10.1658}
+    hourly_variables = ["temperature_2m", "relative_humidity_2m"]
+    result = get_weather_data_city(
+        city,
+        start_date="2023-01-15",
+        end_date="2023-03-10",
+        hourly_variables=hourly_variables,
+        timezone="Africa/Tunis",
+    )
+
+    # One request per calendar month
+    requested = sorted(
+        (call["params"]["start_date"], call["params"]["end_date"])
+        for call in mock_openmeteo_client.calls
+    )
+    assert requested == [
+        ("2023-01-15", "2023-01-31"),
+        ("2023-02-01", "2023-02-28"),
+        ("2023-03-01", "2023-03-10"),
+    ]
+    # Every chunk is committed as soon as it is fetched
+    assert to_csv.call_count == 3
+
+    expected = pd.date_range("2023-01-15", "2023-03-10 23:00", freq="h")
+    assert len(result) == len(expected)
+    assert result["date"].is_monotonic_increasing
+    assert result["date"].min() == expected[0]
+    assert result["date"].max() == expected[-1]
+
+
+def test_get_weather_failed_chunk_keeps_others(mock_openmeteo_client, mocker):
+    mocker.patch("src.data_import.weather.load_existing_data", return_value=None)
+    to_csv = mocker.patch("src.data_import.weather.pd.DataFrame.to_csv")
+
+    weather_api = mock_openmeteo_client.weather_api
+
+    def failing_weather_api(url, params=None, **kwargs):
+        if params["start_date"] == "2023-02-01":
+            raise RuntimeError("API unavailable")
+        return weather_api(url, params=params, **kwargs)
+
+    mock_openmeteo_client.weather_api = failing_weather_api
+
+    city = {"name": "Tunis", "latitude": 86.819, "longitude": 10.1658}
+    with pytest.raises(RuntimeError):
+        get_weather_data_city(
+            city,
+            start_date="2023-01-01",
+            end_date="2023-03-31",
+            hourly_variables=["temperature_2m"],
+            timezone="Africa/Tunis",
+        )
+
+    # January and March were still committed
+    assert to_csv.call_count == 2
+
+
+def test_get_weather_missing_columns_failed_chunk_keeps_stored_data(
+    mock_openmeteo_client,
+):
+    city = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    get_weather_data_city(
+        city, "2022-01-01", "2023-03-31", ["temperature_2m"], "Africa/Tunis"
+    )
+
+    weather_api = mock_openmeteo_client.weather_api
+
+    def failing_weather_api(url, params=None, **kwargs):
+        if params["start_date"] == "2023-02-01":
+            raise RuntimeError("API unavailable")
+        return weather_api(url, params=params, **kwargs)
+
+    mock_openmeteo_client.weather_api = failing_weather_api
+    with pytest.raises(RuntimeError):
+        get_weather_data_city(
+            city,
+            "2023-01-01",
+            "2023-03-31",
+            ["temperature_2m", "precipitation"],
+            "Africa/Tunis",
+        )
+
+    # The committed chunks were merged into the stored data, nothing was lost
+    stored = load_existing_data(city)
+    assert len(stored) == len(pd.date_range("2022-01-01", "2023-03-31 23:00", freq="h"))
+    assert stored["temperature_2m"].notna().all()
+
+
+def test_get_weather_cities_of_a_cell_share_variables(mock_openmeteo_client):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    nearby = {"name": "Tunis Nearby", "latitude": 36.821, "longitude": 10.1658}
+
+    get_weather_data_city(
+        tunis,
+        "2023-01-01",
+        "2023-03-31",
+        ["temperature_2m"],
+        "Africa/Tunis",
+        grid_resolution=0.1,
+    )
+    get_weather_data_city(
+        nearby,
+        "2023-01-01",
+        "2023-03-31",
+        ["relative_humidity_2m"],
+        "Africa/Tunis",
+        grid_resolution=0.1,
+    )
+    # The second city only fetched its own variable
+    assert len(mock_openmeteo_client.calls) == 6
+    assert all(
+        call["params"]["hourly"] == ["relative_humidity_2m"]
+        for call in mock_openmeteo_client.calls[3:]
+    )
+
+    # Both variables are stored, repeating either request needs no call
+    for city, variables in [
+        (tunis, ["temperature_2m"]),
+        (nearby, ["relative_humidity_2m"]),
+    ]:
+        result = get_weather_data_city(
+            city,
+            "2023-01-01",
+            "2023-03-31",
+            variables,
+            "Africa/Tunis",
+            grid_resolution=0.1,
+        )
+        assert result[["temperature_2m", "relative_humidity_2m"]].notna().all().all()
+    assert len(mock_openmeteo_client.calls) == 6
+
+
+def test_get_weather_missing_days_fetch_all_cell_variables(mock_openmeteo_client):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-31", ["temperature_2m"], "Africa/Tunis"
+    )
+
+    result = get_weather_data_city(
+        tunis, "2023-01-01", "2023-02-28", ["precipitation"], "Africa/Tunis"
+    )
+
+    requested = sorted(
+        (call["params"]["start_date"], tuple(call["params"]["hourly"]))
+        for call in mock_openmeteo_client.calls[1:]
+    )
+    assert requested == [
+        ("2023-01-01", ("precipitation",)),
+        ("2023-02-01", ("precipitation", "temperature_2m")),
+    ]
+    assert len(result) == 24 * (31 + 28)
+    assert result[["temperature_2m", "precipitation"]].notna().all().all()
+
+
+def test_get_weather_migrates_legacy_file(mock_openmeteo_client):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    nearby = {"name": "Tunis Nearby", "latitude": 36.821, "longitude": 10.1658}
+    dates = pd.date_range("2023-01-01", "2023-01-31 23:00", freq="h")
+    legacy = pd.DataFrame({"date": dates, "temperature_2m": 15.0, "city": "Tunis"})
+    legacy.to_csv(get_file_path("Tunis"), index=False)
+
+    # Another city of the cell commits first, the legacy data must survive it
+    get_weather_data_city(
+        nearby,
+        "2023-02-01",
+        "2023-02-28",
+        ["temperature_2m"],
+        "Africa/Tunis",
+        grid_resolution=0.1,
+    )
+    result = get_weather_data_city(
+        tunis,
+        "2023-01-01",
+        "2023-02-28",
+        ["temperature_2m"],
+        "Africa/Tunis",
+        grid_resolution=0.1,
+    )
+
+    assert len(mock_openmeteo_client.calls) == 1
+    assert len(result) == 24 * (31 + 28)
+    assert (result.loc[result["date"] < "2023-02-01", "temperature_2m"] == 15).all()
+    assert not os.path.exists(get_file_path("Tunis"))
+    assert os.path.exists(get_file_path("Tunis") + ".migrated")
+
+
+def test_get_weather_refetches_missing_hours(mock_openmeteo_client):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    stored = get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-31", ["temperature_2m"], "Africa/Tunis"
+    )
+    # Hours quarantined when their chunk was committed
+    hours = pd.date_range("2023-01-10 05:00", "2023-01-10 07:00", freq="h")
+    save_weather_data(tunis, stored[~stored["date"].isin(hours)])
+
+    result = get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-31", ["temperature_2m"], "Africa/Tunis"
+    )
+
+    assert len(mock_openmeteo_client.calls) == 2
+    params = mock_openmeteo_client.calls[1]["params"]
+    assert (params["start_date"], params["end_date"]) == ("2023-01-10", "2023-01-10")
+    assert len(result) == 24 * 31
+
+
+def test_get_weather_refetch_invalid(mock_openmeteo_client):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    stored = get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-31", ["temperature_2m"], "Africa/Tunis"
+    )
+    stored.loc[stored["date"] == "2023-01-15 12:00", "temperature_2m"] = 99.0
+    stored.loc[stored["date"] == "2023-01-20 03:00", "temperature_2m"] = None
+    save_weather_data(tunis, stored)
+
+    # Stored rows are trusted unless asked to check them
+    get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-31", ["temperature_2m"], "Africa/Tunis"
+    )
+    assert len(mock_openmeteo_client.calls) == 1
+
+    result = get_weather_data_city(
+        tunis,
+        "2023-01-01",
+        "2023-01-31",
+        ["temperature_2m"],
+        "Africa/Tunis",
+        refetch_invalid=True,
+    )
+
+    requested = sorted(
+        (call["params"]["start_date"], call["params"]["end_date"])
+        for call in mock_openmeteo_client.calls[1:]
+    )
+    assert requested == [("2023-01-15", "2023-01-15"), ("2023-01-20", "2023-01-20")]
+    assert len(result) == 24 * 31
+    assert result["temperature_2m"].between(20, 29).all()
+
+
+@pytest.mark.parametrize("refetch_invalid", [False, True])
+def test_get_weather_fills_days_before_start(mock_openmeteo_client, refetch_invalid):
+    tunis = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    get_weather_data_city(
+        tunis, "2023-01-01", "2023-01-10", ["temperature_2m"], "Africa/Tunis"
+    )
+
+    # The days between the stored data and the requested start are fetched too
+    get_weather_data_city(
+        tunis,
+        "2023-01-20",
+        "2023-01-31",
+        ["temperature_2m"],
+        "Africa/Tunis",
+        refetch_invalid=refetch_invalid,
+    )
+
+    params = mock_openmeteo_client.calls[1]["params"]
+    assert (params["start_date"], params["end_date"]) == ("2023-01-11", "2023-01-31")
@@ -0,0 +1,117 @@
+import os
+import pytest
+from src.data_import.grid import (
+    check_cell_timezone,
+    get_cell,
+    group_cities_by_cell,
+    load_grid_index,
+    snap_to_grid,
+)
+from src.data_import.weather import get_weather_data_city
+from .utils import mock_openmeteo_client
+
+TUNIS = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+MONTFLEURY = {"name": "Montfleury", "latitude": 36.79, "longitude": 10.17}
+SFAX = {"name": "Sfax", "latitude": 34.7406, "longitude": 10.7600}
+
+
+def test_snap_to_grid():
+    assert snap_to_grid(36.819, 10.1658, 0.1) == (36.8, 10.2)
+    assert snap_to_grid(-33.87, 151.21, 0.25) == (-33.75, 151.25)
+
+
+def test_snap_to_grid_invalid_resolution():
+    with pytest.raises(ValueError):
+        snap_to_grid(36.819, 10.1658, 0)
+
+
+def test_get_cell():
+    assert get_cell(TUNIS, 0.1) == {
+        "name": "cell_36.8000_10.2000",
+        "latitude": 36.8,
+        "longitude": 10.2,
+    }
+
+
+def test_get_cell_without_snapping():
+    cell = get_cell(TUNIS, None)
+    assert cell["latitude"] == TUNIS["latitude"]
+    assert cell["longitude"] == TUNIS["longitude"]
+    assert get_cell(MONTFLEURY, None)["name"] != cell["name"]
+
+
+def test_group_cities_by_cell():
+    groups = group_cities_by_cell([TUNIS, SFAX, MONTFLEURY], 0.1)
+    assert groups == {
+        "cell_36.8000_10.2000": [TUNIS, MONTFLEURY],
+        "cell_34.7000_10.8000": [SFAX],
+    }
+
+
+def test_check_cell_timezone(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path))
+    cell = get_cell(TUNIS, 0.1)
+    check_cell_timezone(cell, "Africa/Tunis")
+    check_cell_timezone(cell, "Africa/Tunis")
+    assert load_grid_index()[cell["name"]]["timezone"] == "Africa/Tunis"
+    with pytest.raises(ValueError):
+        check_cell_timezone(cell, "UTC")
+    # Other cells pick their own
+    check_cell_timezone(get_cell(SFAX, 0.1), "UTC")
+
+
+def test_cities_in_same_cell_share_data(mock_openmeteo_client):
+    hourly_variables = ["temperature_2m", "relative_humidity_2m"]
+    tunis = get_weather_data_city(
+        TUNIS,
+        start_date="2023-01-01",
+        end_date="2023-01-07",
+        hourly_variables=hourly_variables,
+        timezone="Africa/Tunis",
+        grid_resolution=0.1,
+    )
+    calls_after_tunis = len(mock_openmeteo_client.calls)
+    call_params = mock_openmeteo_client.last_call["params"]
+    assert (call_params["latitude"], call_params["longitude"]) == (36.8, 10.2)
+
+    montfleury = get_weather_data_city(
+        MONTFLEURY,
+        start_date="2023-01-02",
+        end_date="2023-01-05",
+        hourly_variables=hourly_variables,
+        timezone="Africa/Tunis",
+        grid_resolution=0.1,
+    )
+
+    # Served from the cell data without any new request
+    assert len(mock_openmeteo_client.calls) == calls_after_tunis
+    assert (montfleury["city"] == "Montfleury").all()
+    assert (tunis["city"] == "Tunis").all()
+    assert len(montfleury) == len(tunis)
+
+    cells_dir = os.path.join(os.environ["WEATHER_DATA_DIR"], "weather", "cells")
+    cell_files = [f for f in os.listdir(cells_dir) if f.endswith(".csv")]
+    assert cell_files == ["cell_36.8000_10.2000.csv"]
+    assert load_grid_index()["cell_36.8000_10.2000"]["cities"] == [
+        "Montfleury",
+        "Tunis",
+    ]
+
+
+def test_cities_without_grid_are_stored_apart(mock_openmeteo_client):
+    # Cells are opt-in, by default cities are fetched at their own coordinates
+    for city in [TUNIS, MONTFLEURY]:
+        get_weather_data_city(
+            city,
+            start_date="2023-01-01",
+            end_date="2023-01-01",
+            hourly_variables=["temperature_2m"],
+            timezone="Africa/Tunis",
+        )
+        params = mock_openmeteo_client.calls[-1]["params"]
+        assert (params["latitude"], params["longitude"]) == (
+            city["latitude"],
+            city["longitude"],
+        )
+    assert len(mock_openmeteo_client.calls) == 2
+    assert len(load_grid_index()) == 2
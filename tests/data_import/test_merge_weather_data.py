@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_import.weather import merge_weather_data
+
+
+def weather_frame(start, end, value, freq="h"):
+    dates = pd.date_range(start=start, end=end, freq=freq)
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "temperature_2m": np.full(len(dates), float(value)),
+            "city": "Tunis",
+        }
+    )
+
+
+def assert_sorted_unique(result):
+    assert result["date"].is_monotonic_increasing
+    assert result["date"].is_unique
+    assert (result.index == np.arange(len(result))).all()
+
+
+def test_merge_chunks_after_existing():
+    existing = weather_frame("2023-01-01", "2023-01-31 23:00", 1)
+    chunks = [
+        weather_frame("2023-02-01", "2023-02-28 23:00", 2),
+        weather_frame("2023-03-01", "2023-03-31 23:00", 3),
+    ]
+    result = merge_weather_data(existing, chunks)
+    assert_sorted_unique(result)
+    assert len(result) == 24 * (31 + 28 + 31)
+
+
+def test_merge_chunks_before_and_after_existing():
+    existing = weather_frame("2023-02-01", "2023-02-28 23:00", 1)
+    chunks = [
+        weather_frame("2023-03-01", "2023-03-05 23:00", 3),
+        weather_frame("2023-01-20", "2023-01-31 23:00", 2),
+    ]
+    result = merge_weather_data(existing, chunks)
+    assert_sorted_unique(result)
+    assert result["date"].iloc[0] == pd.Timestamp("2023-01-20")
+
+
+def test_merge_chunk_filling_inner_gap():
+    existing = pd.concat(
+        [
+            weather_frame("2023-01-01", "2023-01-10 23:00", 1),
+            weather_frame("2023-01-20", "2023-01-31 23:00", 1),
+        ],
+        ignore_index=True,
+    )
+    chunks = [weather_frame("2023-01-11", "2023-01-19 23:00", 2)]
+    result = merge_weather_data(existing, chunks)
+    assert_sorted_unique(result)
+    assert len(result) == 24 * 31
+
+
+def test_merge_overlapping_chunk_wins():
+    existing = weather_frame("2023-01-01", "2023-01-10 23:00", 1)
+    chunks = [weather_frame("2023-01-05", "2023-01-15 23:00", 2)]
+    result = merge_weather_data(existing, chunks)
+    overlap = result["date"] >= pd.Timestamp("2023-01-05")
+    assert (result.loc[overlap, "temperature_2m"] == 2).all()
+    assert (result.loc[~overlap, "temperature_2m"] == 1).all()
+
+
+def test_merge_later_chunk_wins():
+    existing = weather_frame("2023-01-01", "2023-01-05 23:00", 1)
+    chunks = [
+        weather_frame("2023-01-04", "2023-01-08 23:00", 2),
+        weather_frame("2023-01-07", "2023-01-10 23:00", 3),
+    ]
+    result = merge_weather_data(existing, chunks).set_index("date")["temperature_2m"]
+    assert result["2023-01-03"].eq(1).all()
+    assert result["2023-01-05"].eq(2).all()
+    assert result["2023-01-08"].eq(3).all()
+
+
+def test_merge_unsorted_existing():
+    existing = weather_frame("2023-01-01", "2023-01-05 23:00", 1).iloc[::-1]
+    chunks = [weather_frame("2023-01-06", "2023-01-07 23:00", 2)]
+    assert_sorted_unique(merge_weather_data(existing, chunks))
+
+
+@pytest.mark.parametrize(
+    "existing", [None, weather_frame("2023-01-01", "2023-01-01", 1).iloc[:0]]
+)
+def test_merge_without_existing_data(existing):
+    chunks = [weather_frame("2023-01-01", "2023-01-02 23:00", 2)]
+    result = merge_weather_data(existing, chunks)
+    assert len(result) == 48
+    assert_sorted_unique(result)
+
+
+def test_merge_partial_chunk_keeps_stored_columns():
+    existing = weather_frame("2023-01-01", "2023-01-05 23:00", 1)
+    chunk = weather_frame("2023-01-03", "2023-01-07 23:00", 2)
+    chunk = chunk.rename(columns={"temperature_2m": "precipitation"})
+    result = merge_weather_data(existing, [chunk]).set_index("date")
+    assert_sorted_unique(result.reset_index())
+    assert result.loc["2023-01-04", "temperature_2m"].eq(1).all()
+    assert result.loc["2023-01-04", "precipitation"].eq(2).all()
+    assert result.loc["2023-01-06", "temperature_2m"].isna().all()
+
+
+def test_merge_full_chunk_replaces_rows():
+    existing = weather_frame("2023-01-01", "2023-01-05 23:00", 1)
+    chunk = weather_frame("2023-01-03", "2023-01-07 23:00", np.nan)
+    result = merge_weather_data(existing, [chunk]).set_index("date")
+    assert result.loc["2023-01-02", "temperature_2m"].eq(1).all()
+    assert result.loc["2023-01-04", "temperature_2m"].isna().all()
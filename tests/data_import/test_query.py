@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_import.grid import get_cell, register_city
+from src.data_import.query import query_weather, scan_file
+from src.data_import.storage import atomic_write_csv
+from src.data_import.weather import get_file_path, save_weather_data
+
+TUNIS = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+MONTFLEURY = {"name": "Montfleury", "latitude": 36.79, "longitude": 10.17}
+SFAX = {"name": "Sfax", "latitude": 34.7406, "longitude": 10.7600}
+
+
+def weather_frame(seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", "2023-03-31 23:00", freq="h")
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "temperature_2m": rng.normal(15, 5, len(dates)),
+            "precipitation": rng.exponential(0.3, len(dates)),
+        }
+    )
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+    frames = {"Tunis": weather_frame(0), "Sfax": weather_frame(1)}
+    # Tunis and Montfleury share a 0.1 degree cell
+    for city in [TUNIS, MONTFLEURY, SFAX]:
+        register_city(city, get_cell(city, 0.1))
+    save_weather_data(TUNIS, frames["Tunis"], 0.1)
+    save_weather_data(SFAX, frames["Sfax"], 0.1)
+    frames["Montfleury"] = frames["Tunis"]
+    return frames
+
+
+def test_daily_means_match_pandas(store):
+    result = query_weather(
+        cities=["Sfax"], variables=["temperature_2m"], freq="D", chunksize=50
+    )
+    expected = (
+        store["Sfax"]
+        .groupby(store["Sfax"]["date"].dt.floor("D"))["temperature_2m"]
+        .mean()
+    )
+    assert list(result.columns) == ["city", "period", "temperature_2m_mean"]
+    assert (result["city"] == "Sfax").all()
+    np.testing.assert_allclose(result["temperature_2m_mean"], expected.to_numpy())
+    assert list(result["period"]) == list(expected.index)
+
+
+def test_monthly_extremes_with_date_filter(store):
+    result = query_weather(
+        start_date="2023-02-10",
+        end_date="2023-03-05",
+        freq="M",
+        aggregates=["min", "max", "count"],
+        chunksize=100,
+    )
+    assert sorted(result["city"].unique()) == ["Montfleury", "Sfax", "Tunis"]
+
+    data = store["Tunis"]
+    data = data[(data["date"] >= "2023-02-10") & (data["date"] < "2023-03-06")]
+    monthly = data.groupby(data["date"].dt.to_period("M"))["precipitation"]
+    tunis = result[result["city"] == "Tunis"]
+    np.testing.assert_allclose(tunis["precipitation_min"], monthly.min().to_numpy())
+    np.testing.assert_allclose(tunis["precipitation_max"], monthly.max().to_numpy())
+    assert list(tunis["precipitation_count"]) == [19 * 24, 5 * 24]
+
+    # Cities sharing a cell get the same aggregates
+    montfleury = result[result["city"] == "Montfleury"]
+    np.testing.assert_allclose(
+        montfleury["precipitation_max"], tunis["precipitation_max"]
+    )
+
+
+def test_whole_range_aggregate(store):
+    result = query_weather(cities=["Tunis"], freq=None, aggregates=["mean", "sum"])
+    assert len(result) == 1
+    assert result["temperature_2m_mean"].iloc[0] == pytest.approx(
+        store["Tunis"]["temperature_2m"].mean()
+    )
+    assert result["precipitation_sum"].iloc[0] == pytest.approx(
+        store["Tunis"]["precipitation"].sum()
+    )
+
+
+def test_legacy_city_file(store):
+    legacy = weather_frame(2).assign(city="Gabes")
+    atomic_write_csv(legacy, get_file_path("Gabes"))
+    result = query_weather(cities=["Gabes"], freq=None, variables=["temperature_2m"])
+    assert result["temperature_2m_mean"].iloc[0] == pytest.approx(
+        legacy["temperature_2m"].mean()
+    )
+
+
+def test_unknown_city_and_variable(store):
+    assert query_weather(cities=["Nowhere"]).empty
+    assert query_weather(cities=["Tunis"], variables=["wind_speed_10m"]).empty
+
+
+def test_scan_file_skips_missing_variables(store):
+    filepath = get_file_path("Sfax")
+    atomic_write_csv(store["Sfax"], filepath)
+    partial = scan_file(filepath, ["temperature_2m", "wind_speed_10m"], freq="M")
+    assert set(partial.columns.get_level_values(0)) == {"temperature_2m"}
+    assert len(partial) == 3
+
+
+def test_invalid_aggregate(store):
+    with pytest.raises(ValueError):
+        query_weather(aggregates=["median"])
@@ -0,0 +1,173 @@
+import threading
+import time
+import pytest
+from src.data_import.scheduler import (
+    RateLimitedError,
+    RequestScheduler,
+    TokenBucket,
+    estimate_request_cost,
+    parse_retry_after,
+    record_response,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, from_cache=False):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+
+def record(status, retry_after=None, from_cache=False):
+    """Simulate the session response hook inside a job."""
+    headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+    record_response(FakeResponse(status, headers, from_cache))
+
+
+def test_estimate_request_cost():
+    assert estimate_request_cost(3, 7) == 1.0
+    assert estimate_request_cost(20, 7) == 2.0
+    assert estimate_request_cost(10, 28) == 2.0
+    assert estimate_request_cost(20, 365) == pytest.approx(2 * 365 / 14)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(capacity=2, period=2)
+    now = time.monotonic()
+    bucket.consume(2, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == pytest.approx(0.0, abs=1e-6)
+
+
+def test_map_returns_results_in_job_order():
+    scheduler = RequestScheduler(initial_concurrency=4, max_concurrency=4)
+    jobs = [(i,) for i in range(20)]
+
+    def job(i):
+        time.sleep(0.001 * (20 - i))
+        return i * 2
+
+    assert scheduler.map(job, jobs) == [i * 2 for i in range(20)]
+    metrics = scheduler.metrics()
+    assert metrics["completed"] == 20
+    assert metrics["queue_depth"] == 0
+    assert metrics["in_flight"] == 0
+
+
+def test_concurrency_is_bounded():
+    scheduler = RequestScheduler(initial_concurrency=2, max_concurrency=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    scheduler.map(job, [()] * 10)
+    assert peak[0] <= 2
+
+
+def test_budget_throttles_requests():
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(min(seconds, 0.01))
+
+    scheduler = RequestScheduler(limits=[(2, 0.2)], sleep=fake_sleep)
+    scheduler.map(lambda: None, [()] * 4)
+    assert sleeps
+    assert scheduler.metrics()["throttle_time"] > 0
+
+
+def test_rate_limited_job_is_retried_after_retry_after():
+    scheduler = RequestScheduler(sleep=lambda s: time.sleep(min(s, 0.01)))
+    attempts = []
+
+    def job():
+        attempts.append(1)
+        if len(attempts) == 1:
+            record(429, retry_after=0)
+            raise Exception("429 Too Many Requests")
+        record(200)
+        return "ok"
+
+    assert scheduler.map(job, [()]) == ["ok"]
+    metrics = scheduler.metrics()
+    assert metrics["rate_limited"] == 1
+    assert metrics["retried"] == 1
+    assert metrics["failed"] == 0
+
+
+def test_rate_limited_job_gives_up_after_max_retries():
+    scheduler = RequestScheduler(max_retries=1, sleep=lambda s: None)
+
+    def job():
+        record(429, retry_after=0)
+        return None
+
+    with pytest.raises(RateLimitedError):
+        scheduler.map(job, [()])
+
+
+def test_errors_propagate_and_reduce_concurrency():
+    scheduler = RequestScheduler(initial_concurrency=4, max_concurrency=4)
+
+    def job():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        scheduler.map(job, [()])
+    metrics = scheduler.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["concurrency"] == 2
+
+
+def test_cache_hits_are_refunded():
+    scheduler = RequestScheduler(limits=[(10, 60)])
+
+    def job():
+        record(200, from_cache=True)
+
+    scheduler.map(job, [()] * 3, costs=[2.0] * 3)
+    assert scheduler.metrics()["cache_hits"] == 3
+    assert scheduler.buckets[0].tokens == pytest.approx(10, abs=0.1)
+
+
+def test_cache_hits_do_not_lower_concurrency():
+    scheduler = RequestScheduler(initial_concurrency=4, max_concurrency=8)
+
+    def api_job():
+        time.sleep(0.01)
+        record(200)
+
+    def cached_job():
+        record(200, from_cache=True)
+
+    scheduler.map(api_job, [()] * 20)
+    assert scheduler.metrics()["concurrency"] == 8
+    scheduler.map(cached_job, [()] * 3)
+    scheduler.map(api_job, [()] * 40)
+    assert scheduler.metrics()["concurrency"] == 8
+
+
+def test_latency_baseline_recovers_from_a_fast_outlier():
+    scheduler = RequestScheduler(initial_concurrency=4, max_concurrency=8)
+
+    def job(delay):
+        time.sleep(delay)
+        record(200)
+
+    scheduler.map(job, [(0.0,)])
+    scheduler.map(job, [(0.005,)] * 100)
+    assert scheduler.metrics()["concurrency"] == 8
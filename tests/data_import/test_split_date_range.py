@@ -0,0 +1,42 @@
+import pytest
+from src.data_import.weather import split_date_range
+
+
+def test_split_by_month():
+    assert split_date_range(("2023-01-15", "2023-03-10")) == [
+        ("2023-01-15", "2023-01-31"),
+        ("2023-02-01", "2023-02-28"),
+        ("2023-03-01", "2023-03-10"),
+    ]
+
+
+def test_split_within_one_month():
+    assert split_date_range(("2023-01-02", "2023-01-05")) == [
+        ("2023-01-02", "2023-01-05")
+    ]
+
+
+def test_split_starting_on_month_start():
+    assert split_date_range(("2023-02-01", "2023-03-01")) == [
+        ("2023-02-01", "2023-02-28"),
+        ("2023-03-01", "2023-03-01"),
+    ]
+
+
+def test_split_by_days():
+    assert split_date_range(("2023-01-01", "2023-01-10"), chunk_days=4) == [
+        ("2023-01-01", "2023-01-04"),
+        ("2023-01-05", "2023-01-08"),
+        ("2023-01-09", "2023-01-10"),
+    ]
+
+
+def test_split_single_day():
+    assert split_date_range(("2023-01-01", "2023-01-01"), chunk_days=7) == [
+        ("2023-01-01", "2023-01-01")
+    ]
+
+
+def test_split_invalid_chunk_days():
+    with pytest.raises(ValueError):
+        split_date_range(("2023-01-01", "2023-01-10"), chunk_days=0)
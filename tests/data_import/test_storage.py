@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import threading
+import time
+import pandas as pd
+import pytest
+from src.data_import.storage import (
+    atomic_write_csv,
+    file_lock,
+    get_data_dir,
+    get_file_version,
+    read_csv_tail,
+)
+from src.data_import.weather import get_weather_data_city, load_existing_data
+from .utils import mock_openmeteo_client
+
+
+def test_get_data_dir(monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", "/srv/store")
+    assert get_data_dir("weather") == os.path.join("/srv/store", "weather")
+
+
+def test_atomic_write_csv(tmp_path):
+    filepath = str(tmp_path / "tunis.csv")
+    data = pd.DataFrame({"date": ["2023-01-01"], "temperature_2m": [20.0]})
+    atomic_write_csv(data, filepath)
+
+    pd.testing.assert_frame_equal(pd.read_csv(filepath), data)
+    assert os.listdir(tmp_path) == ["tunis.csv"]
+
+
+def test_failed_write_keeps_last_commit(tmp_path, mocker):
+    filepath = str(tmp_path / "tunis.csv")
+    data = pd.DataFrame({"date": ["2023-01-01"], "temperature_2m": [20.0]})
+    atomic_write_csv(data, filepath)
+    version = get_file_version(filepath)
+
+    mocker.patch.object(pd.DataFrame, "to_csv", side_effect=OSError("disk full"))
+    with pytest.raises(OSError):
+        atomic_write_csv(data.iloc[:0], filepath)
+
+    mocker.stopall()
+    assert get_file_version(filepath) == version
+    pd.testing.assert_frame_equal(pd.read_csv(filepath), data)
+    assert os.listdir(tmp_path) == ["tunis.csv"]
+
+
+def test_file_version_changes_on_commit(tmp_path):
+    filepath = str(tmp_path / "tunis.csv")
+    assert get_file_version(filepath) is None
+    data = pd.DataFrame({"a": [1]})
+    atomic_write_csv(data, filepath)
+    first = get_file_version(filepath)
+    atomic_write_csv(data, filepath)
+    assert get_file_version(filepath) != first
+
+
+def _hold_lock(filepath, started, results):
+    with file_lock(filepath):
+        started.set()
+        time.sleep(0.3)
+        results.put(time.monotonic())
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    filepath = str(tmp_path / "tunis.csv")
+    context = multiprocessing.get_context("fork")
+    started, results = context.Event(), context.Queue()
+    process = context.Process(target=_hold_lock, args=(filepath, started, results))
+    process.start()
+    assert started.wait(5)
+
+    with file_lock(filepath):
+        acquired = time.monotonic()
+    process.join()
+    assert acquired >= results.get(timeout=5)
+
+
+def test_concurrent_writers_keep_all_chunks(mock_openmeteo_client):
+    city = {"name": "Tunis", "latitude": 86.819, "longitude": 10.1658}
+    ranges = [("2023-01-01", "2023-01-31"), ("2023-02-01", "2023-02-28")]
+    errors = []
+
+    def fetch(start, end):
+        try:
+            get_weather_data_city(
+                city,
+                start_date=start,
+                end_date=end,
+                hourly_variables=["temperature_2m"],
+                timezone="Africa/Tunis",
+                chunk_days=7,
+            )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch, args=r) for r in ranges]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stored = load_existing_data(city)
+    expected = pd.date_range("2023-01-01", "2023-02-28 23:00", freq="h")
+    assert len(stored) == len(expected)
+    assert stored["date"].is_monotonic_increasing
+    assert stored["date"].is_unique
+
+
+@pytest.mark.parametrize("n_rows", [0, 1, 5, 100, 1000])
+def test_read_csv_tail(tmp_path, n_rows):
+    filepath = str(tmp_path / "tunis.csv")
+    data = pd.DataFrame(
+        {
+            "date": pd.date_range("2023-01-01", periods=100, freq="h"),
+            "temperature_2m": [float(i) for i in range(100)],
+        }
+    )
+    atomic_write_csv(data, filepath)
+
+    tail = read_csv_tail(filepath, n_rows, block_size=64, parse_dates=["date"])
+
+    expected = data.tail(n_rows).reset_index(drop=True) if n_rows else data.iloc[:0]
+    pd.testing.assert_frame_equal(tail, expected, check_dtype=n_rows > 0)
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_import.backfill import run_backfill
+from src.data_import.grid import get_cell, load_grid_index
+from src.data_import.import_y import import_y
+from src.data_import.scheduler import RequestScheduler
+from src.data_import.synthetic import (
+    SYNTHETIC_VARIABLES,
+    SyntheticOpenMeteoClient,
+    make_cities,
+    make_target,
+    make_weather,
+    write_target_csv,
+    write_weather_store,
+)
+from src.data_import.validation import validate_target, validate_weather
+from src.data_import.weather import load_existing_data
+
+TUNIS = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+
+
+def test_make_weather_is_deterministic():
+    first = make_weather(TUNIS, "2023-01-01", "2023-03-31", gap_rate=0.05, seed=1)
+    second = make_weather(TUNIS, "2023-01-01", "2023-03-31", gap_rate=0.05, seed=1)
+    other = make_weather(TUNIS, "2023-01-01", "2023-03-31", gap_rate=0.05, seed=2)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert not first["temperature_2m"].equals(other["temperature_2m"])
+
+
+def test_make_weather_ranges_agree_on_overlap():
+    month = make_weather(TUNIS, "2023-01-01", "2023-01-31", SYNTHETIC_VARIABLES)
+    days = make_weather(TUNIS, "2023-01-10", "2023-01-12", SYNTHETIC_VARIABLES)
+
+    overlap = month[month["date"].isin(days["date"])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(overlap, days)
+
+
+def test_clean_weather_is_physically_valid():
+    data = make_weather(TUNIS, "2022-01-01", "2022-12-31", SYNTHETIC_VARIABLES)
+    _, quarantined, report = validate_weather(data, list(SYNTHETIC_VARIABLES))
+
+    assert len(data) == 365 * 24
+    assert quarantined.empty
+    assert report["missing_timestamps"] == 0
+    assert data["temperature_2m"].between(-10, 45).all()
+    assert (data["precipitation"] > 0).mean() < 0.2
+
+
+def test_make_weather_defects_are_detected():
+    data = make_weather(
+        TUNIS,
+        "2022-01-01",
+        "2022-12-31",
+        gap_rate=0.02,
+        duplicate_rate=0.01,
+        corrupt_rate=0.002,
+    )
+    _, quarantined, report = validate_weather(data, list(SYNTHETIC_VARIABLES[:3]))
+    reasons = quarantined["reason"].value_counts()
+
+    assert 0 < report["missing_timestamps"] < 0.04 * 365 * 24
+    assert reasons["duplicated_date"] == report["duplicated_rows"]
+    assert 0.005 < report["duplicated_rows"] / len(data) < 0.015
+    assert 0 < reasons["out_of_range"] < 0.004 * len(data)
+
+
+def test_unknown_variable():
+    with pytest.raises(ValueError):
+        make_weather(TUNIS, "2023-01-01", "2023-01-01", ["snow_depth"])
+
+
+def test_make_cities():
+    cities = make_cities(20, n_regions=3, seed=4)
+
+    assert cities == make_cities(20, n_regions=3, seed=4)
+    assert len({c["name"] for c in cities}) == 20
+    assert {c["region"] for c in cities} <= {"Region 0", "Region 1", "Region 2"}
+
+
+def test_target_csv_roundtrip(tmp_path):
+    target = make_target("2020-01-01", "2022-12-31", seed=3)
+    filepath = write_target_csv(str(tmp_path / "y.csv"), target)
+
+    assert open(filepath).readline() == "date;value\n"
+    pd.testing.assert_frame_equal(import_y(filepath), target)
+
+
+def test_target_defects(tmp_path):
+    target = make_target(
+        "2020-01-01",
+        "2022-12-31",
+        gap_rate=0.05,
+        duplicate_rate=0.02,
+        outlier_rate=0.01,
+    )
+    _, quarantined, report = validate_target(target)
+
+    assert report["missing_timestamps"] > 0
+    assert report["duplicated_rows"] > 0
+    assert report["outliers"] > 0
+
+    filepath = write_target_csv(str(tmp_path / "y.csv"), target, corrupt_rate=0.01)
+    with pytest.raises(ValueError):
+        import_y(filepath)
+
+
+def test_write_weather_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+    cities = make_cities(12, n_regions=2, seed=0)
+
+    filepaths = write_weather_store(cities, "2023-01-01", "2023-01-31")
+
+    assert len(filepaths) == len({get_cell(c)["name"] for c in cities})
+    assert sum(len(e["cities"]) for e in load_grid_index().values()) == 12
+    stored = load_existing_data(cities[0])
+    assert len(stored) == 31 * 24
+    assert stored["city"].iloc[0] == cities[0]["name"]
+
+
+def test_backfill_stress_with_failing_api(tmp_path, monkeypatch):
+    """Concurrent backfill of several cities against an API failing 30% of calls."""
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+    client = SyntheticOpenMeteoClient(seed=7, failure_rate=0.3)
+    monkeypatch.setattr(
+        "src.data_import.weather.setup_openmeteo_client", lambda: client
+    )
+    cities = make_cities(6, n_regions=3, seed=7)
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    # Every run retries the failed units of the previous one
+    for _ in range(20):
+        result = run_backfill(
+            cities,
+            "2022-01-01",
+            "2022-12-31",
+            list(SYNTHETIC_VARIABLES[:3]),
+            "UTC",
+            max_workers=4,
+            journal_path=journal_path,
+            scheduler=RequestScheduler(limits=[(10_000, 1)], initial_concurrency=4),
+        )
+        if result["failed_units"] == 0:
+            break
+    assert result["failed_units"] == 0
+
+    for city in cities:
+        stored = load_existing_data(city)
+        expected = make_weather(get_cell(city), "2022-01-01", "2022-12-31", seed=7)
+        np.testing.assert_array_equal(stored["date"], expected["date"])
+        np.testing.assert_allclose(
+            stored["temperature_2m"], expected["temperature_2m"], rtol=1e-6
+        )
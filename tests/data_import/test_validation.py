@@ -0,0 +1,161 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.data_import.validation import (
+    get_quality_paths,
+    nan_run_stats,
+    validate_target,
+    validate_weather,
+    write_quality_outputs,
+)
+from src.data_import.grid import get_cell
+from src.data_import.weather import (
+    check_weather_quality,
+    load_existing_data,
+    save_weather_data,
+)
+
+
+def hourly_weather(start="2023-01-01", end="2023-01-03 23:00"):
+    dates = pd.date_range(start=start, end=end, freq="h")
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "temperature_2m": 20.0 + np.arange(len(dates)) % 10,
+            "relative_humidity_2m": 50.0,
+            "city": "Tunis",
+        }
+    )
+
+
+def test_clean_weather_passes():
+    data = hourly_weather()
+    clean, quarantined, report = validate_weather(data)
+    assert len(clean) == len(data)
+    assert quarantined.empty
+    assert report["missing_timestamps"] == 0
+    assert report["duplicated_rows"] == 0
+    assert report["refetch_ranges"] == []
+
+
+def test_missing_hours():
+    data = hourly_weather()
+    data = data.drop(index=range(30, 35))
+    _, quarantined, report = validate_weather(data)
+    assert quarantined.empty
+    assert report["missing_timestamps"] == 5
+    assert report["missing_ranges"] == [("2023-01-02 06:00:00", "2023-01-02 10:00:00")]
+    assert report["refetch_ranges"] == [("2023-01-02", "2023-01-02")]
+
+
+def test_duplicated_hours_keep_last():
+    data = hourly_weather()
+    duplicate = data.iloc[[10]].assign(temperature_2m=-5.0)
+    data = pd.concat([data, duplicate], ignore_index=True)
+    clean, quarantined, report = validate_weather(data)
+    assert report["duplicated_rows"] == 1
+    assert list(quarantined["reason"]) == ["duplicated_date"]
+    assert clean["date"].is_unique
+    kept = clean.loc[clean["date"] == data["date"].iloc[10], "temperature_2m"]
+    assert kept.item() == -5.0
+
+
+def test_out_of_range_values_are_quarantined():
+    data = hourly_weather()
+    data.loc[5, "relative_humidity_2m"] = 150.0
+    data.loc[50, "temperature_2m"] = 99.0
+    clean, quarantined, report = validate_weather(data)
+    assert len(quarantined) == 2
+    assert set(quarantined["reason"]) == {"out_of_range"}
+    assert len(clean) == len(data) - 2
+    assert report["out_of_range"] == {"temperature_2m": 1, "relative_humidity_2m": 1}
+    assert report["refetch_ranges"] == [
+        ("2023-01-01", "2023-01-01"),
+        ("2023-01-03", "2023-01-03"),
+    ]
+
+
+def test_nan_runs():
+    values = np.array(
+        [[np.nan, 1.0], [np.nan, np.nan], [1.0, 1.0], [np.nan, 1.0], [np.nan, np.nan]]
+    )
+    stats = nan_run_stats(values, ["a", "b"])
+    assert stats["a"] == {
+        "nan_count": 4,
+        "nan_runs": 2,
+        "max_nan_run": 2,
+        "mean_nan_run": 2.0,
+    }
+    assert stats["b"] == {
+        "nan_count": 2,
+        "nan_runs": 2,
+        "max_nan_run": 1,
+        "mean_nan_run": 1.0,
+    }
+
+
+def test_nan_values_are_reported_not_quarantined():
+    data = hourly_weather()
+    data.loc[10:15, "temperature_2m"] = np.nan
+    clean, quarantined, report = validate_weather(data)
+    assert quarantined.empty
+    assert report["nan"]["temperature_2m"]["max_nan_run"] == 6
+    assert report["refetch_ranges"] == [("2023-01-01", "2023-01-01")]
+
+
+def test_target_outliers():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2023-01-01", periods=100, freq="D")
+    y = rng.normal(100, 5, len(dates))
+    y[40] = 1000
+    data = pd.DataFrame({"date": dates, "y": y})
+    clean, quarantined, report = validate_target(data)
+    assert list(quarantined["date"]) == [dates[40]]
+    assert list(quarantined["reason"]) == ["outlier"]
+    assert len(clean) == 99
+    assert report["step"] == "1 days 00:00:00"
+
+
+def test_target_missing_days_and_duplicates():
+    dates = pd.to_datetime(["2023-01-01", "2023-01-02", "2023-01-02", "2023-01-05"])
+    data = pd.DataFrame({"date": dates, "y": [1.0, 2.0, 3.0, 4.0]})
+    clean, quarantined, report = validate_target(data, freq="D")
+    assert report["missing_timestamps"] == 2
+    assert report["duplicated_rows"] == 1
+    assert clean["y"].tolist() == [1.0, 3.0, 4.0]
+
+
+def test_write_quality_outputs(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path))
+    data = hourly_weather()
+    data.loc[5, "relative_humidity_2m"] = 150.0
+    _, quarantined, report = validate_weather(data)
+    write_quality_outputs("Tunis", quarantined, report)
+    # Re-quarantining the same rows does not duplicate them
+    write_quality_outputs("Tunis", quarantined)
+
+    quarantine_path, report_path = get_quality_paths("Tunis")
+    assert len(pd.read_csv(quarantine_path)) == 1
+    with open(report_path) as f:
+        assert json.load(f)["quarantined_rows"] == 1
+
+
+def test_check_weather_quality(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path))
+    city = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+    data = hourly_weather().drop(index=range(30, 35))
+    data.loc[50, "temperature_2m"] = 99.0
+    save_weather_data(city, data)
+
+    report = check_weather_quality(city)
+    assert report["missing_timestamps"] == 5
+    assert report["quarantined_rows"] == 1
+    # The failing row left the store, the cell's files hold the quality outputs
+    stored = load_existing_data(city)
+    assert len(stored) == len(data) - 1
+    assert (stored["temperature_2m"] < 99).all()
+    quarantine_path, report_path = get_quality_paths(get_cell(city)["name"])
+    assert len(pd.read_csv(quarantine_path)) == 1
+    assert os.path.exists(report_path)
+    assert check_weather_quality({**city, "name": "Nowhere", "latitude": 0.0}) is None
@@ -1,3 +1,4 @@
+import threading
 import pytest
 import numpy as np
 import pandas as pd
@@ -50,17 +51,34 @@ class MockResponse:
 
 # Define a fixture for the mock client
 @pytest.fixture
-def mock_openmeteo_client(monkeypatch):
+def mock_openmeteo_client(monkeypatch, tmp_path):
+    # Keep the weather store of the test out of the repository
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+
     # Create a mock client
     class MockClient:
         def __init__(self):
-            self.first_call = None
-            self.last_call = None
-
-        def weather_api(self, url, params=None):
-            if self.first_call is None:
-                self.first_call = {"url": url, "params": params}
-            self.last_call = {"url": url, "params": params}
+            self.calls = []
+            self._lock = threading.Lock()
+
+        # Fetches may run concurrently, so first/last refer to the requested ranges
+        @property
+        def first_call(self):
+            with self._lock:
+                return min(self.calls, key=self._call_order, default=None)
+
+        @property
+        def last_call(self):
+            with self._lock:
+                return max(self.calls, key=self._call_order, default=None)
+
+        @staticmethod
+        def _call_order(call):
+            return call["params"]["start_date"]
+
+        def weather_api(self, url, params=None, **kwargs):
+            with self._lock:
+                self.calls.append({"url": url, "params": params})
 
             # Extract parameters
             start_date = pd.to_datetime(params.get("start_date"))
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+from src.process.reconcile import (
+    RECONCILE_METHODS,
+    align_to_hierarchy,
+    build_hierarchy,
+    reconcile,
+    shrink_covariance,
+    top_down_proportions,
+)
+
+CITIES = [
+    {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658, "region": "North"},
+    {"name": "Sfax", "latitude": 34.7406, "longitude": 10.7603, "region": "South"},
+    {"name": "Bizerte", "latitude": 37.2744, "longitude": 9.8739, "region": "North"},
+    {"name": "Gabes", "latitude": 33.8815, "longitude": 10.0982, "region": "South"},
+    {"name": "Sousse", "latitude": 35.8256, "longitude": 10.6084, "region": "Centre"},
+]
+
+nan = np.nan
+
+
+@pytest.fixture
+def hierarchy():
+    return build_hierarchy(CITIES)
+
+
+def make_forecasts(hierarchy, horizon=48, seed=0):
+    """Coherent truth, noisy base forecasts and in-sample residuals."""
+    rng = np.random.default_rng(seed)
+    truth = hierarchy.summing_matrix() @ rng.uniform(10, 20, (5, horizon))
+    forecasts = truth + rng.normal(0, 1, truth.shape)
+    residuals = rng.normal(0, 1, (hierarchy.n_series, 200))
+    return truth, forecasts, residuals
+
+
+def test_build_hierarchy(hierarchy):
+    assert hierarchy.names == [
+        "Total",
+        "Centre",
+        "North",
+        "South",
+        "Tunis",
+        "Sfax",
+        "Bizerte",
+        "Gabes",
+        "Sousse",
+    ]
+    np.testing.assert_array_equal(
+        hierarchy.summing_matrix()[:4],
+        [
+            [1, 1, 1, 1, 1],
+            [0, 0, 0, 0, 1],
+            [1, 0, 1, 0, 0],
+            [0, 1, 0, 1, 0],
+        ],
+    )
+
+
+def test_build_hierarchy_needs_regions():
+    with pytest.raises(ValueError):
+        build_hierarchy(CITIES + [{"name": "Kairouan"}])
+
+
+@pytest.mark.parametrize("method", RECONCILE_METHODS)
+def test_reconciled_forecasts_are_coherent(hierarchy, method):
+    _, forecasts, residuals = make_forecasts(hierarchy)
+    history = np.random.default_rng(1).uniform(1, 2, (5, 100))
+
+    result = reconcile(hierarchy, forecasts, method, residuals, history)
+
+    assert result.shape == forecasts.shape
+    np.testing.assert_allclose(result, hierarchy.summing_matrix() @ result[4:])
+
+
+@pytest.mark.parametrize("method", ["ols", "wls_struct", "wls_var", "mint_shrink"])
+def test_mint_matches_dense_formula(hierarchy, method):
+    _, forecasts, residuals = make_forecasts(hierarchy)
+    S = hierarchy.summing_matrix()
+    if method == "ols":
+        W = np.eye(len(S))
+    elif method == "wls_struct":
+        W = np.diag(S.sum(axis=1))
+    elif method == "wls_var":
+        W = np.diag(residuals.var(axis=1, ddof=1))
+    else:
+        W = shrink_covariance(residuals)[0]
+    W_inv = np.linalg.inv(W)
+    expected = S @ np.linalg.solve(S.T @ W_inv @ S, S.T @ W_inv @ forecasts)
+
+    result = reconcile(hierarchy, forecasts, method, residuals)
+
+    np.testing.assert_allclose(result, expected, atol=1e-9)
+
+
+def test_mint_keeps_coherent_forecasts(hierarchy):
+    truth, _, residuals = make_forecasts(hierarchy)
+    np.testing.assert_allclose(reconcile(hierarchy, truth, residuals=residuals), truth)
+
+
+def test_mint_shrink_reduces_error(hierarchy):
+    truth, forecasts, residuals = make_forecasts(hierarchy, horizon=2000)
+    result = reconcile(hierarchy, forecasts, "mint_shrink", residuals)
+    assert np.mean((result - truth) ** 2) < np.mean((forecasts - truth) ** 2)
+
+
+def test_bottom_up_accepts_city_forecasts(hierarchy):
+    bottom = np.arange(10.0).reshape(5, 2)
+    result = reconcile(hierarchy, bottom, "bottom_up")
+    np.testing.assert_array_equal(result[:4], [[20, 25], [8, 9], [4, 6], [8, 10]])
+
+
+def test_top_down_proportions(hierarchy):
+    # Totals of 4 and 10, the missing Sousse value is ignored
+    history = np.array([[1.0, 3.0], [1.0, 1.0], [2.0, 4.0], [0.0, 2.0], [nan, 0.0]])
+    np.testing.assert_allclose(
+        top_down_proportions(hierarchy, history), [0.275, 0.175, 0.45, 0.1, 0.0]
+    )
+    np.testing.assert_allclose(
+        top_down_proportions(hierarchy, history, "proportions_of_averages"),
+        np.array([2.0, 1.0, 3.0, 1.0, 0.0]) / 7,
+    )
+
+
+def test_shrink_covariance():
+    rng = np.random.default_rng(0)
+    # More series than time steps: the sample covariance is singular
+    residuals = rng.normal(0, 2, (50, 20))
+    covariance, intensity = shrink_covariance(residuals)
+
+    assert 0 < intensity <= 1
+    np.testing.assert_allclose(np.diag(covariance), residuals.var(axis=1, ddof=1))
+    assert np.linalg.eigvalsh(covariance).min() > 0
+
+    # Strongly correlated series are barely shrunk
+    common = rng.normal(0, 1, 500)
+    _, intensity = shrink_covariance(common + rng.normal(0, 0.1, (5, 500)))
+    assert intensity < 0.01
+
+
+def test_align_to_hierarchy(hierarchy):
+    names = ["Sousse", "Gabes", "Bizerte", "Sfax", "Tunis"]
+    values = np.arange(5.0)[:, None]
+    aligned = align_to_hierarchy(hierarchy, names, values, bottom_only=True)
+    np.testing.assert_array_equal(aligned[:, 0], [4, 3, 2, 1, 0])
+    with pytest.raises(KeyError):
+        align_to_hierarchy(hierarchy, names, values)
+
+
+def test_reconcile_errors(hierarchy):
+    _, forecasts, _ = make_forecasts(hierarchy)
+    with pytest.raises(ValueError):
+        reconcile(hierarchy, forecasts, "middle_out")
+    with pytest.raises(ValueError):
+        reconcile(hierarchy, forecasts, "mint_shrink")
+    with pytest.raises(ValueError):
+        reconcile(hierarchy, forecasts[1:], "ols")
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_import.import_y import import_y
+from src.process.resample import (
+    fill_gaps,
+    regularize,
+    stack_series,
+    unstack_series,
+)
+
+nan = np.nan
+
+
+def test_stack_series_averages_irregular_timestamps():
+    data = pd.DataFrame(
+        {
+            "city": ["Tunis", "Tunis", "Tunis", "Sfax", "Sfax"],
+            "date": pd.to_datetime(
+                [
+                    "2023-01-01 00:10",
+                    "2023-01-01 00:50",
+                    "2023-01-01 03:00",
+                    "2023-01-01 01:00",
+                    "2023-01-01 02:30",
+                ]
+            ),
+            "y": [1.0, 3.0, 5.0, 7.0, 9.0],
+        }
+    )
+    grid, names, values = stack_series(data, freq="h")
+    assert list(grid) == list(pd.date_range("2023-01-01", periods=4, freq="h"))
+    assert names == ["Sfax", "Tunis"]
+    np.testing.assert_array_equal(values, [[nan, 7.0, 9.0, nan], [2.0, nan, nan, 5.0]])
+
+
+def test_unstack_series_roundtrip():
+    data = pd.DataFrame(
+        {
+            "city": np.repeat(["A", "B"], 3),
+            "date": np.tile(pd.date_range("2023-01-01", periods=3, freq="D"), 2),
+            "y": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        }
+    )
+    grid, names, values = stack_series(data, freq="D")
+    pd.testing.assert_frame_equal(unstack_series(grid, names, values), data)
+
+
+def test_linear_fill():
+    values = np.array([[1.0, nan, nan, 4.0, nan], [nan, 2.0, nan, 6.0, 8.0]])
+    np.testing.assert_array_equal(
+        fill_gaps(values, "linear"),
+        [[1.0, 2.0, 3.0, 4.0, nan], [nan, 2.0, 4.0, 6.0, 8.0]],
+    )
+
+
+def test_ffill():
+    values = np.array([[nan, 1.0, nan, nan, 3.0, nan]])
+    np.testing.assert_array_equal(
+        fill_gaps(values, "ffill"), [[nan, 1.0, 1.0, 1.0, 3.0, 3.0]]
+    )
+
+
+def test_seasonal_naive_fill():
+    values = np.array([[1.0, 2.0, 3.0, nan, 5.0, nan, nan, nan, nan, 10.0]])
+    np.testing.assert_array_equal(
+        fill_gaps(values, "seasonal_naive", season=3),
+        [[1.0, 2.0, 3.0, 1.0, 5.0, 3.0, 1.0, 5.0, 3.0, 10.0]],
+    )
+
+
+def test_max_gap_leaves_long_gaps():
+    values = np.array([[1.0, nan, 3.0, nan, nan, nan, 7.0, nan, nan]])
+    np.testing.assert_array_equal(
+        fill_gaps(values, "linear", max_gap=2),
+        [[1.0, 2.0, 3.0, nan, nan, nan, 7.0, nan, nan]],
+    )
+    np.testing.assert_array_equal(
+        fill_gaps(values, "ffill", max_gap=2),
+        [[1.0, 1.0, 3.0, nan, nan, nan, 7.0, 7.0, 7.0]],
+    )
+
+
+@pytest.mark.parametrize("method", ["linear", "ffill"])
+def test_matches_pandas(method):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 500))
+    values[rng.random(values.shape) < 0.3] = nan
+    frame = pd.DataFrame(values.T)
+    if method == "linear":
+        expected = frame.interpolate(limit_area="inside")
+    else:
+        expected = frame.ffill()
+    np.testing.assert_allclose(
+        fill_gaps(values, method, block_size=7), expected.to_numpy().T
+    )
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        fill_gaps(np.zeros((1, 3)), "spline")
+
+
+def test_regularize():
+    dates = pd.date_range("2023-01-01", periods=48, freq="h")
+    data = pd.DataFrame({"city": "Tunis", "date": dates, "y": np.arange(48.0)})
+    data = data.drop(index=[5, 6, 40])
+    result = regularize(data, freq="h", method="seasonal_naive")
+    assert len(result) == 48
+    assert result["y"].iloc[40] == 16.0
+    assert np.isnan(result["y"].iloc[5])
+
+
+def test_regularize_single_series(tmp_path):
+    filepath = tmp_path / "y.csv"
+    filepath.write_text("date;y\n01/01/2023;1\n02/01/2023;2\n04/01/2023;4\n")
+    result = regularize(import_y(filepath), freq="D", series_col=None)
+    assert list(result.columns) == ["date", "y"]
+    assert list(result["date"]) == list(pd.date_range("2023-01-01", "2023-01-04"))
+    assert list(result["y"]) == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_non_fixed_frequency():
+    data = pd.DataFrame({"date": pd.date_range("2023-01-01", periods=3), "y": 1.0})
+    with pytest.raises(ValueError, match="'MS' has no fixed length"):
+        regularize(data, freq="MS", series_col=None)
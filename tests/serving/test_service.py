@@ -0,0 +1,157 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_import.grid import get_cell, get_cell_file_path
+from src.data_import.storage import atomic_write_csv
+from src.serving.batching import MicroBatcher
+from src.serving.server import serve
+from src.serving.service import ForecastService, SeasonalNaiveModel, VersionedCache
+
+TUNIS = {"name": "Tunis", "latitude": 36.819, "longitude": 10.1658}
+
+
+@pytest.fixture
+def weather_store(tmp_path, monkeypatch):
+    """Write hourly weather for Tunis, temperature being the hour of the day."""
+    monkeypatch.setenv("WEATHER_DATA_DIR", str(tmp_path / "data"))
+
+    def write(start="2023-01-01", days=10):
+        dates = pd.date_range(start, periods=days * 24, freq="h")
+        data = pd.DataFrame(
+            {
+                "date": dates,
+                "temperature_2m": dates.hour.astype(float),
+                "precipitation": 0.0,
+            }
+        )
+        filepath = get_cell_file_path(get_cell(TUNIS))
+        atomic_write_csv(data, filepath)
+        return filepath
+
+    return write
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    batch_sizes = []
+
+    def process(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch=8, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(20)]
+
+    assert [f.result() for f in futures] == [i * 2 for i in range(20)]
+    assert max(batch_sizes) == 8
+    assert batcher.stats()["batches"] < 20
+    batcher.close()
+
+
+def test_micro_batcher_fails_whole_batch_on_error():
+    batcher = MicroBatcher(lambda items: 1 / 0, max_wait=0.0)
+
+    with pytest.raises(ZeroDivisionError):
+        batcher(1)
+    batcher.close()
+
+
+def test_versioned_cache_reloads_new_versions(tmp_path):
+    filepath = tmp_path / "value.txt"
+    filepath.write_text("1")
+    cache = VersionedCache(lambda f: open(f).read(), refresh_interval=0.0)
+
+    assert cache.get(str(filepath)) == "1"
+    assert cache.get(str(filepath)) == "1"
+    assert cache.stats()["loads"] == 1
+
+    filepath.write_text("22")
+    assert cache.get(str(filepath)) == "22"
+    assert cache.stats()["loads"] == 2
+
+
+def test_seasonal_naive_model():
+    batch = np.arange(2 * 48 * 1, dtype=float).reshape(2, 48, 1)
+    forecast = SeasonalNaiveModel(horizon=30, season=24)(batch)
+
+    assert forecast.shape == (2, 30)
+    np.testing.assert_array_equal(forecast[0, :24], np.arange(24, 48))
+    np.testing.assert_array_equal(forecast[0, 24:], np.arange(24, 30))
+
+
+def test_forecast_uses_latest_window(weather_store):
+    weather_store()
+    service = ForecastService(
+        [TUNIS], ["temperature_2m", "precipitation"], window=48, refresh_interval=0.0
+    )
+
+    result = service.forecast("Tunis")
+
+    assert result["issued_at"] == "2023-01-10 23:00:00"
+    assert result["start"] == "2023-01-11 00:00:00"
+    assert result["values"] == [float(h) for h in range(24)]
+    with pytest.raises(KeyError):
+        service.forecast("Sfax")
+    service.close()
+
+
+def test_forecast_refreshes_when_weather_lands(weather_store):
+    weather_store(days=10)
+    service = ForecastService(
+        [TUNIS], ["temperature_2m"], window=48, refresh_interval=0.0
+    )
+    assert service.forecast("Tunis")["issued_at"] == "2023-01-10 23:00:00"
+
+    weather_store(days=12)
+
+    assert service.forecast("Tunis")["issued_at"] == "2023-01-12 23:00:00"
+    assert service.stats()["weather_cache"]["loads"] == 2
+    service.close()
+
+
+def test_features_include_latest_target(weather_store, tmp_path):
+    weather_store(days=3)
+    target_path = tmp_path / "y.csv"
+    target_path.write_text("date;value\n01/01/2023;10\n02/01/2023;20\n")
+    service = ForecastService(
+        [TUNIS], ["temperature_2m"], window=72, target_path=str(target_path)
+    )
+
+    dates, values = service.features("Tunis")
+
+    assert values.shape == (72, 2)
+    np.testing.assert_array_equal(values[:24, 0], 10.0)
+    # The last known target value is carried over the days without target
+    np.testing.assert_array_equal(values[24:, 0], 20.0)
+    np.testing.assert_array_equal(values[:, 1], np.tile(np.arange(24.0), 3))
+    service.close()
+
+
+def test_http_server(weather_store):
+    weather_store()
+    service = ForecastService([TUNIS], ["temperature_2m"], window=48)
+    server = serve(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        with urllib.request.urlopen(f"{base_url}/forecast?city=Tunis") as response:
+            result = json.load(response)
+        assert result["values"][:3] == [0.0, 1.0, 2.0]
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base_url}/forecast?city=Sfax")
+        assert error.value.code == 404
+
+        with urllib.request.urlopen(f"{base_url}/health") as response:
+            assert json.load(response)["batching"]["requests"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.profiling import PipelineProfiler, main, profiling_enabled
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiling_enabled(monkeypatch):
+    monkeypatch.delenv("PIPELINE_PROFILE", raising=False)
+    assert not profiling_enabled()
+    assert profiling_enabled(True)
+    monkeypatch.setenv("PIPELINE_PROFILE", "1")
+    assert profiling_enabled()
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = PipelineProfiler(enabled=False, output_dir=str(tmp_path))
+    with profiler, profiler.stage("load"):
+        pass
+
+    assert profiler.run_dir is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiler_report_and_stacks(tmp_path):
+    profiler = PipelineProfiler(
+        enabled=True, output_dir=str(tmp_path), sample_interval=0.001
+    )
+    with profiler:
+        with profiler.stage("load"):
+            data = np.ones(2_000_000)
+            del data
+        with profiler.stage("fetch"):
+            # Work done in another thread only shows up in the sampled stacks
+            worker = threading.Thread(target=busy_wait, args=(0.1,), name="fetcher")
+            worker.start()
+            worker.join()
+
+    files = set(os.listdir(profiler.run_dir))
+    assert {"report.json", "stacks.collapsed", "load.prof", "load.collapsed"} <= files
+    with open(os.path.join(profiler.run_dir, "report.json")) as f:
+        report = json.load(f)
+
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert list(stages) == ["load", "fetch"]
+    # 2 million float64 are 15.3 MB
+    assert stages["load"]["peak_memory_mb"] > 15
+    assert stages["fetch"]["wall_seconds"] >= 0.1
+    assert stages["fetch"]["top_functions"]
+
+    with open(os.path.join(profiler.run_dir, "fetch.collapsed")) as f:
+        lines = f.read().splitlines()
+    assert any(
+        line.startswith("fetcher;") and "busy_wait (test_profiling.py)" in line
+        for line in lines
+    )
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_nested_stages_keep_outer_peak(tmp_path):
+    profiler = PipelineProfiler(enabled=True, output_dir=str(tmp_path))
+    with profiler:
+        with profiler.stage("outer"):
+            data = np.ones(2_000_000)
+            del data
+            with profiler.stage("inner"):
+                pass
+
+    assert profiler.stages["outer"]["peak_memory_mb"] > 15
+    assert profiler.stages["inner"]["peak_memory_mb"] < 15
+
+
+def test_sampler_does_not_keep_freed_memory_alive(tmp_path):
+    # Deep idle stacks make every sample long, widening the window in which
+    # the sampler references the frame of a call that just returned
+    stop = threading.Event()
+
+    def idle(depth):
+        if depth:
+            idle(depth - 1)
+        else:
+            stop.wait()
+
+    threads = [threading.Thread(target=idle, args=(50,)) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    try:
+        peaks = []
+        for _ in range(20):
+            profiler = PipelineProfiler(
+                enabled=True, output_dir=str(tmp_path), sample_interval=0.0001
+            )
+            with profiler, profiler.stage("outer"):
+                data = np.ones(2_000_000)
+                del data
+                with profiler.stage("inner"):
+                    pass
+            peaks.append(profiler.stages["inner"]["peak_memory_mb"])
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert max(peaks) < 1
+
+
+def test_main_profiles_a_script(tmp_path, capsys):
+    script = tmp_path / "job.py"
+    script.write_text("import sys\nprint('args', sys.argv[1:])\n")
+
+    main(["-o", str(tmp_path / "profiles"), str(script), "--flag", "value"])
+
+    assert "args ['--flag', 'value']" in capsys.readouterr().out
+    (run_dir,) = os.listdir(tmp_path / "profiles")
+    assert os.path.exists(tmp_path / "profiles" / run_dir / "run.prof")